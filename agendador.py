@@ -0,0 +1,254 @@
+"""
+Coleta em segundo plano: desacopla a extração das visitas à página.
+
+O agendador completa no armazém histórico as tabelas da B3 dos últimos dias
+úteis nos horários de publicação configurados e consulta o FRP0 e o DIF OPER
+CASADA em intervalos regulares durante o pregão. A página passa a ler apenas o
+último snapshot gravado e a idade dele, de modo que a quantidade de extrações
+não cresce com a quantidade de usuários.
+
+Modos (TCAM_AGENDADOR):
+    thread     o processo da página roda o agendador em uma thread (padrão)
+    externo    um processo dedicado roda o agendador; a página só lê o armazém
+    desligado  sem agendador: a página extrai na hora, como antes
+
+Só um processo coleta por vez: o agendador só começa depois de obter o lock
+TCAM_DIR_LOCKS/agendador.lock. Com várias réplicas da página e a API no modo
+thread (ou junto com o processo dedicado), os demais agendadores ficam
+aguardando e um deles assume a coleta se o dono do lock encerrar. O pedido de
+coleta imediata da página ("🔄 Atualizar agora") é gravado em
+TCAM_DIR_LOCKS/agendador.solicitacao, de modo que chega ao dono da coleta
+mesmo que ele rode em outro processo.
+
+Uso como processo dedicado:
+    python agendador.py
+"""
+import atexit
+import os
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+
+from filelock import FileLock, Timeout
+
+from armazem_historico import CONJUNTOS_INDICADORES, obter_armazem
+from calendario_b3 import dias_uteis_anteriores, eh_dia_util
+from extracao_b3 import atualizar_dif_oper_casada, atualizar_frp0, ler_snapshot_indicador, obter_dados_b3_periodo
+from voo_unico import DIR_LOCKS
+
+MODO_AGENDADOR = os.environ.get("TCAM_AGENDADOR", "thread")
+# Horários em que as tabelas da B3 dos dias anteriores são completadas no armazém
+HORARIOS_B3 = sorted(
+    time.fromisoformat(horario.strip())
+    for horario in os.environ.get("TCAM_AGENDADOR_HORARIOS_B3", "08:30,12:00,19:00").split(",")
+)
+# Quantidade de dias úteis mantidos no armazém (a janela máxima da página)
+DIAS_AGENDADOR = int(os.environ.get("TCAM_AGENDADOR_DIAS", "60"))
+INTERVALO_INDICADORES = float(os.environ.get("TCAM_AGENDADOR_INTERVALO_INDICADORES", "300"))  # segundos
+INICIO_PREGAO = time.fromisoformat(os.environ.get("TCAM_PREGAO_INICIO", "09:00"))
+FIM_PREGAO = time.fromisoformat(os.environ.get("TCAM_PREGAO_FIM", "18:30"))
+# Intervalo, em segundos, entre as tentativas de um agendador sem o lock de assumir a coleta
+INTERVALO_ELEICAO = float(os.environ.get("TCAM_AGENDADOR_INTERVALO_ELEICAO", "60"))
+# Intervalo, em segundos, entre as verificações de pedidos de coleta vindos de outros processos
+INTERVALO_SOLICITACOES = float(os.environ.get("TCAM_AGENDADOR_INTERVALO_SOLICITACOES", "2"))
+
+ARQUIVO_SOLICITACAO = os.path.join(DIR_LOCKS, "agendador.solicitacao")
+
+
+def em_pregao(momento):
+    """Indica se o momento cai em um dia útil, dentro do horário de negociação."""
+    return eh_dia_util(momento) and INICIO_PREGAO <= momento.time() <= FIM_PREGAO
+
+
+def registrar_solicitacao():
+    """Grava um pedido de coleta imediata para o dono da coleta, em qualquer processo."""
+    os.makedirs(DIR_LOCKS, exist_ok=True)
+    temporario = f"{ARQUIVO_SOLICITACAO}.{uuid.uuid4().hex}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(uuid.uuid4().hex)
+    os.replace(temporario, ARQUIVO_SOLICITACAO)
+
+
+def ler_solicitacao():
+    """Identificador do último pedido de coleta gravado, ou None se não houver."""
+    try:
+        with open(ARQUIVO_SOLICITACAO, encoding="utf-8") as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return None
+
+
+def proximo_horario_b3(momento):
+    """Próximo horário de HORARIOS_B3 estritamente depois do momento."""
+    for horario in HORARIOS_B3:
+        candidato = datetime.combine(momento.date(), horario)
+        if candidato > momento:
+            return candidato
+    return datetime.combine(momento.date() + timedelta(days=1), HORARIOS_B3[0])
+
+
+class AgendadorColetas(threading.Thread):
+    """Thread que executa as coletas agendadas e grava os resultados no armazém."""
+
+    def __init__(self):
+        super().__init__(name="agendador-coletas", daemon=True)
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self._coleta_solicitada = False
+        self._solicitacao_atendida = None
+        self._compactado_em = None
+        os.makedirs(DIR_LOCKS, exist_ok=True)
+        self._lock_dono = FileLock(os.path.join(DIR_LOCKS, "agendador.lock"))
+
+    def _assumir_coleta(self):
+        """
+        Aguarda o lock de dono da coleta (um único agendador entre todos os
+        processos). Retorna False se o agendador for encerrado antes.
+        """
+        avisado = False
+        while not self._parar.is_set():
+            try:
+                self._lock_dono.acquire(timeout=0)
+                print("Agendador: este processo assumiu a coleta em segundo plano.")
+                return True
+            except Timeout:
+                if not avisado:
+                    print("Agendador: a coleta está com outro processo; aguardando para assumir se ele encerrar.")
+                    avisado = True
+            self._parar.wait(INTERVALO_ELEICAO)
+        return False
+
+    def atualizar_b3(self):
+        """Completa no armazém as datas da janela que ainda não foram gravadas."""
+        datas = [d.strftime("%d/%m/%Y") for d in dias_uteis_anteriores(datetime.today(), DIAS_AGENDADOR)]
+        resultados = obter_dados_b3_periodo(datas)
+        falhas = [data for data, resultado in resultados.items() if resultado.erro is not None or resultado.valor.tcam is None]
+        print(f"Agendador: B3 atualizada para {len(datas) - len(falhas)} de {len(datas)} datas.")
+
+    def atualizar_indicadores(self, forcar=False):
+        """
+        Extrai e grava novos snapshots do FRP0 e do DIF OPER CASADA. Com várias
+        réplicas rodando o agendador, um indicador cujo snapshot foi gravado por
+        outra há menos de meio intervalo não é extraído de novo.
+        """
+        indicadores = (
+            ("FRP0", "frp0", atualizar_frp0),
+            ("DIF OPER CASADA", "dif_oper", atualizar_dif_oper_casada),
+        )
+        for nome, conjunto, atualizar in indicadores:
+            _, capturado_em = ler_snapshot_indicador.__wrapped__(conjunto)
+            recente = capturado_em is not None and datetime.now() - capturado_em < timedelta(seconds=INTERVALO_INDICADORES / 2)
+            if recente and not forcar:
+                continue
+            try:
+                atualizar()
+            except Exception as e:
+                print(f"Agendador: erro ao atualizar {nome}: {e}")
+
+    def _compactar_apos_pregao(self, agora):
+        """Uma vez por dia, depois do pregão, junta os snapshots dos indicadores em um único arquivo."""
+        if self._compactado_em == agora.date() or agora.time() <= FIM_PREGAO:
+            return
+        try:
+            obter_armazem().compactar(CONJUNTOS_INDICADORES)
+        except Exception as e:
+            print(f"Agendador: erro ao compactar os indicadores: {e}")
+        self._compactado_em = agora.date()
+
+    def solicitar_coleta(self):
+        """Antecipa a próxima rodada: tabelas da B3 e indicadores são coletados imediatamente."""
+        self._coleta_solicitada = True
+        self._acordar.set()
+
+    def _solicitacao_pendente(self):
+        """Indica se há um pedido de coleta (deste ou de outro processo) ainda não atendido."""
+        solicitacao = ler_solicitacao()
+        pendente = self._coleta_solicitada or solicitacao != self._solicitacao_atendida
+        self._coleta_solicitada, self._solicitacao_atendida = False, solicitacao
+        return pendente
+
+    def run(self):
+        if not self._assumir_coleta():
+            return
+        try:
+            self._coletar()
+        finally:
+            self._lock_dono.release()
+
+    def _coletar(self):
+        proxima_b3 = datetime.now()
+        proximos_indicadores = datetime.now()
+        # Pedidos gravados antes de este processo assumir já são atendidos pela primeira rodada
+        self._solicitacao_atendida = ler_solicitacao()
+        while not self._parar.is_set():
+            agora = datetime.now()
+            solicitada = self._solicitacao_pendente()
+
+            # Indicadores antes da B3: a janela inteira da B3 pode levar minutos (numa
+            # implantação nova, são DIAS_AGENDADOR datas) e a página exibe os dois
+            if solicitada or agora >= proximos_indicadores:
+                # Fora do pregão só coleta se ainda não houver nenhum snapshot para exibir
+                sem_snapshot = any(ler_snapshot_indicador.__wrapped__(c)[0] is None for c in CONJUNTOS_INDICADORES)
+                if solicitada or em_pregao(agora) or sem_snapshot:
+                    self.atualizar_indicadores(forcar=solicitada)
+                proximos_indicadores = agora + timedelta(seconds=INTERVALO_INDICADORES)
+
+            if solicitada or agora >= proxima_b3:
+                try:
+                    self.atualizar_b3()
+                except Exception as e:
+                    print(f"Agendador: erro ao atualizar a B3: {e}")
+                proxima_b3 = proximo_horario_b3(agora)
+
+            self._compactar_apos_pregao(agora)
+
+            # Acorda a cada INTERVALO_SOLICITACOES para ver pedidos de outros processos
+            espera = (min(proxima_b3, proximos_indicadores) - datetime.now()).total_seconds()
+            self._acordar.wait(min(max(1.0, espera), INTERVALO_SOLICITACOES))
+            self._acordar.clear()
+
+    def encerrar(self):
+        self._parar.set()
+        self._acordar.set()
+
+
+# --- Instância única por processo ---
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+
+def iniciar_agendador():
+    """Inicia (uma única vez por processo) e retorna o agendador em thread."""
+    global _agendador
+    with _agendador_lock:
+        if _agendador is None:
+            _agendador = AgendadorColetas()
+            _agendador.start()
+            atexit.register(_agendador.encerrar)
+        return _agendador
+
+
+def solicitar_coleta():
+    """
+    Pede uma coleta imediata ao dono da coleta: o agendador deste processo ou o
+    de outro (réplica no modo thread ou processo dedicado), pelo arquivo de solicitação.
+    """
+    registrar_solicitacao()
+    if _agendador is not None:
+        _agendador.solicitar_coleta()
+
+
+if __name__ == "__main__":
+    print(f"Agendador de coletas: B3 às {', '.join(h.strftime('%H:%M') for h in HORARIOS_B3)}; "
+          f"indicadores a cada {INTERVALO_INDICADORES:g} s entre {INICIO_PREGAO:%H:%M} e {FIM_PREGAO:%H:%M}.")
+    from preparar_ambiente import preparar_navegador
+
+    preparar_navegador()  # instala/verifica o Chromium antes da primeira coleta (no-op se o marcador estiver em dia)
+    agendador = AgendadorColetas()
+    agendador.start()
+    try:
+        while agendador.is_alive():
+            agendador.join(timeout=1)
+    except KeyboardInterrupt:
+        agendador.encerrar()
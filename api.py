@@ -0,0 +1,322 @@
+"""
+API HTTP (FastAPI) com as TCAMs e os indicadores, sobre o mesmo código de
+extração, cache e armazém da página.
+
+Rotas:
+    GET /tcam/{data}              tabelas da B3 de uma data (AAAA-MM-DD)
+    GET /tcam?from=&to=           tabelas da B3 dos dias úteis do período, com a coluna "Data Consulta"
+    GET /frp0                     FRP0 do último pregão
+    GET /dif-oper-casada          DIF OPER CASADA - COMPRA
+
+Nas rotas /tcam, `tabela` escolhe tcam (padrão), volume, liquido ou total_volume;
+a tabela tcam vem como a matriz de somas da página (matriz_somas): uma linha por
+data e estatística, com a TCAM, os indicadores atuais e as somas TCAM + FRP0 e
+TCAM + DIF OPER CASADA, a menos que `somas=false`.
+
+Formatos: JSON (padrão) ou Arrow IPC (stream), escolhido por `formato=json|arrow`
+ou pelo Accept (application/vnd.apache.arrow.stream). Toda resposta tem ETag,
+e If-None-Match com o mesmo ETag devolve 304 sem corpo. O corpo serializado
+fica em cache por TCAM_API_TTL segundos: leituras repetidas não tocam no
+armazém nem no navegador.
+
+Como a página, a API lê os snapshots gravados quando o agendador está ligado
+(TCAM_AGENDADOR=thread ou externo) e extrai na hora quando ele está desligado.
+Datas anteriores à janela do agendador (TCAM_AGENDADOR_DIAS) vêm do armazém ou,
+se ainda não estiverem lá, de uma extração, em qualquer modo.
+
+Uso:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py
+"""
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import Literal
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+
+from agendador import DIAS_AGENDADOR, MODO_AGENDADOR, iniciar_agendador
+from cache_extracao import TTL_SNAPSHOT, consultar_cache, guardar_em_cache
+from calendario_b3 import dias_uteis_anteriores, eh_dia_util
+from extracao_b3 import (
+    SemRegistroB3,
+    SemSnapshot,
+    combinar_dados_b3,
+    ler_snapshot_b3,
+    ler_snapshot_dif_oper_casada,
+    ler_snapshot_frp0,
+    obter_dados_b3_periodo,
+    obter_dif_oper_casada,
+    obter_frp0,
+    tratar_valor_frp0_dif_original,
+)
+from matriz_somas import calcular_matriz_somas
+from metricas import medir
+from resiliencia import EsperaEsgotada, FonteIndisponivel, ValorDesatualizado, prazo_total
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+
+TTL_API = float(os.environ.get("TCAM_API_TTL", str(TTL_SNAPSHOT)))  # segundos
+MAX_DIAS_API = int(os.environ.get("TCAM_API_MAX_DIAS", "60"))  # dias úteis por consulta de período
+HOST_API = os.environ.get("TCAM_API_HOST", "127.0.0.1")
+PORTA_API = int(os.environ.get("TCAM_API_PORTA", "8000"))
+
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+TabelaB3 = Literal["tcam", "volume", "liquido", "total_volume"]
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # Como na página: com o agendador em thread, o processo da API também coleta
+    if MODO_AGENDADOR == "thread":
+        iniciar_agendador()
+    yield
+
+
+app = FastAPI(title="TCAM", description="TCAMs da B3, FRP0 e DIF OPER CASADA.", lifespan=ciclo_de_vida)
+
+
+# --- Leitura dos dados (snapshots ou extração, conforme o agendador) ---
+
+def _janela_agendador():
+    """Datas (dd/mm/aaaa) que o agendador mantém coletadas."""
+    return {d.strftime("%d/%m/%Y") for d in dias_uteis_anteriores(date.today(), DIAS_AGENDADOR)}
+
+
+def _dados_b3(datas):
+    """
+    {data: ResultadoExtracao} das datas (dd/mm/aaaa). Com o agendador ligado, as
+    datas da janela dele vêm dos snapshots; as anteriores, que ele nunca coleta,
+    vêm do armazém ou de uma extração, como no modo desligado.
+    """
+    if MODO_AGENDADOR == "desligado":
+        return obter_dados_b3_periodo(datas)
+    janela = _janela_agendador()
+    na_janela = [d for d in datas if d in janela]
+    fora_da_janela = [d for d in datas if d not in janela]
+    resultados = ler_snapshot_b3(na_janela) if na_janela else {}
+    if fora_da_janela:
+        resultados.update(obter_dados_b3_periodo(fora_da_janela))
+    return {d: resultados[d] for d in datas}
+
+
+def _frp0():
+    """(DataFrame do FRP0, ValorDesatualizado ou None)."""
+    try:
+        return (obter_frp0() if MODO_AGENDADOR == "desligado" else ler_snapshot_frp0()), None
+    except ValorDesatualizado as e:
+        return e.valor, e
+
+
+def _dif_oper():
+    """((valor em texto, data de atualização), ValorDesatualizado ou None)."""
+    try:
+        return (obter_dif_oper_casada() if MODO_AGENDADOR == "desligado" else ler_snapshot_dif_oper_casada()), None
+    except ValorDesatualizado as e:
+        return e.valor, e
+
+
+def _erro_http(erro):
+    """HTTPException correspondente ao erro de extração de uma fonte."""
+    if isinstance(erro, SemRegistroB3):
+        return HTTPException(404, str(erro))
+    if isinstance(erro, (SemSnapshot, FonteIndisponivel, EsperaEsgotada)):
+        return HTTPException(503, str(erro))
+    return HTTPException(502, f"Falha na extração: {erro}")
+
+
+def _meta_desatualizado(meta, nome, desatualizado):
+    if desatualizado is not None:
+        meta["desatualizado"] = True
+        meta.setdefault("capturado_em", {})[nome] = desatualizado.capturado_em.isoformat(timespec="seconds")
+
+
+def _com_somas(df_tcam, meta):
+    """
+    Matriz de somas da TCAM com os indicadores atuais, como nos cards da página:
+    uma linha por data e estatística, com as colunas TCAM, FRP0, DIF OPER CASADA,
+    "TCAM + FRP0" e "TCAM + DIF OPER CASADA". Um indicador indisponível deixa as
+    somas dele vazias e o motivo em meta["indisponiveis"].
+    """
+    df_frp, dif_texto = None, None
+    try:
+        df_frp, desatualizado = _frp0()
+        _meta_desatualizado(meta, "frp0", desatualizado)
+    except Exception as e:
+        meta.setdefault("indisponiveis", {})["frp0"] = str(e)
+    try:
+        (dif_texto, _), desatualizado = _dif_oper()
+        _meta_desatualizado(meta, "dif_oper", desatualizado)
+    except Exception as e:
+        meta.setdefault("indisponiveis", {})["dif_oper"] = str(e)
+
+    indicadores = {
+        "FRP0": float(df_frp["Último Preço"].iloc[0]) if df_frp is not None and not df_frp.empty else None,
+        "DIF OPER CASADA": tratar_valor_frp0_dif_original(dif_texto.split()[0]) if dif_texto else None,
+    }
+    return calcular_matriz_somas(df_tcam, indicadores).reset_index()
+
+
+def _tabela_b3(dados, tabela):
+    df = getattr(dados, tabela)
+    return df if df is not None else pd.DataFrame()
+
+
+def _dias_uteis(inicio, fim):
+    """Datas (dd/mm/aaaa) dos dias úteis da B3 de `inicio` a `fim`, inclusive."""
+    return [
+        (inicio + timedelta(days=i)).strftime("%d/%m/%Y")
+        for i in range((fim - inicio).days + 1)
+        if eh_dia_util(inicio + timedelta(days=i))
+    ]
+
+
+# --- Serialização, cache e ETag ---
+
+def _formato(request):
+    formato = request.query_params.get("formato")
+    if formato is None:
+        formato = "arrow" if TIPO_ARROW in request.headers.get("accept", "") else "json"
+    if formato not in ("json", "arrow"):
+        raise HTTPException(400, "formato deve ser json ou arrow.")
+    return formato
+
+
+def _serializar(df, meta, formato):
+    """Corpo da resposta: JSON {"registros": [...], "meta": {...}} ou Arrow IPC com `meta` nos metadados."""
+    if formato == "arrow":
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b"tcam": json.dumps(meta).encode("utf-8")})
+        destino = pa.BufferOutputStream()
+        with pa.ipc.new_stream(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return destino.getvalue().to_pybytes()
+    registros = df.to_json(orient="records", date_format="iso", force_ascii=False)
+    return f'{{"registros":{registros},"meta":{json.dumps(meta, ensure_ascii=False)}}}'.encode("utf-8")
+
+
+def _responder(request, chave, montar):
+    """
+    Resposta de `montar()` -> (DataFrame, meta) no formato pedido, com ETag. O
+    corpo serializado fica em cache por TTL_API; If-None-Match igual devolve 304.
+    """
+    formato = _formato(request)
+    encontrado, resposta = consultar_cache("api", chave, formato)
+    if not encontrado:
+        with medir("api", chave[0]), prazo_total():
+            df, meta = montar()
+            corpo = _serializar(df, meta, formato)
+        etag = f'"{hashlib.blake2b(corpo, digest_size=16).hexdigest()}"'
+        resposta = (corpo, etag)
+        guardar_em_cache("api", (chave, formato), resposta, TTL_API)
+
+    corpo, etag = resposta
+    cabecalhos = {"ETag": etag, "Cache-Control": f"max-age={TTL_API:g}", "Vary": "Accept"}
+    if etag in (valor.strip() for valor in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, media_type=TIPO_ARROW if formato == "arrow" else "application/json", headers=cabecalhos)
+
+
+# --- Rotas ---
+
+@app.get("/tcam/{data}")
+def tcam_da_data(request: Request, data: date, tabela: TabelaB3 = "tcam", somas: bool = True):
+    """Tabela da B3 de uma data; a TCAM vem como a matriz de somas com os indicadores atuais."""
+    data_str = data.strftime("%d/%m/%Y")
+
+    def montar():
+        resultado = _dados_b3([data_str])[data_str]
+        if resultado.erro is not None:
+            raise _erro_http(resultado.erro)
+        df = _tabela_b3(resultado.valor, tabela)
+        if df.empty:
+            raise HTTPException(404, f"Sem dados de {tabela} para {data_str}.")
+        meta = {"data": data.isoformat(), "tabela": tabela, "desatualizado": False}
+        if tabela == "tcam" and somas:
+            df = _com_somas(df, meta)
+        return df, meta
+
+    return _responder(request, ("tcam", data_str, tabela, somas), montar)
+
+
+@app.get("/tcam")
+def tcam_do_periodo(
+    request: Request,
+    inicio: date = Query(..., alias="from"),
+    fim: date = Query(..., alias="to"),
+    tabela: TabelaB3 = "tcam",
+    somas: bool = True,
+):
+    """Tabelas da B3 dos dias úteis do período, reunidas com a coluna "Data Consulta"."""
+    if fim < inicio:
+        raise HTTPException(400, "`to` deve ser igual ou posterior a `from`.")
+    datas = _dias_uteis(inicio, fim)
+    if len(datas) > MAX_DIAS_API:
+        raise HTTPException(400, f"O período tem {len(datas)} dias úteis; o máximo é {MAX_DIAS_API}.")
+
+    def montar():
+        resultados = _dados_b3(datas)
+        dados_por_data = {data_str: r.valor for data_str, r in resultados.items() if r.erro is None and r.valor.tcam is not None}
+        df = _tabela_b3(combinar_dados_b3(dados_por_data), tabela)
+        meta = {
+            "de": inicio.isoformat(),
+            "ate": fim.isoformat(),
+            "tabela": tabela,
+            "desatualizado": False,
+            # Datas do período sem dados, com o motivo
+            "sem_dados": {data_str: str(r.erro) for data_str, r in resultados.items() if r.erro is not None},
+        }
+        if tabela == "tcam" and somas and not df.empty:
+            df = _com_somas(df, meta)
+        return df, meta
+
+    return _responder(request, ("tcam_periodo", inicio, fim, tabela, somas), montar)
+
+
+@app.get("/frp0")
+def frp0(request: Request):
+    """FRP0 (Forward Points) do último pregão."""
+    def montar():
+        try:
+            df_frp, desatualizado = _frp0()
+        except Exception as e:
+            raise _erro_http(e)
+        if df_frp is None or df_frp.empty:
+            raise HTTPException(503, "FRP0 ainda não disponível.")
+        meta = {"desatualizado": False}
+        _meta_desatualizado(meta, "frp0", desatualizado)
+        return df_frp, meta
+
+    return _responder(request, ("frp0",), montar)
+
+
+@app.get("/dif-oper-casada")
+def dif_oper_casada(request: Request):
+    """DIF OPER CASADA - COMPRA: valor no texto da B3, valor numérico e data de atualização."""
+    def montar():
+        try:
+            (valor_texto, data_atualizacao), desatualizado = _dif_oper()
+        except Exception as e:
+            raise _erro_http(e)
+        if not valor_texto:
+            raise HTTPException(503, "DIF OPER CASADA ainda não disponível.")
+        df = pd.DataFrame({
+            "Valor": [tratar_valor_frp0_dif_original(valor_texto.split()[0])],
+            "Valor Texto": [valor_texto],
+            "Data Atualização": [data_atualizacao],
+        })
+        meta = {"desatualizado": False}
+        _meta_desatualizado(meta, "dif_oper", desatualizado)
+        return df, meta
+
+    return _responder(request, ("dif_oper",), montar)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=HOST_API, port=PORTA_API)
@@ -0,0 +1,204 @@
+"""
+Armazém histórico em Parquet, particionado por data.
+
+Estrutura em disco:
+    <raiz>/<conjunto>/data=AAAA-MM-DD/parte-<ns>-<id>.parquet
+
+Cada gravação é um "snapshot" com a coluna `capturado_em`. Os arquivos são
+escritos em um nome temporário e renomeados com os.replace, de modo que
+leitores (inclusive de outras réplicas) nunca enxergam um arquivo pela metade.
+A compactação junta as partes de cada partição em um único arquivo.
+
+Uso pela linha de comando:
+    python armazem_historico.py compactar [conjunto ...]
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from filelock import FileLock
+
+DIR_ARMAZEM = os.environ.get("TCAM_DIR_ARMAZEM", "dados_historicos")
+
+# Conjuntos das tabelas da B3: uma data encerrada só precisa do último snapshot.
+CONJUNTOS_B3 = ("tcam", "volume", "volume_total", "liquido")
+# Indicadores do dia: todos os snapshots são mantidos como histórico.
+CONJUNTOS_INDICADORES = ("frp0", "dif_oper")
+CONJUNTOS = CONJUNTOS_B3 + CONJUNTOS_INDICADORES
+
+COLUNA_CAPTURA = "capturado_em"
+
+
+class ArmazemHistorico:
+    """Leitura e gravação dos snapshots Parquet de cada conjunto de dados."""
+
+    def __init__(self, raiz=DIR_ARMAZEM):
+        self.raiz = raiz
+
+    def _dir_particao(self, conjunto, data_ref):
+        return os.path.join(self.raiz, conjunto, f"data={data_ref.isoformat()}")
+
+    @staticmethod
+    def _partes(dir_particao):
+        """Arquivos Parquet visíveis da partição (temporários começam com ponto)."""
+        try:
+            nomes = os.listdir(dir_particao)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            os.path.join(dir_particao, nome) for nome in nomes
+            if nome.endswith(".parquet") and not nome.startswith(".")
+        )
+
+    @staticmethod
+    def _gravar_atomico(tabela, destino):
+        """Grava em arquivo temporário no mesmo diretório e renomeia para o destino."""
+        temporario = os.path.join(os.path.dirname(destino), f".tmp-{uuid.uuid4().hex}.parquet")
+        try:
+            pq.write_table(tabela, temporario, compression="snappy")
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def gravar(self, conjunto, data_ref, df, capturado_em=None):
+        """Grava um snapshot do DataFrame na partição da data. DataFrames vazios são ignorados."""
+        if df is None or df.empty:
+            return None
+        capturado_em = capturado_em or datetime.now()
+        dir_particao = self._dir_particao(conjunto, data_ref)
+        os.makedirs(dir_particao, exist_ok=True)
+        df = df.copy()
+        df[COLUNA_CAPTURA] = pd.Timestamp(capturado_em)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        destino = os.path.join(dir_particao, f"parte-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+        self._gravar_atomico(tabela, destino)
+        return destino
+
+    def substituir(self, conjunto, data_ref, df):
+        """
+        Reescreve a partição da data com `df`, que já traz a coluna capturado_em
+        (um ou mais snapshots). Usado para refazer o armazém a partir do arquivo bruto.
+        """
+        dir_particao = self._dir_particao(conjunto, data_ref)
+        os.makedirs(dir_particao, exist_ok=True)
+        with FileLock(os.path.join(dir_particao, ".compactacao.lock")):
+            partes = self._partes(dir_particao)
+            df = df.sort_values(COLUNA_CAPTURA).reset_index(drop=True)
+            destino = os.path.join(dir_particao, f"parte-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+            self._gravar_atomico(pa.Table.from_pandas(df, preserve_index=False), destino)
+            for parte in partes:
+                os.remove(parte)
+        return destino
+
+    def _ler_particao(self, conjunto, data_ref):
+        frames = []
+        for caminho in self._partes(self._dir_particao(conjunto, data_ref)):
+            try:
+                frames.append(pq.read_table(caminho).to_pandas())
+            except FileNotFoundError:
+                # Parte removida por uma compactação concorrente; o conteúdo já está no arquivo compactado.
+                continue
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+    def ler_ultimo(self, conjunto, data_ref):
+        """
+        Retorna (df, capturado_em) do snapshot mais recente da data,
+        ou (None, None) se a partição não existir.
+        """
+        df = self._ler_particao(conjunto, data_ref)
+        if df is None or df.empty:
+            return None, None
+        ultimo = df[COLUNA_CAPTURA].max()
+        df = df[df[COLUNA_CAPTURA] == ultimo].drop(columns=[COLUNA_CAPTURA]).reset_index(drop=True)
+        return df, ultimo.to_pydatetime()
+
+    def ler_ultimo_disponivel(self, conjunto):
+        """
+        Retorna (df, capturado_em) do snapshot mais recente da partição mais recente
+        do conjunto, ou (None, None) se o conjunto ainda não tiver dados.
+        """
+        dir_conjunto = os.path.join(self.raiz, conjunto)
+        try:
+            nomes = os.listdir(dir_conjunto)
+        except FileNotFoundError:
+            return None, None
+        for nome in sorted((n for n in nomes if n.startswith("data=")), reverse=True):
+            df, capturado_em = self.ler_ultimo(conjunto, datetime.strptime(nome[len("data="):], "%Y-%m-%d").date())
+            if df is not None:
+                return df, capturado_em
+        return None, None
+
+    def ler_snapshots(self, conjunto, data_ref):
+        """Retorna todos os snapshots da data (com a coluna capturado_em), ou None."""
+        df = self._ler_particao(conjunto, data_ref)
+        if df is None:
+            return None
+        return df.sort_values(COLUNA_CAPTURA).reset_index(drop=True)
+
+    def compactar(self, conjuntos=CONJUNTOS):
+        """
+        Junta as partes de cada partição em um único arquivo. Para as tabelas da
+        B3 apenas o último snapshot é mantido. Um lock por partição evita que
+        duas réplicas compactem a mesma partição ao mesmo tempo.
+        Retorna a quantidade de partições compactadas.
+        """
+        compactadas = 0
+        for conjunto in conjuntos:
+            dir_conjunto = os.path.join(self.raiz, conjunto)
+            if not os.path.isdir(dir_conjunto):
+                continue
+            for nome in sorted(os.listdir(dir_conjunto)):
+                dir_particao = os.path.join(dir_conjunto, nome)
+                if not nome.startswith("data=") or not os.path.isdir(dir_particao):
+                    continue
+                with FileLock(os.path.join(dir_particao, ".compactacao.lock")):
+                    partes = self._partes(dir_particao)
+                    if len(partes) < 2:
+                        continue
+                    df = pd.concat([pq.read_table(p).to_pandas() for p in partes], ignore_index=True)
+                    df = df.drop_duplicates()
+                    if conjunto in CONJUNTOS_B3:
+                        df = df[df[COLUNA_CAPTURA] == df[COLUNA_CAPTURA].max()]
+                    df = df.sort_values(COLUNA_CAPTURA).reset_index(drop=True)
+                    destino = os.path.join(dir_particao, f"parte-{time.time_ns()}-compactada.parquet")
+                    self._gravar_atomico(pa.Table.from_pandas(df, preserve_index=False), destino)
+                    for parte in partes:
+                        os.remove(parte)
+                    compactadas += 1
+        return compactadas
+
+
+# --- Instância única por processo ---
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def obter_armazem():
+    """Retorna o armazém do processo, apontando para TCAM_DIR_ARMAZEM."""
+    global _armazem
+    with _armazem_lock:
+        if _armazem is None:
+            _armazem = ArmazemHistorico()
+        return _armazem
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção do armazém histórico em Parquet.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    compactar = subcomandos.add_parser("compactar", help="Junta as partes de cada partição em um único arquivo.")
+    compactar.add_argument("conjuntos", nargs="*", choices=CONJUNTOS, help="Conjuntos a compactar (padrão: todos).")
+    args = parser.parse_args()
+
+    if args.comando == "compactar":
+        total = obter_armazem().compactar(tuple(args.conjuntos) or CONJUNTOS)
+        print(f"{total} partição(ões) compactada(s) em {DIR_ARMAZEM}.")
@@ -0,0 +1,238 @@
+"""
+Arquivo bruto das capturas: cada página (HTML) ou conjunto de payloads (JSON)
+recebido das fontes é guardado comprimido, antes de qualquer leitura, para que
+o armazém histórico possa ser refeito com os leitores atuais sem voltar à B3/BMF.
+
+Estrutura em disco:
+    <raiz>/objetos/<hash[:2]>/<hash>.gz                     conteúdo comprimido, endereçado pelo SHA-256
+    <raiz>/indice/<fonte>/data=AAAA-MM-DD.jsonl             uma linha por captura (capturado_em, tipo, hash)
+
+Conteúdos iguais (o mesmo payload consultado várias vezes no dia) ocupam um
+único objeto. Os objetos são gravados em um nome temporário e renomeados com
+os.replace; as linhas do índice são acrescentadas com uma única escrita em modo
+"append", de modo que várias threads e processos podem capturar ao mesmo tempo.
+
+Uso pela linha de comando:
+    python arquivo_bruto.py reprocessar [fonte ...] [--de AAAA-MM-DD] [--ate AAAA-MM-DD]
+        [--processos N] [--substituir]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+import pandas as pd
+
+from armazem_historico import COLUNA_CAPTURA, DIR_ARMAZEM, obter_armazem
+
+ARQUIVO_BRUTO = os.environ.get("TCAM_ARQUIVO_BRUTO", "1") == "1"
+DIR_BRUTO = os.environ.get("TCAM_DIR_BRUTO", os.path.join(DIR_ARMAZEM, "brutos"))
+NIVEL_COMPRESSAO = int(os.environ.get("TCAM_BRUTO_COMPRESSAO", "6"))  # gzip, de 1 a 9
+
+# Fontes capturadas e os conjuntos do armazém que cada uma alimenta.
+CONJUNTOS_POR_FONTE = {
+    "b3_cambio": ("tcam", "volume", "volume_total", "liquido"),
+    "bmf_frp0": ("frp0",),
+    "b3_indicadores": ("dif_oper",),
+}
+FONTES = tuple(CONJUNTOS_POR_FONTE)
+
+
+class ArquivoBruto:
+    """Gravação e leitura das capturas brutas, por fonte e data de referência."""
+
+    def __init__(self, raiz=DIR_BRUTO):
+        self.raiz = raiz
+
+    def _caminho_objeto(self, hash_conteudo):
+        return os.path.join(self.raiz, "objetos", hash_conteudo[:2], f"{hash_conteudo}.gz")
+
+    def _caminho_indice(self, fonte, data_ref):
+        return os.path.join(self.raiz, "indice", fonte, f"data={data_ref.isoformat()}.jsonl")
+
+    def guardar(self, fonte, data_ref, tipo, conteudo, capturado_em=None, codificacao="utf-8"):
+        """
+        Guarda uma captura (`conteudo` em bytes; `tipo` "html" ou "json") e a
+        registra no índice da fonte e data. Retorna o hash do conteúdo.
+        """
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        destino = self._caminho_objeto(hash_conteudo)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            temporario = os.path.join(os.path.dirname(destino), f".tmp-{uuid.uuid4().hex}")
+            try:
+                with open(temporario, "wb") as arquivo:
+                    arquivo.write(gzip.compress(conteudo, compresslevel=NIVEL_COMPRESSAO, mtime=0))
+                os.replace(temporario, destino)
+            finally:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+        registro = {
+            "capturado_em": (capturado_em or datetime.now()).isoformat(timespec="microseconds"),
+            "tipo": tipo,
+            "hash": hash_conteudo,
+            "codificacao": codificacao,
+            "bytes": len(conteudo),
+        }
+        indice = self._caminho_indice(fonte, data_ref)
+        os.makedirs(os.path.dirname(indice), exist_ok=True)
+        with open(indice, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(registro) + "\n")
+        return hash_conteudo
+
+    def capturas(self, fonte, data_ref):
+        """Registros do índice da fonte e data, do mais antigo ao mais recente."""
+        try:
+            with open(self._caminho_indice(fonte, data_ref), encoding="utf-8") as arquivo:
+                linhas = arquivo.readlines()
+        except FileNotFoundError:
+            return []
+        registros = []
+        for linha in linhas:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                # Linha incompleta de uma escrita interrompida
+                continue
+        return sorted(registros, key=lambda registro: registro["capturado_em"])
+
+    def ler(self, registro):
+        """Conteúdo da captura como texto, na codificação em que foi recebido."""
+        with open(self._caminho_objeto(registro["hash"]), "rb") as arquivo:
+            return gzip.decompress(arquivo.read()).decode(registro.get("codificacao", "utf-8"), errors="replace")
+
+    def datas(self, fonte):
+        """Datas de referência com capturas da fonte, em ordem crescente."""
+        try:
+            nomes = os.listdir(os.path.join(self.raiz, "indice", fonte))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            datetime.strptime(nome[len("data="):-len(".jsonl")], "%Y-%m-%d").date()
+            for nome in nomes if nome.startswith("data=") and nome.endswith(".jsonl")
+        )
+
+
+# --- Instância única por processo ---
+
+_arquivo = None
+_arquivo_lock = threading.Lock()
+
+
+def obter_arquivo_bruto():
+    """Retorna o arquivo bruto do processo, apontando para TCAM_DIR_BRUTO."""
+    global _arquivo
+    with _arquivo_lock:
+        if _arquivo is None:
+            _arquivo = ArquivoBruto()
+        return _arquivo
+
+
+def arquivar(fonte, data_ref, tipo, conteudo, codificacao="utf-8"):
+    """
+    Guarda a captura se o arquivo bruto estiver ligado. `conteudo` pode ser
+    texto (gravado em UTF-8) ou bytes. Falhas de gravação não interrompem a extração.
+    """
+    if not ARQUIVO_BRUTO:
+        return
+    if isinstance(conteudo, str):
+        conteudo, codificacao = conteudo.encode("utf-8"), "utf-8"
+    try:
+        obter_arquivo_bruto().guardar(fonte, data_ref, tipo, conteudo, codificacao=codificacao)
+    except Exception as e:
+        print(f"Erro ao guardar a captura de '{fonte}' de {data_ref} no arquivo bruto: {e}")
+
+
+# --- Reprocessamento: refaz o armazém histórico a partir das capturas ---
+
+def _reprocessar_data(fonte, data_iso, substituir):
+    """
+    Lê as capturas da fonte e data com os leitores atuais e grava o resultado no
+    armazém. Tabelas da B3 usam a captura mais recente que tiver dados; os
+    indicadores viram um snapshot por captura. Retorna (fonte, data, situação).
+    Roda nos processos trabalhadores.
+    """
+    # Importado aqui: extracao_b3 importa este módulo para arquivar as capturas
+    from extracao_b3 import reinterpretar_captura
+
+    data_ref = date.fromisoformat(data_iso)
+    armazem = obter_armazem()
+    conjuntos = CONJUNTOS_POR_FONTE[fonte]
+    if not substituir and armazem.ler_ultimo(conjuntos[0], data_ref)[0] is not None:
+        return fonte, data_iso, "já no armazém"
+
+    arquivo = obter_arquivo_bruto()
+    snapshots = {conjunto: [] for conjunto in conjuntos}
+    erros = []
+    for registro in reversed(arquivo.capturas(fonte, data_ref)):
+        capturado_em = pd.Timestamp(datetime.fromisoformat(registro["capturado_em"]))
+        if fonte == "b3_cambio" and capturado_em.date() <= data_ref:
+            # Como em _gravar_dados_b3, só datas já encerradas na captura
+            continue
+        try:
+            tabelas = reinterpretar_captura(fonte, registro["tipo"], arquivo.ler(registro), data_ref)
+        except Exception as e:
+            erros.append(f"{registro['capturado_em']}: {e}")
+            continue
+        if not tabelas:
+            continue
+        for conjunto, df in tabelas.items():
+            if df is not None and not df.empty:
+                snapshots[conjunto].append(df.assign(**{COLUNA_CAPTURA: capturado_em}))
+        if fonte == "b3_cambio":
+            # Data encerrada: só o último snapshot interessa
+            break
+
+    if not any(snapshots.values()):
+        return fonte, data_iso, "sem dados" + (f" ({erros[0]})" if erros else "")
+    for conjunto, frames in snapshots.items():
+        if frames:
+            armazem.substituir(conjunto, data_ref, pd.concat(frames[::-1], ignore_index=True))
+    return fonte, data_iso, f"{max(len(frames) for frames in snapshots.values())} snapshot(s) gravado(s)"
+
+
+def reprocessar(fontes=FONTES, de=None, ate=None, processos=None, substituir=False):
+    """
+    Refaz as partições do armazém a partir do arquivo bruto, uma tarefa por
+    fonte e data, distribuídas entre `processos` processos (padrão: um por
+    núcleo). Sem `substituir`, só as datas ausentes do armazém são gravadas.
+    Retorna a lista de (fonte, data, situação).
+    """
+    arquivo = obter_arquivo_bruto()
+    tarefas = [
+        (fonte, data_ref.isoformat())
+        for fonte in fontes
+        for data_ref in arquivo.datas(fonte)
+        if (de is None or data_ref >= de) and (ate is None or data_ref <= ate)
+    ]
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(_reprocessar_data, fonte, data_iso, substituir) for fonte, data_iso in tarefas]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            print(f"{resultado[0]:<15} {resultado[1]}  {resultado[2]}")
+            resultados.append(resultado)
+    return sorted(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivo bruto das capturas da B3/BMF.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    comando = subcomandos.add_parser("reprocessar", help="Refaz o armazém histórico lendo as capturas com os leitores atuais.")
+    comando.add_argument("fontes", nargs="*", choices=FONTES, help="Fontes a reprocessar (padrão: todas).")
+    comando.add_argument("--de", type=date.fromisoformat, help="Primeira data de referência (AAAA-MM-DD).")
+    comando.add_argument("--ate", type=date.fromisoformat, help="Última data de referência (AAAA-MM-DD).")
+    comando.add_argument("--processos", type=int, help="Processos em paralelo (padrão: um por núcleo).")
+    comando.add_argument("--substituir", action="store_true", help="Reescreve também as datas que já estão no armazém.")
+    args = parser.parse_args()
+
+    if args.comando == "reprocessar":
+        resultados = reprocessar(tuple(args.fontes) or FONTES, args.de, args.ate, args.processos, args.substituir)
+        gravadas = sum(1 for _, _, situacao in resultados if situacao.endswith("gravado(s)"))
+        print(f"{gravadas} de {len(resultados)} data(s) gravada(s) em {DIR_ARMAZEM} a partir de {DIR_BRUTO}.")
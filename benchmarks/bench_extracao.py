@@ -0,0 +1,320 @@
+"""
+Mede o pipeline de extração de ponta a ponta (pool de Chromium, XHR/DOM, leitura
+e montagem dos DataFrames, cache e armazém) contra o servidor local de
+benchmarks/servidor_simulado.py, sem acessar a B3 nem a BMF.
+
+Modos:
+    sequencial   uma data por vez (extrair_dados_b3_playwright), depois FRP0 e DIF OPER CASADA
+    concorrente  B3 em lote + FRP0 + DIF OPER CASADA em paralelo (executar_extracoes), como a página
+    armazem      obter_* com o cache vazio e os dados já gravados no armazém histórico
+    cache        obter_* com o cache em memória já preenchido
+
+Para cada modo e quantidade de datas grava tempos, mediana, p95, datas por
+segundo, pico de memória (processo + navegadores) e a duração de cada etapa
+registrada pelo módulo metricas. Com --comparar, mostra a variação da mediana
+em relação a um resultado anterior.
+
+Os payloads JSON do servidor simulado são sintéticos (benchmarks/fixtures),
+escritos no formato que os leitores esperam: os tempos medem o pipeline, não
+mostram que os leitores entendem as respostas reais da B3. Para isso, --capturas
+relê com os leitores atuais os payloads reais guardados no arquivo bruto
+(arquivo_bruto.py) e informa quantos foram reconhecidos; o resultado vai para a
+saída junto com os tempos.
+
+Uso:
+    python benchmarks/bench_extracao.py [--datas 1 3 10] [--repeticoes 5] [--modos sequencial concorrente]
+        [--latencia-ms 80] [--jitter-ms 40] [--taxa-falhas 0] [--saida resultado.json] [--comparar anterior.json]
+        [--capturas dados_historicos/brutos]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuração lida na importação dos módulos do projeto: o servidor local precisa
+# passar pelo filtro de hosts e o armazém do benchmark não pode misturar com o real.
+os.environ["TCAM_HOSTS_PERMITIDOS"] = os.environ.get("TCAM_HOSTS_PERMITIDOS", "b3.com.br,bmf.com.br") + ",127.0.0.1"
+os.environ.setdefault("TCAM_DIR_ARMAZEM", tempfile.mkdtemp(prefix="tcam-bench-"))
+os.environ.setdefault("TCAM_METRICAS_ARQUIVO", "")
+
+import extracao_b3  # noqa: E402
+import metricas  # noqa: E402
+from arquivo_bruto import ArquivoBruto  # noqa: E402
+from cache_extracao import limpar_cache  # noqa: E402
+from calendario_b3 import dias_uteis_anteriores  # noqa: E402
+from metricas import RegistroMetricas  # noqa: E402
+from motor_extracao import executar_extracoes  # noqa: E402
+from pool_navegador import encerrar_pool, memoria_navegadores  # noqa: E402
+from servidor_simulado import ServidorSimulado  # noqa: E402
+
+MODOS = ("sequencial", "concorrente", "armazem", "cache")
+
+
+# --- Execuções medidas ---
+
+def _executar_sequencial(datas):
+    erros = 0
+    for data_desejada in datas:
+        try:
+            extracao_b3.extrair_dados_b3_playwright(data_desejada)
+        except Exception:
+            erros += 1
+    for funcao in (extracao_b3.extrair_frp0, extracao_b3.extrair_dif_oper_casada_playwright):
+        try:
+            funcao()
+        except Exception:
+            erros += 1
+    return erros
+
+
+def _executar_concorrente(datas):
+    resultados = executar_extracoes({
+        "b3": (extracao_b3.extrair_dados_b3_lote_playwright, (datas,)),
+        "frp0": (extracao_b3.extrair_frp0, ()),
+        "dif_oper": (extracao_b3.extrair_dif_oper_casada_playwright, ()),
+    })
+    erros = sum(1 for resultado in resultados.values() if resultado.erro is not None)
+    if resultados["b3"].erro is None:
+        erros += sum(1 for resultado in resultados["b3"].valor.values() if resultado.erro is not None)
+    return erros
+
+
+def _obter_tudo(datas):
+    resultados = executar_extracoes({
+        "b3": (extracao_b3.obter_dados_b3_periodo, (datas,)),
+        "frp0": (extracao_b3.obter_frp0, ()),
+        "dif_oper": (extracao_b3.obter_dif_oper_casada, ()),
+    })
+    erros = sum(1 for resultado in resultados.values() if resultado.erro is not None)
+    if resultados["b3"].erro is None:
+        erros += sum(1 for resultado in resultados["b3"].valor.values() if resultado.erro is not None)
+    return erros
+
+
+def _executar_armazem(datas):
+    limpar_cache()
+    return _obter_tudo(datas)
+
+
+EXECUCOES = {
+    "sequencial": _executar_sequencial,
+    "concorrente": _executar_concorrente,
+    "armazem": _executar_armazem,
+    "cache": _obter_tudo,
+}
+
+
+# --- Medição ---
+
+class AmostradorMemoria(threading.Thread):
+    """Guarda o pico de memória residente do processo somada à dos navegadores."""
+
+    def __init__(self, intervalo=0.05):
+        super().__init__(name="amostrador-memoria", daemon=True)
+        self.intervalo = intervalo
+        self.pico_bytes = 0
+        self._parar = threading.Event()
+
+    def _memoria_atual(self):
+        try:
+            with open("/proc/self/statm") as arquivo:
+                proprio = int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            return 0
+        return proprio + (memoria_navegadores() or 0)
+
+    def run(self):
+        while not self._parar.is_set():
+            self.pico_bytes = max(self.pico_bytes, self._memoria_atual())
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        return self.pico_bytes
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank (suficiente para poucas repetições)."""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumir_etapas(amostras):
+    """{"fonte/etapa": {n, soma, p50}} a partir das amostras do módulo metricas."""
+    por_etapa = defaultdict(list)
+    for _, fonte, etapa, segundos in amostras:
+        por_etapa[f"{fonte}/{etapa}"].append(segundos)
+    return {
+        chave: {"n": len(valores), "soma": round(sum(valores), 4), "p50": round(percentil(valores, 50), 4)}
+        for chave, valores in sorted(por_etapa.items())
+    }
+
+
+def medir_modo(modo, datas, repeticoes):
+    """Executa o modo `repeticoes` vezes e resume tempos, etapas e memória."""
+    executar = EXECUCOES[modo]
+    if modo in ("armazem", "cache"):
+        # Preenche armazém e cache antes de medir
+        _obter_tudo(datas)
+
+    metricas._metricas = RegistroMetricas(arquivo="")
+    amostrador = AmostradorMemoria()
+    amostrador.start()
+    tempos = []
+    erros = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        erros += executar(datas)
+        tempos.append(time.perf_counter() - inicio)
+    pico_bytes = amostrador.parar()
+
+    mediana = percentil(tempos, 50)
+    return {
+        "tempos": [round(t, 4) for t in tempos],
+        "mediana": round(mediana, 4),
+        "p95": round(percentil(tempos, 95), 4),
+        "datas_por_segundo": round(len(datas) / mediana, 2) if mediana else None,
+        "erros": erros,
+        "pico_rss_mb": round(pico_bytes / 2**20, 1),
+        "etapas": resumir_etapas(metricas._metricas.amostras_recentes()),
+    }
+
+
+def conferir_capturas(dir_bruto):
+    """
+    Relê com os leitores atuais os payloads JSON reais do arquivo bruto (câmbio e
+    indicadores). Retorna {fonte: {"reconhecidos", "sem_registro", "nao_reconhecidos", "erros"}},
+    com até 5 exemplos de capturas não reconhecidas ou com erro por fonte.
+    """
+    arquivo = ArquivoBruto(dir_bruto)
+    resumo = {}
+    for fonte in ("b3_cambio", "b3_indicadores"):
+        contagem = {"reconhecidos": 0, "sem_registro": 0, "nao_reconhecidos": 0, "erros": 0, "exemplos": []}
+        for data_ref in arquivo.datas(fonte):
+            for registro in arquivo.capturas(fonte, data_ref):
+                if registro["tipo"] != "json":
+                    continue
+                try:
+                    tabelas = extracao_b3.reinterpretar_captura(fonte, "json", arquivo.ler(registro), data_ref)
+                except extracao_b3.SemRegistroB3:
+                    contagem["sem_registro"] += 1
+                    continue
+                except Exception as e:
+                    contagem["erros"] += 1
+                    situacao = f"erro: {e}"
+                else:
+                    if tabelas:
+                        contagem["reconhecidos"] += 1
+                        continue
+                    contagem["nao_reconhecidos"] += 1
+                    situacao = "não reconhecido"
+                if len(contagem["exemplos"]) < 5:
+                    contagem["exemplos"].append(f"{data_ref} {registro['capturado_em']}: {situacao}")
+        resumo[fonte] = contagem
+    return resumo
+
+
+def versao_codigo():
+    """Hash curto do commit atual (ou "desconhecida" fora de um repositório git)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+def comparar(atual, anterior):
+    """Imprime a variação da mediana de cada modo/quantidade em relação ao resultado anterior."""
+    print(f"\nComparação com a versão {anterior.get('versao', '?')}:")
+    print(f"{'modo/datas':<20} {'anterior (s)':>13} {'atual (s)':>10} {'variação':>9}")
+    for chave, resultado in atual["resultados"].items():
+        referencia = anterior.get("resultados", {}).get(chave)
+        if not referencia:
+            print(f"{chave:<20} {'-':>13} {resultado['mediana']:>10.3f} {'novo':>9}")
+            continue
+        variacao = (resultado["mediana"] / referencia["mediana"] - 1) * 100 if referencia["mediana"] else 0
+        print(f"{chave:<20} {referencia['mediana']:>13.3f} {resultado['mediana']:>10.3f} {variacao:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datas", type=int, nargs="+", default=[1, 3, 10], help="quantidades de dias úteis consultados")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--latencia-ms", type=float, default=80, help="latência simulada de cada requisição de dados")
+    parser.add_argument("--jitter-ms", type=float, default=40)
+    parser.add_argument("--taxa-falhas", type=float, default=0.0, help="fração das requisições respondidas com HTTP 503")
+    parser.add_argument("--saida", help="arquivo JSON para gravar os resultados")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparar as medianas")
+    parser.add_argument("--capturas", help="diretório de um arquivo bruto com payloads reais para conferir os leitores")
+    args = parser.parse_args()
+
+    capturas = None
+    if args.capturas:
+        capturas = conferir_capturas(args.capturas)
+        for fonte, contagem in capturas.items():
+            print(
+                f"Payloads reais de {fonte}: {contagem['reconhecidos']} reconhecidos, {contagem['sem_registro']} sem registro, "
+                f"{contagem['nao_reconhecidos']} não reconhecidos, {contagem['erros']} com erro"
+            )
+            for exemplo in contagem["exemplos"]:
+                print(f"    {exemplo}")
+
+    servidor = ServidorSimulado(0, args.latencia_ms, args.jitter_ms, args.taxa_falhas).iniciar_em_segundo_plano()
+    for nome, url in servidor.urls_extracao().items():
+        setattr(extracao_b3, nome, url)
+    print(f"Servidor simulado em {servidor.url_base} (payloads sintéticos); armazém em {os.environ['TCAM_DIR_ARMAZEM']}")
+
+    # Aquecimento: sobe os navegadores do pool e alimenta as latências das fontes
+    inicio = time.perf_counter()
+    _executar_concorrente([d.strftime("%d/%m/%Y") for d in dias_uteis_anteriores(date.today(), 1)])
+    print(f"Aquecimento: {time.perf_counter() - inicio:.2f}s")
+
+    atual = {
+        "versao": versao_codigo(),
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        # Os tempos vêm do servidor simulado; só "capturas" reflete respostas reais da B3
+        "payloads": "sinteticos",
+        "capturas": capturas,
+        "resultados": {},
+    }
+    try:
+        for quantidade in args.datas:
+            datas = [d.strftime("%d/%m/%Y") for d in dias_uteis_anteriores(date.today(), quantidade)]
+            for modo in args.modos:
+                resultado = medir_modo(modo, datas, args.repeticoes)
+                atual["resultados"][f"{modo}/{quantidade}"] = resultado
+                print(
+                    f"{modo:<12} {quantidade:>3} datas: mediana {resultado['mediana']:.3f}s  p95 {resultado['p95']:.3f}s  "
+                    f"{resultado['datas_por_segundo']} datas/s  pico {resultado['pico_rss_mb']} MB  erros {resultado['erros']}"
+                )
+    finally:
+        encerrar_pool()
+        servidor.shutdown()
+        servidor.server_close()
+
+    print(f"Requisições ao servidor simulado: {servidor.requisicoes}")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(atual, arquivo, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(atual, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compara o tempo de interpretação de uma página da B3 entre a leitura original
+(árvore completa com html.parser + find_all célula a célula) e a camada
+leitura_tabelas (lxml ou SoupStrainer), e confere que os resultados são iguais.
+
+Uso:
+    python benchmarks/bench_leitura_tabelas.py [--repeticoes 20] [--ruido 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import leitura_tabelas  # noqa: E402
+from extracao_b3 import COLUNAS_LIQUIDO, COLUNAS_TCAM, COLUNAS_VOLUME, interpretar_html_b3, montar_dados_b3  # noqa: E402
+
+
+def gerar_pagina_b3(linhas_ruido=2000):
+    """Página sintética no formato da B3: as três tabelas cercadas de marcação irrelevante."""
+    ruido = "".join(
+        f'<div class="card"><span>item {i}</span><a href="#l{i}">link</a><p>texto de exemplo {i}</p></div>'
+        for i in range(linhas_ruido)
+    )
+    cabecalho = lambda colunas: "<thead><tr>" + "".join(f"<th>{c}</th>" for c in colunas) + "</tr></thead>"
+    tcam = (
+        '<table id="ratesTable">' + cabecalho(COLUNAS_TCAM) + "<tbody>"
+        + "<tr><td>10/06/2024</td>" + "".join(f"<td>5,{4321 + i}</td>" for i in range(7)) + "</tr>"
+        + "</tbody></table>"
+    )
+    volume = (
+        '<table id="contractedVolume">' + cabecalho(COLUNAS_VOLUME) + "<tbody>"
+        + "<tr><td>10/06/2024</td>" + "".join(f"<td>1.234.{i:03d},56</td>" for i in range(9)) + "</tr>"
+        + "</tbody><tfoot><tr>" + "".join(f"<th>T{i}</th>" for i in range(10)) + "</tr></tfoot></table>"
+    )
+    liquido = (
+        '<table id="nettingTable">' + cabecalho(COLUNAS_LIQUIDO) + "<tbody>"
+        + "<tr><td>12/06/2024</td><td>987.654,32</td><td>5.358.024,12</td></tr>"
+        + "</tbody></table>"
+    )
+    return f"<html><head><title>B3</title></head><body>{ruido}{tcam}{volume}{liquido}{ruido}</body></html>"
+
+
+def interpretar_original(content):
+    """Leitura como era feita antes de leitura_tabelas (só as células em texto, sem tipagem)."""
+    soup = BeautifulSoup(content, "html.parser")
+    soup.find("div", string=lambda text: text and "Não há registro" in text)
+    resultado = {}
+    for id_tabela in ("ratesTable", "contractedVolume", "nettingTable"):
+        tabela = soup.find("table", {"id": id_tabela})
+        linhas = tabela.find_all("tr")
+        start_row = 1 if linhas and linhas[0].find("th") else 0
+        dados = [[td.text.strip() for td in linha.find_all("td")] for linha in linhas[start_row:]]
+        dados = [cols for cols in dados if cols]
+        tfoot = tabela.find("tfoot")
+        if tfoot:
+            dados.append([th.text.strip() for th in tfoot.find_all("th")])
+        resultado[id_tabela] = dados
+    return resultado
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--ruido", type=int, default=2000, help="Quantidade de blocos de marcação irrelevante.")
+    args = parser.parse_args()
+
+    pagina = gerar_pagina_b3(args.ruido)
+    print(f"Página sintética: {len(pagina) / 1024:.0f} KiB")
+
+    # Conferência: as duas leituras, depois de tipadas, devem produzir as mesmas tabelas.
+    original = interpretar_original(pagina)
+    esperado = montar_dados_b3(
+        None,
+        pd.DataFrame(original["contractedVolume"], columns=COLUNAS_VOLUME),
+        pd.DataFrame(original["nettingTable"], columns=COLUNAS_LIQUIDO),
+    )
+    dados = interpretar_html_b3(pagina, "10/06/2024")
+    pd.testing.assert_frame_equal(dados.volume, esperado.volume)
+    pd.testing.assert_frame_equal(dados.total_volume, esperado.total_volume)
+    pd.testing.assert_frame_equal(dados.liquido, esperado.liquido)
+
+    resultados = {"original (html.parser, árvore completa)": medir(lambda: interpretar_original(pagina), args.repeticoes)}
+
+    lxml_modulo = leitura_tabelas._lxml()
+    if lxml_modulo is not None:
+        resultados["leitura_tabelas (lxml)"] = medir(lambda: interpretar_html_b3(pagina, "10/06/2024"), args.repeticoes)
+    leitura_tabelas._lxml_html = None
+    try:
+        resultados["leitura_tabelas (html.parser + SoupStrainer)"] = medir(
+            lambda: interpretar_html_b3(pagina, "10/06/2024"), args.repeticoes
+        )
+    finally:
+        leitura_tabelas._lxml_html = lxml_modulo
+
+    referencia = resultados["original (html.parser, árvore completa)"]
+    print(pd.DataFrame({
+        "mediana (ms)": {nome: tempo * 1000 for nome, tempo in resultados.items()},
+        "ganho": {nome: referencia / tempo for nome, tempo in resultados.items()},
+    }).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
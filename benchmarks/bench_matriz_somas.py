@@ -0,0 +1,106 @@
+"""
+Compara o tempo das somas TCAM + indicador entre a montagem original (dois
+DataFrames por data, com soma e formatação célula a célula) e a matriz
+vetorizada de matriz_somas, para várias quantidades de datas e de indicadores
+(ex.: todos os vencimentos da curva de FRP), e confere que as somas são iguais.
+O tempo da matriz não inclui a formatação, que o Styler de formatar_br aplica
+por coluna só na exibição.
+
+Uso:
+    python benchmarks/bench_matriz_somas.py [--datas 3 60 500] [--indicadores 2 12] [--repeticoes 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matriz_somas import ESTATISTICAS_TCAM, calcular_matriz_somas, coluna_soma  # noqa: E402
+
+
+def gerar_tcam(quantidade_datas):
+    """TCAM tipada sintética, uma linha por data, como a de combinar_dados_b3."""
+    rng = np.random.default_rng(0)
+    base = 5300 + rng.normal(0, 50, quantidade_datas)
+    return pd.DataFrame({
+        "Data": pd.bdate_range(end="2024-06-10", periods=quantidade_datas),
+        "Fechamento": base.round(1),
+        "Mínima": (base - 20).round(1),
+        "Média": (base - 5).round(1),
+        "Máxima": (base + 15).round(1),
+    })
+
+
+def gerar_indicadores(quantidade):
+    """Curva sintética: FRP0, FRP1, ... com pontos crescentes."""
+    return {f"FRP{i}": round(5.3 + 0.45 * i, 3) for i in range(quantidade)}
+
+
+def _formatar_original(valor):
+    return f"{valor:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def somas_original(df_tcam, indicadores):
+    """Como a página montava os cards: por data e por indicador, uma tabela com cada célula somada e formatada."""
+    tabelas = []
+    for _, linha in df_tcam.iterrows():
+        valores_tcam = [linha[coluna] for coluna in ESTATISTICAS_TCAM]
+        for nome, valor in indicadores.items():
+            tabelas.append(pd.DataFrame({
+                "Indicador": list(ESTATISTICAS_TCAM.values()),
+                "TCAM (Balcão)": [_formatar_original(v) for v in valores_tcam],
+                nome: [str(valor)] * len(valores_tcam),
+                f"Soma (TCAM + {nome})": [_formatar_original(v + valor) for v in valores_tcam],
+            }))
+    return tabelas
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return sorted(tempos)[len(tempos) // 2]
+
+
+def conferir(df_tcam, indicadores):
+    """As somas da matriz, formatadas, batem com as da montagem original."""
+    matriz = calcular_matriz_somas(df_tcam, indicadores)
+    tabelas = iter(somas_original(df_tcam, indicadores))
+    for data_ref in df_tcam["Data"]:
+        somas_data = matriz.xs(data_ref, level=0)
+        for nome in indicadores:
+            esperado = next(tabelas)[f"Soma (TCAM + {nome})"].tolist()
+            obtido = [_formatar_original(v) for v in somas_data[coluna_soma(nome)]]
+            if obtido != esperado:
+                raise AssertionError(f"Somas diferentes em {data_ref:%d/%m/%Y}, {nome}: {obtido} != {esperado}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datas", type=int, nargs="+", default=[3, 60, 500])
+    parser.add_argument("--indicadores", type=int, nargs="+", default=[2, 12])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'datas':>6} {'indicadores':>12} {'original (ms)':>14} {'matriz (ms)':>12} {'ganho':>8}")
+    for quantidade_datas in args.datas:
+        df_tcam = gerar_tcam(quantidade_datas)
+        for quantidade_indicadores in args.indicadores:
+            indicadores = gerar_indicadores(quantidade_indicadores)
+            conferir(df_tcam, indicadores)
+            original = medir(lambda: somas_original(df_tcam, indicadores), args.repeticoes)
+            matriz = medir(lambda: calcular_matriz_somas(df_tcam, indicadores), args.repeticoes)
+            print(
+                f"{quantidade_datas:>6} {quantidade_indicadores:>12} {original * 1000:>14.2f} "
+                f"{matriz * 1000:>12.3f} {original / matriz:>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
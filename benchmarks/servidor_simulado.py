@@ -0,0 +1,225 @@
+"""
+Servidor HTTP local que imita as páginas da B3 e da BMF usadas pela extração,
+a partir dos arquivos em benchmarks/fixtures, para medir o pipeline completo
+(Chromium, XHR, leitura e montagem dos DataFrames) sem depender da rede.
+
+Rotas:
+    /historicalForeignExchangePage/retroactive   página de câmbio (SPA) + /api/cambio?data=dd/mm/aaaa
+    /financialIndicatorsPage/                    indicadores financeiros (SPA) + /api/indicadores
+    /boletim?Data=dd/mm/aaaa&Mercadoria=FRP      boletim FRP0 renderizado no servidor (Latin-1)
+    /static/*                                    CSS, imagens e fontes (o que o modo enxuto bloqueia)
+
+Os valores variam de forma determinística com a data consultada, e datas que não
+são dias úteis da B3 devolvem listas vazias (a página mostra "Não há registro").
+
+Os payloads JSON (cambio_retroativo.json, indicadores_financeiros.json) são
+sintéticos: imitam a estrutura das tabelas da página, não foram gravados da B3.
+Servem para medir o pipeline; a conferência dos leitores com respostas reais é
+feita com as capturas do arquivo bruto (bench_extracao.py --capturas).
+
+Uso:
+    python benchmarks/servidor_simulado.py [--porta 8765] [--latencia-ms 80] [--jitter-ms 40] [--taxa-falhas 0.05]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendario_b3 import eh_dia_util  # noqa: E402
+
+DIR_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# PNG 1x1 transparente, servido para todas as imagens.
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+_ESTATICOS = {
+    ".css": ("text/css", b"body{font-family:sans-serif}" * 200),
+    ".png": ("image/png", _PNG),
+    ".woff2": ("font/woff2", bytes(20000)),
+}
+
+
+def _ler_fixture(nome):
+    with open(os.path.join(DIR_FIXTURES, nome), encoding="utf-8") as arquivo:
+        return arquivo.read()
+
+
+def _menu(itens):
+    """Marcação de navegação sem dados, para as páginas terem o peso das originais."""
+    return "".join(f'<a href="#secao{i}">Seção {i}</a>' for i in range(itens))
+
+
+def _fator(data_desejada):
+    """Perturbação determinística (±2%) derivada da data, para cada data ter valores próprios."""
+    return 1 + ((zlib.crc32(data_desejada.encode()) % 4001) - 2000) / 100000
+
+
+def _br(valor, casas):
+    return f"{valor:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+class FixturesB3:
+    """Páginas e payloads montados a partir dos fixtures, com os valores da data pedida."""
+
+    def __init__(self, itens_menu=300):
+        menu = _menu(itens_menu)
+        self.pagina_cambio = _ler_fixture("cambio_retroativo.html").replace("__MENU__", menu).encode("utf-8")
+        self.pagina_indicadores = _ler_fixture("indicadores_financeiros.html").replace("__MENU__", menu).encode("utf-8")
+        self.boletim_frp = _ler_fixture("boletim_frp.html").replace("__MENU__", menu)
+        self.payload_cambio = json.loads(_ler_fixture("cambio_retroativo.json"))
+        self.payload_indicadores = _ler_fixture("indicadores_financeiros.json").encode("utf-8")
+
+    def cambio(self, data_desejada):
+        """Payload do câmbio para a data (dd/mm/aaaa); listas vazias se não houver pregão."""
+        try:
+            data_ref = datetime.strptime(data_desejada, "%d/%m/%Y").date()
+        except ValueError:
+            data_ref = None
+        payload = copy.deepcopy(self.payload_cambio)
+        if data_ref is None or not eh_dia_util(data_ref):
+            payload.update(taxas=[], volumes=[], liquidacoes=[], totalVolume={})
+            return json.dumps(payload).encode("utf-8")
+
+        fator = _fator(data_desejada)
+        for registro in payload["taxas"] + payload["volumes"]:
+            registro["data"] = data_ref.isoformat()
+        grupos = ((payload["taxas"], 4), (payload["volumes"] + payload["liquidacoes"] + [payload["totalVolume"]], 2))
+        for registros, casas in grupos:
+            for registro in registros:
+                for campo, valor in registro.items():
+                    if isinstance(valor, float):
+                        registro[campo] = round(valor * fator, casas)
+        return json.dumps(payload).encode("utf-8")
+
+    def frp0(self, data_desejada):
+        """Boletim FRP0 em Latin-1, com os valores da data."""
+        fator = _fator(data_desejada or "")
+        valores = {
+            "__ABERTURA__": 5.25, "__MINIMO__": 5.10, "__MAXIMO__": 5.40, "__MEDIO__": 5.27,
+            "__ULTIMO__": 5.30, "__COMPRA__": 5.28, "__VENDA__": 5.32,
+        }
+        html = self.boletim_frp.replace("__DATA__", data_desejada or "")
+        for marcador, valor in valores.items():
+            html = html.replace(marcador, _br(valor * fator, 3))
+        return html.encode("latin-1")
+
+
+class ManipuladorSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo, tipo):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _simular_rede(self):
+        """Aplica a latência configurada e decide se a requisição falha (HTTP 503)."""
+        servidor = self.server
+        if servidor.latencia_ms or servidor.jitter_ms:
+            atraso = servidor.latencia_ms + random.uniform(-servidor.jitter_ms, servidor.jitter_ms)
+            time.sleep(max(0.0, atraso) / 1000)
+        return random.random() < servidor.taxa_falhas
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        fixtures = self.server.fixtures
+        self.server.contar_requisicao(url.path)
+
+        if url.path.startswith("/static/"):
+            tipo, corpo = _ESTATICOS.get(os.path.splitext(url.path)[1], ("application/octet-stream", b""))
+            self._responder(200, corpo, tipo)
+            return
+
+        if self._simular_rede():
+            self._responder(503, b"Service Unavailable", "text/plain")
+            return
+
+        if url.path == "/historicalForeignExchangePage/retroactive":
+            self._responder(200, fixtures.pagina_cambio, "text/html; charset=utf-8")
+        elif url.path == "/api/cambio":
+            self._responder(200, fixtures.cambio(parametros.get("data", "")), "application/json")
+        elif url.path == "/financialIndicatorsPage/":
+            self._responder(200, fixtures.pagina_indicadores, "text/html; charset=utf-8")
+        elif url.path == "/api/indicadores":
+            self._responder(200, fixtures.payload_indicadores, "application/json")
+        elif url.path == "/boletim":
+            self._responder(200, fixtures.frp0(parametros.get("Data", "")), "text/html; charset=iso-8859-1")
+        else:
+            self._responder(404, b"Not Found", "text/plain")
+
+
+class ServidorSimulado(ThreadingHTTPServer):
+    """Servidor dos fixtures com latência, jitter e taxa de falhas configuráveis."""
+
+    daemon_threads = True
+
+    def __init__(self, porta=0, latencia_ms=0, jitter_ms=0, taxa_falhas=0.0, itens_menu=300):
+        super().__init__(("127.0.0.1", porta), ManipuladorSimulado)
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_falhas = taxa_falhas
+        self.fixtures = FixturesB3(itens_menu)
+        self.requisicoes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def contar_requisicao(self, caminho):
+        chave = "/static/" if caminho.startswith("/static/") else caminho
+        with self._lock:
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+
+    def urls_extracao(self):
+        """URLs equivalentes a URL_B3_CAMBIO, URL_BMF_FRP e URL_B3_INDICADORES de extracao_b3."""
+        return {
+            "URL_B3_CAMBIO": f"{self.url_base}/historicalForeignExchangePage/retroactive",
+            "URL_BMF_FRP": f"{self.url_base}/boletim?pagetype=pop&Data={{data}}&Mercadoria=FRP",
+            "URL_B3_INDICADORES": f"{self.url_base}/financialIndicatorsPage/?language=pt-br",
+        }
+
+    def iniciar_em_segundo_plano(self):
+        threading.Thread(target=self.serve_forever, name="servidor-simulado", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--taxa-falhas", type=float, default=0.0, help="fração das requisições respondidas com HTTP 503")
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(args.porta, args.latencia_ms, args.jitter_ms, args.taxa_falhas)
+    for nome, url in servidor.urls_extracao().items():
+        print(f"{nome}: {url}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
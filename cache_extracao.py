@@ -0,0 +1,96 @@
+"""
+Cache em memória dos resultados das extrações, compartilhado por todas as
+sessões do processo.
+
+As tabelas da B3 de uma data já encerrada não mudam depois de publicadas, então
+ficam em cache sem expiração. Indicadores do dia (FRP0, DIF OPER CASADA) e
+consultas que voltaram vazias expiram após um TTL curto.
+"""
+import functools
+import os
+import threading
+import time
+
+from metricas import contar
+
+TTL_INDICADORES = float(os.environ.get("TCAM_CACHE_TTL_INDICADORES", "300"))  # segundos
+TTL_SEM_DADOS = float(os.environ.get("TCAM_CACHE_TTL_SEM_DADOS", "300"))  # segundos
+# Leituras dos snapshots gravados pela coleta em segundo plano (agendador.py)
+TTL_SNAPSHOT = float(os.environ.get("TCAM_CACHE_TTL_SNAPSHOT", "30"))  # segundos
+
+
+class CacheResultados:
+    """Dicionário protegido por lock, com expiração opcional por item."""
+
+    def __init__(self):
+        self._itens = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        """Retorna (encontrado, valor) para a chave, descartando itens expirados."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return False, None
+            valor, expira_em = item
+            if expira_em is not None and time.monotonic() >= expira_em:
+                del self._itens[chave]
+                return False, None
+            return True, valor
+
+    def guardar(self, chave, valor, ttl=None):
+        """Guarda o valor; ttl=None significa que o item nunca expira."""
+        expira_em = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+
+    def limpar(self, fonte=None):
+        """Remove todos os itens, ou apenas os da fonte informada."""
+        with self._lock:
+            if fonte is None:
+                self._itens.clear()
+            else:
+                for chave in [c for c in self._itens if c[0] == fonte]:
+                    del self._itens[chave]
+
+
+_cache = CacheResultados()
+
+
+def em_cache(fonte, ttl):
+    """
+    Decorador que guarda o retorno da função no cache do processo, com chave
+    (fonte, *args). `ttl` pode ser um número de segundos, None (sem expiração)
+    ou uma função (args, valor) -> ttl, para decidir por resultado.
+    Exceções não são guardadas. A função original fica em `__wrapped__`.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args):
+            chave = (fonte, *args)
+            encontrado, valor = _cache.obter(chave)
+            contar("cache_acertos" if encontrado else "cache_falhas", fonte)
+            if encontrado:
+                return valor
+            valor = funcao(*args)
+            _cache.guardar(chave, valor, ttl(args, valor) if callable(ttl) else ttl)
+            return valor
+        return envoltorio
+    return decorador
+
+
+def consultar_cache(fonte, *args):
+    """Retorna (encontrado, valor) do item (fonte, *args), para leituras em lote fora de em_cache."""
+    encontrado, valor = _cache.obter((fonte, *args))
+    contar("cache_acertos" if encontrado else "cache_falhas", fonte)
+    return encontrado, valor
+
+
+def guardar_em_cache(fonte, args, valor, ttl):
+    """Guarda o valor com a mesma chave usada por em_cache(fonte, ...) para `args`."""
+    _cache.guardar((fonte, *args), valor, ttl(args, valor) if callable(ttl) else ttl)
+
+
+def limpar_cache(fonte=None):
+    """Descarta o cache (controle "atualizar agora" da página)."""
+    _cache.limpar(fonte)
@@ -0,0 +1,109 @@
+"""
+Calendário de dias úteis da B3 para o mercado de câmbio.
+
+Os feriados nacionais (fixos e móveis, calculados a partir da Páscoa) e os dias
+sem pregão da B3 (24/12 e 31/12) são pré-calculados uma única vez na importação.
+Os dias úteis ficam em uma lista ordenada de ordinais, de modo que "os N dias
+úteis anteriores" é uma busca binária seguida de um fatiamento.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+ANO_INICIAL = 2000
+ANO_FINAL = 2100
+
+# (mês, dia) dos feriados nacionais de data fixa
+FERIADOS_FIXOS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+]
+# Dias sem pregão na B3, embora não sejam feriados nacionais
+DIAS_SEM_PREGAO = [(12, 24), (12, 31)]
+# Dia Nacional de Zumbi e da Consciência Negra: feriado nacional a partir de 2024 (Lei 14.759/2023)
+ANO_INICIO_CONSCIENCIA_NEGRA = 2024
+
+
+def calcular_pascoa(ano):
+    """Domingo de Páscoa pelo algoritmo de Meeus/Jones/Butcher (calendário gregoriano)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_do_ano(ano):
+    """Conjunto de datas sem negociação de câmbio na B3 no ano."""
+    pascoa = calcular_pascoa(ano)
+    feriados = {date(ano, mes, dia) for mes, dia in FERIADOS_FIXOS + DIAS_SEM_PREGAO}
+    feriados.update({
+        pascoa - timedelta(days=48),  # Segunda-feira de Carnaval
+        pascoa - timedelta(days=47),  # Terça-feira de Carnaval
+        pascoa - timedelta(days=2),   # Sexta-feira Santa
+        pascoa + timedelta(days=60),  # Corpus Christi
+    })
+    if ano >= ANO_INICIO_CONSCIENCIA_NEGRA:
+        feriados.add(date(ano, 11, 20))
+    return feriados
+
+
+def _precalcular_dias_uteis():
+    feriados = set()
+    for ano in range(ANO_INICIAL, ANO_FINAL + 1):
+        feriados.update(feriados_do_ano(ano))
+    dias_uteis = []
+    for ordinal in range(date(ANO_INICIAL, 1, 1).toordinal(), date(ANO_FINAL, 12, 31).toordinal() + 1):
+        dia = date.fromordinal(ordinal)
+        if dia.weekday() < 5 and dia not in feriados:
+            dias_uteis.append(ordinal)
+    return feriados, dias_uteis
+
+
+FERIADOS, _ORDINAIS_DIAS_UTEIS = _precalcular_dias_uteis()
+_CONJUNTO_DIAS_UTEIS = frozenset(_ORDINAIS_DIAS_UTEIS)
+
+
+def _como_data(data_ref):
+    return data_ref.date() if isinstance(data_ref, datetime) else data_ref
+
+
+def eh_dia_util(data_ref):
+    """Indica se há negociação de câmbio na B3 na data."""
+    return _como_data(data_ref).toordinal() in _CONJUNTO_DIAS_UTEIS
+
+
+def dias_uteis_anteriores(data_ref, quantidade):
+    """
+    Os `quantidade` dias úteis estritamente anteriores à data, do mais recente
+    para o mais antigo.
+    """
+    posicao = bisect_left(_ORDINAIS_DIAS_UTEIS, _como_data(data_ref).toordinal())
+    inicio = max(0, posicao - quantidade)
+    return [date.fromordinal(ordinal) for ordinal in reversed(_ORDINAIS_DIAS_UTEIS[inicio:posicao])]
+
+
+def dia_util_anterior(data_ref):
+    """Último dia útil estritamente anterior à data."""
+    return dias_uteis_anteriores(data_ref, 1)[0]
+
+
+def obter_data_util_para_consulta(hoje=None):
+    """
+    Retorna a data útil para consulta (dd/mm/aaaa): o último dia útil anterior
+    a hoje, considerando fins de semana e feriados.
+    """
+    if hoje is None:
+        hoje = datetime.today()
+    return dia_util_anterior(hoje).strftime("%d/%m/%Y")
@@ -0,0 +1,102 @@
+"""
+Esquema tipado das tabelas extraídas.
+
+As páginas trazem números no padrão brasileiro ("1.234.567,89") e datas em
+dd/mm/aaaa. Aqui cada coluna é convertida de uma vez, com operações de string
+vetorizadas do pandas, para float64, Int64 (inteiro com ausentes) e datetime64.
+A formatação de volta para o padrão brasileiro fica só na exibição.
+"""
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+DATA = "data"
+DECIMAL = "decimal"
+INTEIRO = "inteiro"
+
+ESQUEMA_VOLUME = {
+    "Data": DATA,
+    "US$ Balcão": DECIMAL, "R$ Balcão": DECIMAL, "Negócios Balcão": INTEIRO,
+    "US$ Pregão": DECIMAL, "R$ Pregão": DECIMAL, "Negócios Pregão": INTEIRO,
+    "US$ Total": DECIMAL, "R$ Total": DECIMAL, "Negócios Total": INTEIRO,
+}
+ESQUEMA_LIQUIDO = {"Data": DATA, "US$": DECIMAL, "R$": DECIMAL}
+ESQUEMA_FRP = {
+    "Abertura": DECIMAL, "Mínimo": DECIMAL, "Máximo": DECIMAL, "Médio": DECIMAL,
+    "Último Preço": DECIMAL, "Últ. Of. Compra": DECIMAL, "Últ. Of. Venda": DECIMAL,
+}
+
+
+def converter_numero_br(serie):
+    """Converte "1.234.567,89" em 1234567.89 (float64); textos inválidos viram NaN."""
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    texto = serie.astype(str).str.strip().str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def converter_inteiro_br(serie):
+    """Converte "1.234" em 1234 (Int64, que aceita valores ausentes)."""
+    return converter_numero_br(serie).round().astype("Int64")
+
+
+def converter_tcam(serie):
+    """
+    Equivalente vetorizado de tratar_valor_tcam_original: mantém só os dígitos e
+    considera o último como casa decimal ("5,4321" -> 5432.1). Vazios viram 0.0.
+    """
+    if is_numeric_dtype(serie):
+        return serie.astype("float64")
+    digitos = serie.astype(str).str.replace(r"\D", "", regex=True)
+    valores = pd.to_numeric(digitos.str[:-1] + "." + digitos.str[-1:], errors="coerce")
+    return valores.fillna(0.0).astype("float64")
+
+
+def converter_data(serie):
+    """Converte datas dd/mm/aaaa (ou objetos date) para datetime64; inválidas viram NaT."""
+    if is_datetime64_any_dtype(serie):
+        return serie
+    if serie.map(lambda v: isinstance(v, str)).all():
+        return pd.to_datetime(serie.str.strip(), format="%d/%m/%Y", errors="coerce")
+    return pd.to_datetime(serie, errors="coerce")
+
+
+_CONVERSORES = {DATA: converter_data, DECIMAL: converter_numero_br, INTEIRO: converter_inteiro_br}
+
+
+def tipar(df, esquema):
+    """Retorna uma cópia do DataFrame com as colunas do esquema convertidas."""
+    df = df.copy()
+    for coluna, tipo in esquema.items():
+        if coluna in df.columns:
+            df[coluna] = _CONVERSORES[tipo](df[coluna])
+    return df
+
+
+def separar_total(df, coluna_data="Data"):
+    """
+    Separa a linha de total (a do <tfoot>, cuja "data" não é uma data) das linhas
+    de dados. O DataFrame já deve estar tipado. Retorna (linhas, total).
+    """
+    sem_data = df[coluna_data].isna()
+    return df[~sem_data].reset_index(drop=True), df[sem_data].reset_index(drop=True)
+
+
+def formatar_br(df, casas=2, casas_por_coluna=None, ausentes=None):
+    """
+    Styler para exibição: números no padrão brasileiro (vírgula decimal, ponto de
+    milhar) e datas em dd/mm/aaaa, formatados por coluna a partir dos valores tipados.
+    `casas_por_coluna` ({coluna: casas}) muda as casas decimais de algumas colunas
+    e `ausentes` ({coluna: texto}) o que é exibido no lugar de valores ausentes.
+    """
+    casas_por_coluna = casas_por_coluna or {}
+    ausentes = ausentes or {}
+    estilo = df.style.format(precision=casas, decimal=",", thousands=".", na_rep="")
+    for coluna in dict.fromkeys([*casas_por_coluna, *ausentes]):
+        estilo = estilo.format(
+            precision=casas_por_coluna.get(coluna, casas), decimal=",", thousands=".",
+            na_rep=ausentes.get(coluna, ""), subset=[coluna],
+        )
+    colunas_data = [coluna for coluna in df.columns if is_datetime64_any_dtype(df[coluna])]
+    if colunas_data:
+        estilo = estilo.format("{:%d/%m/%Y}", subset=colunas_data, na_rep="")
+    return estilo
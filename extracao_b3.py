@@ -0,0 +1,1320 @@
+"""
+Extração dos dados da B3 e da BMF (TCAM, volume, valores liquidados, FRP0 e
+DIF OPER CASADA).
+
+Este módulo não chama o Streamlit: as extrações podem rodar em threads
+trabalhadoras, fora do contexto da página. Erros inesperados são propagados
+para o chamador, que decide como exibi-los.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from math import ceil
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+
+from armazem_historico import obter_armazem
+from arquivo_bruto import arquivar
+from calendario_b3 import dia_util_anterior, eh_dia_util
+from cache_extracao import TTL_INDICADORES, TTL_SEM_DADOS, TTL_SNAPSHOT, consultar_cache, em_cache, guardar_em_cache
+from esquema_tabelas import (
+    ESQUEMA_FRP,
+    ESQUEMA_LIQUIDO,
+    ESQUEMA_VOLUME,
+    converter_data,
+    converter_tcam,
+    separar_total,
+    tipar,
+)
+from latencia_fontes import registrar_estouro, registrar_latencia, serie_latencia, timeout_adaptativo_ms
+from metricas import contar, medir, observar
+from leitura_tabelas import (
+    ATRIBUTO_MENSAGEM_ANTERIOR,
+    TEXTO_SEM_REGISTRO,
+    ler_indicador,
+    ler_linha_tabela,
+    ler_tabelas,
+    tem_mensagem_sem_registro,
+)
+from motor_extracao import ResultadoExtracao
+from pool_navegador import (
+    PRIORIDADE_DATAS_ANTERIORES,
+    PRIORIDADE_INDICADORES,
+    PRIORIDADE_TCAM01,
+    TAMANHO_POOL,
+    obter_pool,
+)
+from resiliencia import (
+    FalhaTransitoria,
+    PrazoEsgotado,
+    ValorDesatualizado,
+    eh_transitoria,
+    executar_com_resiliencia,
+    limitar_ao_prazo_ms,
+    tempo_restante,
+)
+from voo_unico import executar_uma_vez, executar_uma_vez_em_lote
+
+
+# Tabelas de uma data da B3, já tipadas. total_volume é a linha de total do volume contratado.
+DadosB3 = namedtuple("DadosB3", ["tcam", "volume", "liquido", "total_volume"])
+SEM_DADOS_B3 = DadosB3(None, None, None, None)
+# Sinal que venceu a corrida entre o payload JSON e o DOM ("json" ou "dom") e o valor lido.
+SinalRecebido = namedtuple("SinalRecebido", ["sinal", "valor"])
+# Coluna que identifica a data consultada nas tabelas de várias datas (combinar_dados_b3).
+COLUNA_DATA_CONSULTA = "Data Consulta"
+
+
+class SemRegistroB3(Exception):
+    """A página da B3 informou que não há registro para a data consultada."""
+
+    def __init__(self, data_desejada):
+        super().__init__(f"Não há registro de dados da B3 para a data {data_desejada}.")
+        self.data_desejada = data_desejada
+
+
+class SinalNaoRecebido(FalhaTransitoria):
+    """A página carregou, mas o sinal de dados da fonte (payload, tabela) não chegou a tempo."""
+
+    def __init__(self, fonte):
+        super().__init__(f"{fonte}: os dados não apareceram na página dentro do tempo limite.")
+        self.fonte = fonte
+
+
+class SemPrecoFRP0(Exception):
+    """O boletim da BMF não trouxe o último preço do FRP0 (dia sem negócios ou tabela ausente)."""
+
+    def __init__(self):
+        super().__init__("O boletim da BMF não trouxe o último preço do FRP0 (sem negócios no dia).")
+
+
+class SemSnapshot(Exception):
+    """A coleta em segundo plano ainda não gravou a data no armazém histórico."""
+
+    def __init__(self, data_desejada):
+        super().__init__(f"A data {data_desejada} ainda não foi coletada em segundo plano.")
+        self.data_desejada = data_desejada
+
+
+# --- Configuração das Fontes ---
+
+URL_B3_CAMBIO = "https://sistemaswebb3-clearing.b3.com.br/historicalForeignExchangePage/retroactive"
+URL_BMF_FRP = (
+    "https://www2.bmf.com.br/pages/portal/bmfbovespa/boletim1/"
+    "SistemaPregao1.asp?pagetype=pop&caminho=Resumo%20Estat%EDstico%20-%20Sistema%20Preg%E3o"
+    "&Data={data}&Mercadoria=FRP"
+)
+URL_B3_INDICADORES = "https://sistemaswebb3-derivativos.b3.com.br/financialIndicatorsPage/?language=pt-br"
+
+# "json": lê as respostas XHR das páginas da B3, em corrida com o DOM (vale o que chegar
+# primeiro); "dom": só o DOM.
+MODO_EXTRACAO = os.environ.get("TCAM_MODO_EXTRACAO", "json")
+# Na corrida, a espera pelo DOM devolve o controle a cada intervalo para ler os payloads novos.
+INTERVALO_CORRIDA_MS = 100
+TIMEOUT_HTTP = float(os.environ.get("TCAM_TIMEOUT_HTTP", "10"))  # segundos
+# Carregamento enxuto: recursos que não trazem dados e hosts de terceiros são abortados.
+PAGINA_ENXUTA = os.environ.get("TCAM_PAGINA_ENXUTA", "1") == "1"
+TIPOS_BLOQUEADOS = frozenset(
+    tipo.strip() for tipo in os.environ.get("TCAM_RECURSOS_BLOQUEADOS", "image,media,font,stylesheet").split(",") if tipo.strip()
+)
+HOSTS_PERMITIDOS = tuple(
+    host.strip() for host in os.environ.get("TCAM_HOSTS_PERMITIDOS", "b3.com.br,bmf.com.br").split(",") if host.strip()
+)
+# Máximo de datas consultadas em sequência na mesma página da B3 (reenviando o formulário).
+DATAS_POR_NAVEGACAO = max(1, int(os.environ.get("TCAM_DATAS_POR_NAVEGACAO", "10")))
+
+# Conexões HTTP reaproveitadas (keep-alive) para as páginas renderizadas no servidor,
+# criadas na primeira extração (leituras do cache e do armazém não importam o urllib3).
+_http = None
+_http_lock = threading.Lock()
+
+
+def _cliente_http():
+    global _http
+    with _http_lock:
+        if _http is None:
+            import urllib3
+
+            _http = urllib3.PoolManager(
+                maxsize=4,
+                block=False,
+                retries=False,
+                timeout=urllib3.Timeout(total=TIMEOUT_HTTP),
+                headers={"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"},
+            )
+        return _http
+
+
+COLUNAS_TCAM = ["Data", "Fechamento", "Min Balcão", "Média Balcão", "Máx Balcão", "Min Pregão", "Média Pregão", "Máx Pregão"]
+COLUNAS_VOLUME = ["Data", "US$ Balcão", "R$ Balcão", "Negócios Balcão", "US$ Pregão", "R$ Pregão", "Negócios Pregão", "US$ Total", "R$ Total", "Negócios Total"]
+COLUNAS_LIQUIDO = ["Data", "US$", "R$"]
+COLUNAS_FRP = ["Abertura", "Mínimo", "Máximo", "Médio", "Último Preço", "Últ. Of. Compra", "Últ. Of. Venda"]
+TEXTO_DIF_OPER = "DIF OPER CASADA - COMPRA"
+
+
+def url_frp0(data_desejada=None):
+    """URL do boletim FRP da BMF; sem data, a BMF devolve o último pregão."""
+    return URL_BMF_FRP.format(data=quote(data_desejada or "", safe="/"))
+
+
+def _data_referencia_frp0(data_desejada=None):
+    """Data da partição do FRP0 no armazém e no arquivo bruto: a consultada ou, sem data, hoje."""
+    return datetime.strptime(data_desejada, "%d/%m/%Y").date() if data_desejada else date.today()
+
+
+def _montar_df_tcam(df_tcam):
+    """Monta o DataFrame TCAM (colunas de Balcão tipadas) a partir da tabela em texto."""
+    df_tcam["Data"] = converter_data(df_tcam["Data"])
+    
+    for col in ["Fechamento", "Min Balcão", "Média Balcão", "Máx Balcão"]:
+        df_tcam[col] = converter_tcam(df_tcam[col])
+    
+    return df_tcam.drop(columns=["Min Pregão", "Média Pregão", "Máx Pregão"]).rename(columns={
+        "Min Balcão": "Mínima", "Média Balcão": "Média", "Máx Balcão": "Máxima"
+    })
+
+
+def montar_dados_b3(df_tcam, df_volume, df_liquido):
+    """
+    Aplica o esquema tipado às tabelas de uma data (em texto ou já tipadas) e
+    separa a linha de total do volume contratado. Retorna DadosB3.
+    """
+    df_volume = tipar(df_volume, ESQUEMA_VOLUME)
+    total_volume = pd.DataFrame()
+    if "Data" in df_volume.columns:
+        df_volume, total_volume = separar_total(df_volume)
+    return DadosB3(df_tcam, df_volume, tipar(df_liquido, ESQUEMA_LIQUIDO), total_volume)
+
+
+# --- Interpretação do HTML (DOM) ---
+# A leitura das tabelas fica em leitura_tabelas, que materializa só os elementos
+# de interesse e devolve as células agrupadas em colunas.
+
+def interpretar_html_b3(content, data_desejada):
+    """
+    Interpreta o HTML da página de câmbio histórico da B3.
+    Retorna DadosB3, ou SEM_DADOS_B3 se não houver TCAM.
+    """
+    with medir("b3_cambio", "leitura_html"):
+        # Verificar a mensagem de "Não há registro"
+        if tem_mensagem_sem_registro(content):
+            raise SemRegistroB3(data_desejada)
+
+        tabelas = ler_tabelas(content, {
+            "ratesTable": len(COLUNAS_TCAM),
+            "contractedVolume": len(COLUNAS_VOLUME),
+            "nettingTable": len(COLUNAS_LIQUIDO),
+        })
+
+    with medir("b3_cambio", "montar_dataframe"):
+        return _montar_dados_b3_html(tabelas)
+
+
+def _montar_dados_b3_html(tabelas):
+    """Monta DadosB3 a partir das tabelas lidas do HTML (TabelaLida por id)."""
+    # Extrair Taxas Praticadas (TCAM)
+    tabela_tcam = tabelas["ratesTable"]
+    if tabela_tcam is None or not tabela_tcam.colunas[0]:
+        return SEM_DADOS_B3
+    df_tcam = _montar_df_tcam(pd.DataFrame(dict(zip(COLUNAS_TCAM, tabela_tcam.colunas))))
+
+    # Extrair Volume Contratado (a linha de total do <tfoot> entra no final)
+    tabela_volume = tabelas["contractedVolume"]
+    df_volume = pd.DataFrame()
+    if tabela_volume is not None:
+        colunas_volume = tabela_volume.colunas
+        if len(tabela_volume.rodape) == len(COLUNAS_VOLUME):
+            colunas_volume = [coluna + [total] for coluna, total in zip(colunas_volume, tabela_volume.rodape)]
+        if colunas_volume[0]:
+            df_volume = pd.DataFrame(dict(zip(COLUNAS_VOLUME, colunas_volume)))
+
+    # Extrair Valores Liquidados
+    tabela_liquido = tabelas["nettingTable"]
+    df_liquido = pd.DataFrame()
+    if tabela_liquido is not None and tabela_liquido.colunas[0]:
+        df_liquido = pd.DataFrame(dict(zip(COLUNAS_LIQUIDO, tabela_liquido.colunas)))
+
+    return montar_dados_b3(df_tcam, df_volume, df_liquido)
+
+
+def interpretar_html_frp0(content):
+    """
+    Interpreta o HTML do boletim da BMF e retorna o DataFrame tipado do FRP0.
+    Vazio se a tabela não estiver na página; vazio, mas com as colunas, se a
+    linha vier sem último preço ("-" ou em branco, num dia sem negócios).
+    """
+    with medir("bmf_frp0", "leitura_html"):
+        valores = ler_linha_tabela(content, "MercadoFut2", "tabConteudo", 2)
+    if valores and len(valores) == len(COLUNAS_FRP):
+        with medir("bmf_frp0", "montar_dataframe"):
+            df_frp = tipar(pd.DataFrame([valores], columns=COLUNAS_FRP), ESQUEMA_FRP)
+        return df_frp[df_frp["Último Preço"].notna()].reset_index(drop=True)
+    return pd.DataFrame()
+
+
+def interpretar_html_dif_oper(content):
+    """Interpreta o HTML dos indicadores financeiros e retorna (valor, data_atualizacao)."""
+    with medir("b3_indicadores", "leitura_html"):
+        return ler_indicador(content, TEXTO_DIF_OPER)
+
+
+# --- Interpretação das respostas JSON (XHR) ---
+# As páginas da B3 são aplicações JavaScript que buscam os dados por XHR. No modo
+# "json" os DataFrames são montados direto desses payloads, sem esperar a
+# renderização nem serializar o DOM. A espera corre contra o DOM: quando o
+# payload não tem o formato esperado, vale o DOM, assim que ele é renderizado.
+
+def _listas_de_registros(payload):
+    """Percorre o JSON e devolve todas as listas não vazias compostas só de objetos."""
+    listas = []
+    pendentes = [payload]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, dict):
+            pendentes.extend(item.values())
+        elif isinstance(item, list):
+            if item and all(isinstance(registro, dict) for registro in item):
+                listas.append(item)
+            pendentes.extend(item)
+    return listas
+
+
+def _data_json(valor):
+    """Converte a data do payload (ISO ou dd/mm/aaaa) para date, ou None se não for data."""
+    if not isinstance(valor, str):
+        return None
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(valor[:10], formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+_RE_NUMERO_TEXTO = re.compile(r"^-?\d[\d.]*(,\d+)?$")
+
+
+def _numero_json(valor, casas):
+    """
+    Converte um valor numérico do payload para o texto no padrão brasileiro,
+    como aparece na tabela da página, ou None se não for numérico.
+    """
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return f"{valor:,}".replace(",", ".")
+    if isinstance(valor, float):
+        return f"{valor:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if isinstance(valor, str) and _RE_NUMERO_TEXTO.match(valor.strip()):
+        return valor.strip()
+    return None
+
+
+def _linhas_json(registros, quantidade_numeros, casas):
+    """
+    Converte registros cujo primeiro campo é uma data e os demais são exatamente
+    `quantidade_numeros` valores numéricos, na mesma ordem das colunas da tabela.
+    Retorna as linhas de texto ou None se algum registro não tiver esse formato.
+    """
+    linhas = []
+    for registro in registros:
+        valores = list(registro.values())
+        if len(valores) != quantidade_numeros + 1:
+            return None
+        data_registro = _data_json(valores[0])
+        numeros = [_numero_json(valor, casas) for valor in valores[1:]]
+        if data_registro is None or any(numero is None for numero in numeros):
+            return None
+        linhas.append([data_registro.strftime("%d/%m/%Y")] + numeros)
+    return linhas
+
+
+def _data_registro_json(registro):
+    """Indica se o objeto é um registro de tabela (tem algum campo de data)."""
+    return any(_data_json(valor) for valor in registro.values())
+
+
+def _linha_total_json(payload):
+    """
+    Linha de total do volume contratado (o <tfoot> da tabela no DOM): o objeto do
+    payload, fora das listas de registros, com exatamente os valores numéricos
+    das colunas de volume. Retorna a linha de texto, com "Total" no lugar da data, ou None.
+    """
+    pendentes = [payload]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, dict):
+            valores = list(item.values())
+            numeros = [_numero_json(valor, 2) for valor in valores]
+            if len(numeros) == len(COLUNAS_VOLUME) - 1 and all(numero is not None for numero in numeros):
+                return ["Total"] + numeros
+            pendentes.extend(valor for valor in valores if isinstance(valor, (dict, list)))
+        elif isinstance(item, list):
+            pendentes.extend(valor for valor in item if isinstance(valor, dict) and not _data_registro_json(valor))
+    return None
+
+
+# Chaves das listas das tabelas no payload da consulta, reconhecidas por trecho do nome (sem diferenciar maiúsculas).
+CHAVES_TABELAS_B3 = {"tcam": ("taxa", "rate"), "volume": ("volume",), "liquido": ("liquid", "netting")}
+
+
+def _payload_sem_registro(payload):
+    """
+    Resposta da consulta sem dados para a data: traz a mensagem de "Não há registro"
+    ou tem a lista da TCAM (pelo nome da chave) e todas as listas de tabelas vazias.
+    Listas vazias de outros XHRs da página não contam.
+    """
+    tabelas = {}
+    pendentes = [payload]
+    while pendentes:
+        item = pendentes.pop()
+        if isinstance(item, str) and TEXTO_SEM_REGISTRO in item:
+            return True
+        if isinstance(item, dict):
+            for chave, valor in item.items():
+                nome = next((
+                    nome for nome, trechos in CHAVES_TABELAS_B3.items()
+                    if isinstance(valor, list) and any(trecho in str(chave).lower() for trecho in trechos)
+                ), None)
+                if nome is not None:
+                    tabelas.setdefault(nome, []).extend(valor)
+            pendentes.extend(item.values())
+        elif isinstance(item, list):
+            pendentes.extend(item)
+    return "tcam" in tabelas and not any(tabelas.values())
+
+
+_TABELAS_JSON = (("tcam", COLUNAS_TCAM, 4), ("volume", COLUNAS_VOLUME, 2), ("liquido", COLUNAS_LIQUIDO, 2))
+# Tabelas cujas linhas têm a data consultada (a dos valores liquidados é a da liquidação).
+_TABELAS_DA_DATA = ("tcam", "volume")
+
+
+def _tabelas_json(payload):
+    """Tabelas de um payload ({"tcam" | "volume" | "liquido": linhas}), reconhecidas pela quantidade de colunas."""
+    tabelas = {}
+    for registros in _listas_de_registros(payload):
+        for nome, colunas, casas in _TABELAS_JSON:
+            if nome not in tabelas:
+                linhas = _linhas_json(registros, len(colunas) - 1, casas)
+                if linhas:
+                    tabelas[nome] = linhas
+                    break
+    return tabelas
+
+
+def interpretar_json_b3(payloads, data_desejada):
+    """
+    Monta DadosB3 a partir dos payloads JSON capturados,
+    reconhecendo cada tabela pela quantidade de colunas (8, 10 e 3, como no DOM)
+    e o total do volume contratado pelo objeto com os 9 valores das colunas.
+    Da TCAM e do volume só entram as linhas com a data consultada; um payload
+    cujas linhas são todas de outra data (resposta atrasada da consulta anterior
+    do lote, carga inicial da página) é descartado.
+    Retorna None se alguma das três tabelas não for encontrada.
+    Levanta SemRegistroB3 se a resposta da consulta veio sem dados.
+    """
+    data_consulta = datetime.strptime(data_desejada, "%d/%m/%Y").strftime("%d/%m/%Y")
+    tabelas = {}
+    total_volume = None
+    sem_registro = False
+    for payload in payloads:
+        encontradas = _tabelas_json(payload)
+        datadas = [nome for nome in _TABELAS_DA_DATA if nome in encontradas]
+        for nome in datadas:
+            encontradas[nome] = [linha for linha in encontradas[nome] if linha[0] == data_consulta]
+        if datadas and not any(encontradas[nome] for nome in datadas):
+            continue
+        for nome, linhas in encontradas.items():
+            if linhas:
+                tabelas.setdefault(nome, linhas)
+        if "volume" in encontradas and total_volume is None:
+            total_volume = _linha_total_json(payload)
+        sem_registro = sem_registro or (not encontradas and _payload_sem_registro(payload))
+    if "tcam" not in tabelas and sem_registro:
+        raise SemRegistroB3(data_desejada)
+    if len(tabelas) < 3:
+        return None
+    linhas_volume = tabelas["volume"] + ([total_volume] if total_volume else [])
+    return montar_dados_b3(
+        _montar_df_tcam(pd.DataFrame(tabelas["tcam"], columns=COLUNAS_TCAM)),
+        pd.DataFrame(linhas_volume, columns=COLUNAS_VOLUME),
+        pd.DataFrame(tabelas["liquido"], columns=COLUNAS_LIQUIDO),
+    )
+
+
+# Campos do objeto do indicador, reconhecidos pelo início do nome (sem diferenciar maiúsculas).
+CAMPOS_VALOR_INDICADOR = ("valor", "value", "vlr")
+CAMPOS_DATA_INDICADOR = ("atualiza", "data", "date", "update")
+
+
+def _campo_json(registro, prefixos):
+    """Valor do primeiro campo do registro cujo nome começa com um dos prefixos, ou None."""
+    return next((valor for chave, valor in registro.items() if chave.lower().startswith(prefixos)), None)
+
+
+def interpretar_json_dif_oper(payloads):
+    """
+    Procura nos payloads o objeto do indicador DIF OPER CASADA - COMPRA e lê o
+    valor e a data de atualização pelos nomes dos campos (não por posição, que
+    poderia trazer um id ou código numérico).
+    Retorna (valor, data_atualizacao) ou None se o indicador não estiver nos payloads.
+    """
+    for payload in payloads:
+        for registros in _listas_de_registros(payload):
+            for registro in registros:
+                textos = [v for v in registro.values() if isinstance(v, str)]
+                if not any(TEXTO_DIF_OPER in texto.upper() for texto in textos):
+                    continue
+                valor = _numero_json(_campo_json(registro, CAMPOS_VALOR_INDICADOR), 2)
+                data_registro = _data_json(_campo_json(registro, CAMPOS_DATA_INDICADOR))
+                if valor is not None:
+                    return valor, data_registro.strftime("%d/%m/%Y") if data_registro else ""
+    return None
+
+
+def _capturar_respostas_json(page):
+    """Registra as respostas XHR/fetch com JSON da página e devolve a lista que será preenchida."""
+    respostas = []
+
+    def guardar(resposta):
+        if resposta.request.resource_type in ("xhr", "fetch") and "json" in resposta.headers.get("content-type", ""):
+            respostas.append(resposta)
+
+    page.on("response", guardar)
+    return respostas
+
+
+def _aguardar_json_ou_dom(respostas, interpretar, esperar_dom, timeout_ms, fonte, corpos):
+    """
+    Corrida entre o payload JSON e o DOM: a cada INTERVALO_CORRIDA_MS as respostas
+    novas são lidas e `interpretar(payloads)` é tentado; entre uma leitura e outra,
+    `esperar_dom(timeout_ms)` aguarda o sinal de dados no DOM. Um payload com
+    formato inesperado não custa espera extra: o DOM chega logo depois.
+    Retorna SinalRecebido("json", dados), SinalRecebido("dom", None) ou None no timeout.
+    Os bytes dos payloads e o tempo de interpretação entram nas métricas da fonte;
+    os corpos JSON recebidos são acrescentados a `corpos`.
+    """
+    from playwright.sync_api import TimeoutError as TempoEsgotadoPlaywright
+
+    limite = time.monotonic() + timeout_ms / 1000
+    payloads = []
+    processadas = 0
+
+    def interpretar_novas():
+        nonlocal processadas
+        for resposta in respostas[processadas:]:
+            try:
+                corpo = resposta.body()
+                contar("bytes_recebidos", fonte, len(corpo))
+                payloads.append(json.loads(corpo))
+                corpos.append(corpo)
+            except Exception:
+                pass
+        processadas = len(respostas)
+        with medir(fonte, "leitura_json"):
+            return interpretar(payloads)
+
+    while True:
+        dados = interpretar_novas()
+        if dados is not None:
+            return SinalRecebido("json", dados)
+
+        restante_ms = (limite - time.monotonic()) * 1000
+        if restante_ms <= 0:
+            return None
+        try:
+            esperar_dom(min(restante_ms, INTERVALO_CORRIDA_MS))
+        except TempoEsgotadoPlaywright:
+            continue
+        # O DOM é renderizado a partir do payload: se ele chegou junto, vale o JSON
+        dados = interpretar_novas()
+        return SinalRecebido("json", dados) if dados is not None else SinalRecebido("dom", None)
+
+
+# --- Carregamento enxuto das páginas ---
+# Só passam os documentos, scripts e XHRs dos hosts da B3/BMF; as esperas têm
+# timeouts adaptativos, calculados das latências observadas de cada fonte.
+
+def _host_permitido(url):
+    host = urlsplit(url).hostname or ""
+    return any(host == permitido or host.endswith("." + permitido) for permitido in HOSTS_PERMITIDOS)
+
+
+def _filtrar_requisicao(route):
+    requisicao = route.request
+    if requisicao.resource_type in TIPOS_BLOQUEADOS or not _host_permitido(requisicao.url):
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _preparar_pagina(page, fonte, teto_ms):
+    """Aplica o perfil enxuto (se ligado) e o timeout adaptativo padrão da fonte (o da espera pelo DOM) à página."""
+    if PAGINA_ENXUTA:
+        page.route("**/*", _filtrar_requisicao)
+    page.set_default_timeout(limitar_ao_prazo_ms(timeout_adaptativo_ms(serie_latencia(fonte, "dom"), teto_ms), fonte))
+
+
+def _aguardar_sinal(fonte, sinal, inicio, esperar, teto_ms):
+    """
+    Executa `esperar(timeout_ms)` (a espera pelo `sinal` de dados da fonte: "json"
+    ou "dom") com o timeout adaptativo da série fonte/sinal e registra nela a
+    latência desde `inicio`. Se `esperar` devolver um SinalRecebido (corrida entre
+    JSON e DOM), a latência vai para a série do sinal que chegou primeiro.
+    SemRegistroB3 levantado pela espera é repassado ao chamador. Esperas que
+    estouram não entram nas latências: são contadas em "esperas_estouradas" e a
+    próxima espera da série usa o teto.
+    Retorna o resultado de `esperar`, ou None; se a espera foi encurtada pelo
+    prazo total e ele acabou, levanta PrazoEsgotado.
+    """
+    serie = serie_latencia(fonte, sinal)
+    timeout_fonte = timeout_adaptativo_ms(serie, teto_ms)
+    timeout_ms = limitar_ao_prazo_ms(timeout_fonte, fonte)
+    inicio_espera = time.monotonic()
+    sem_registro = None
+    try:
+        resultado = esperar(timeout_ms)
+    except SemRegistroB3 as e:
+        # A fonte respondeu que não há dados para a data: também é um sinal
+        resultado, sem_registro = None, e
+    except Exception:
+        resultado = None
+    observar(fonte, "espera_dados", time.monotonic() - inicio_espera)
+    if sem_registro is not None:
+        registrar_latencia(serie, time.monotonic() - inicio)
+        raise sem_registro
+    if resultado is None:
+        if timeout_ms < timeout_fonte and tempo_restante() == 0:
+            # Quem estourou foi o prazo da página, não a fonte
+            raise PrazoEsgotado(fonte)
+        contar("esperas_estouradas", serie)
+        registrar_estouro(serie)
+        return None
+    if isinstance(resultado, SinalRecebido):
+        serie = serie_latencia(fonte, resultado.sinal)
+    registrar_latencia(serie, time.monotonic() - inicio)
+    return resultado
+
+
+def _conteudo_pagina(page, fonte, data_ref):
+    """
+    page.content() medido, com o tamanho do HTML somado aos bytes recebidos da
+    fonte. O HTML é guardado no arquivo bruto antes de ser lido.
+    """
+    with medir(fonte, "conteudo_pagina"):
+        content = page.content()
+    contar("bytes_recebidos", fonte, len(content.encode("utf-8")))
+    _arquivar(fonte, data_ref, "html", content)
+    return content
+
+
+def _arquivar(fonte, data_ref, tipo, conteudo, codificacao="utf-8"):
+    """Guarda a captura no arquivo bruto (medido na etapa "arquivo_bruto" da fonte)."""
+    with medir(fonte, "arquivo_bruto"):
+        arquivar(fonte, data_ref, tipo, conteudo, codificacao)
+
+
+def _arquivar_payloads(fonte, data_ref, corpos):
+    """Guarda os corpos JSON de uma consulta como um único array, sem reserializá-los."""
+    if corpos:
+        _arquivar(fonte, data_ref, "json", b"[" + b",".join(corpos) + b"]")
+
+
+# --- Funções para Extração de Dados (Usando Playwright) ---
+
+# <div>s com a mensagem de "Não há registro" no próprio texto (como em tem_mensagem_sem_registro).
+_JS_DIVS_SEM_REGISTRO = """(semRegistro) => [...document.querySelectorAll("div")].filter(
+    (div) => [...div.childNodes].some((no) => no.nodeType === Node.TEXT_NODE && no.textContent.includes(semRegistro))
+)"""
+# Antes do clique: marca as mensagens que já estão na página (as da data anterior do lote).
+_JS_MARCAR_SEM_REGISTRO = f"""(semRegistro) => ({_JS_DIVS_SEM_REGISTRO})(semRegistro).forEach(
+    (div) => div.setAttribute("{ATRIBUTO_MENSAGEM_ANTERIOR}", "")
+)"""
+# Depois do clique: a tabela com a data consultada ou uma mensagem renderizada após o clique.
+_JS_SINAL_B3 = f"""([data, semRegistro]) => {{
+    const tabela = document.querySelector("table#ratesTable");
+    if (tabela && tabela.innerText.includes(data)) return true;
+    return ({_JS_DIVS_SEM_REGISTRO})(semRegistro).some((div) => !div.hasAttribute("{ATRIBUTO_MENSAGEM_ANTERIOR}"));
+}}"""
+
+
+def _coletor_b3(datas):
+    """
+    Função para o pool que consulta várias datas na mesma página da B3: a página é
+    carregada uma vez e o formulário é reenviado para cada data. Retorna
+    {data: ("json", DadosB3) | ("html", content) | exceção}.
+    """
+    def coletar(page):
+        _preparar_pagina(page, "b3_cambio", 60000)
+        respostas = _capturar_respostas_json(page) if MODO_EXTRACAO == "json" else None
+
+        # Navegando para B3 Câmbio Histórico (uma vez para todo o lote); o fill
+        # seguinte já espera o formulário, sem aguardar o carregamento completo
+        with medir("b3_cambio", "goto"):
+            page.goto(URL_B3_CAMBIO, wait_until="commit")
+
+        coletados = {}
+        for data_desejada in datas:
+            try:
+                coletados[data_desejada] = _consultar_data_b3(page, respostas, data_desejada)
+            except Exception as e:
+                # Uma data com erro não impede as demais do lote
+                coletados[data_desejada] = e
+        return coletados
+
+    return coletar
+
+
+def _consultar_data_b3(page, respostas, data_desejada):
+    """Envia o formulário da página já carregada para uma data e coleta o resultado."""
+    if respostas is not None:
+        # Só as respostas desta consulta contam (e, delas, só as linhas da data consultada)
+        respostas.clear()
+
+    # Preencher o campo de data
+    page.fill('input[name="initialDate"]', data_desejada)
+
+    # A mensagem de "Não há registro" da consulta anterior continua no DOM até o novo
+    # resultado ser renderizado: a espera pelo DOM só aceita mensagens novas
+    page.evaluate(_JS_MARCAR_SEM_REGISTRO, TEXTO_SEM_REGISTRO)
+
+    # Clicar no botão de busca
+    data_ref = datetime.strptime(data_desejada, "%d/%m/%Y").date()
+    inicio = time.monotonic()
+    page.click('button:has-text("Buscar")')
+
+    # Esperar a tabela da data consultada (ou a mensagem de "Não há registro"):
+    # com várias datas na mesma página, a tabela anterior continua no DOM.
+    def esperar_dom(timeout_ms):
+        return page.wait_for_function(_JS_SINAL_B3, arg=[data_desejada, TEXTO_SEM_REGISTRO], timeout=timeout_ms)
+
+    if respostas is None:
+        sinal = _aguardar_sinal("b3_cambio", "dom", inicio, esperar_dom, 30000)
+    else:
+        # Modo JSON: o payload da consulta corre contra o DOM; uma resposta vazia
+        # (sem registro para a data) levanta SemRegistroB3 sem esperar o DOM
+        corpos = []
+        try:
+            sinal = _aguardar_sinal(
+                "b3_cambio", "dom", inicio,
+                lambda timeout_ms: _aguardar_json_ou_dom(
+                    respostas, lambda payloads: interpretar_json_b3(payloads, data_desejada),
+                    esperar_dom, timeout_ms, "b3_cambio", corpos,
+                ),
+                30000,
+            )
+        finally:
+            # Guardados mesmo que não tenham sido reconhecidos: um leitor corrigido pode reaproveitá-los
+            _arquivar_payloads("b3_cambio", data_ref, corpos)
+        if sinal is not None and sinal.sinal == "json":
+            return "json", sinal.valor
+    if sinal is None:
+        # Nem a tabela nem a mensagem de "Não há registro" apareceram: falha transitória
+        raise SinalNaoRecebido("b3_cambio")
+
+    # Obter o HTML da página após o JavaScript ter carregado o conteúdo
+    return "html", _conteudo_pagina(page, "b3_cambio", data_ref)
+
+
+def _interpretar_coletado_b3(coletado, data_desejada):
+    """Converte o retorno de _coletor_b3 para uma data em DadosB3 (ou levanta o erro da coleta)."""
+    if isinstance(coletado, Exception):
+        raise coletado
+    tipo, conteudo = coletado
+    if tipo == "json":
+        return conteudo
+    return interpretar_html_b3(conteudo, data_desejada)
+
+
+def dividir_em_lotes(datas):
+    """
+    Distribui as datas entre os navegadores do pool: cada lote é atendido por uma
+    única navegação e tem no máximo DATAS_POR_NAVEGACAO datas. A distribuição é
+    alternada, de modo que as datas mais recentes são as primeiras de cada lote.
+    """
+    if not datas:
+        return []
+    quantidade = max(ceil(len(datas) / DATAS_POR_NAVEGACAO), min(len(datas), TAMANHO_POOL))
+    return [list(datas[i::quantidade]) for i in range(quantidade)]
+
+
+def prioridade_b3(datas):
+    """Prioridade na fila do pool: o lote com a TCAM 01 (último dia útil) passa à frente das datas anteriores."""
+    tcam01 = dia_util_anterior(date.today()).strftime("%d/%m/%Y")
+    return PRIORIDADE_TCAM01 if tcam01 in datas else PRIORIDADE_DATAS_ANTERIORES
+
+
+def extrair_dados_b3_lote_playwright(datas):
+    """
+    Extrai as tabelas da B3 de várias datas, com uma navegação por lote de datas
+    e os lotes em paralelo no pool de navegadores.
+    Retorna {data: ResultadoExtracao}, com SemRegistroB3 ou o erro da coleta em `erro`.
+    """
+    pool = obter_pool()
+    futuros = [(lote, pool.submeter(_coletor_b3(lote), prioridade_b3(lote))) for lote in dividir_em_lotes(datas)]
+    resultados = {}
+    for lote, futuro in futuros:
+        try:
+            coletados = futuro.result()
+        except Exception as e:
+            coletados = {data_desejada: e for data_desejada in lote}
+        for data_desejada in lote:
+            try:
+                resultados[data_desejada] = ResultadoExtracao(_interpretar_coletado_b3(coletados[data_desejada], data_desejada), None)
+            except Exception as e:
+                resultados[data_desejada] = ResultadoExtracao(None, e)
+    return resultados
+
+
+def extrair_dados_b3_playwright(data_desejada):
+    """
+    Extrai taxas praticadas, volume contratado e valores liquidados da B3 para uma data específica
+    usando Playwright para lidar com JavaScript.
+    Retorna DadosB3 (df_tcam, df_volume, df_liquido, total_volume), ou SEM_DADOS_B3 se não houver dados.
+    Levanta SemRegistroB3 quando a B3 informa que não há registro para a data.
+    Levanta SinalNaoRecebido se nem a tabela nem a mensagem aparecerem a tempo.
+    """
+    coletado = obter_pool().executar(_coletor_b3([data_desejada]), prioridade=prioridade_b3([data_desejada]))[data_desejada]
+    return _interpretar_coletado_b3(coletado, data_desejada)
+
+
+def extrair_frp0_playwright(data_desejada=None):
+    """Extrai dados do FRP0 (Forward Points) da BMF usando Playwright."""
+    def coletar_html(page):
+        _preparar_pagina(page, "bmf_frp0", 30000)
+        
+        # Navegando para BMF FRP0: a espera é pela tabela, não pelo carregamento da página
+        inicio = time.monotonic()
+        with medir("bmf_frp0", "goto"):
+            page.goto(url_frp0(data_desejada), wait_until="commit")
+        
+        sinal = _aguardar_sinal("bmf_frp0", "dom", inicio, lambda timeout_ms: page.wait_for_selector("#MercadoFut2", timeout=timeout_ms), 15000)
+        if sinal is None:
+            raise SinalNaoRecebido("bmf_frp0")
+
+        return _conteudo_pagina(page, "bmf_frp0", _data_referencia_frp0(data_desejada))
+
+    content = obter_pool().executar(coletar_html, prioridade=PRIORIDADE_INDICADORES)
+    return interpretar_html_frp0(content)
+
+
+def extrair_frp0_http(data_desejada=None):
+    """
+    Extrai o FRP0 com uma única requisição HTTP: o boletim da BMF é uma página ASP
+    renderizada no servidor, então a tabela já vem no HTML (codificado em Latin-1).
+    Retorna o DataFrame do FRP0, vazio se a página não trouxer a tabela.
+    """
+    import urllib3
+
+    timeout = limitar_ao_prazo_ms(TIMEOUT_HTTP * 1000, "bmf_frp0") / 1000
+    with medir("bmf_frp0", "http"):
+        resposta = _cliente_http().request("GET", url_frp0(data_desejada), timeout=urllib3.Timeout(total=timeout))
+    contar("bytes_recebidos", "bmf_frp0", len(resposta.data))
+    if resposta.status != 200:
+        raise urllib3.exceptions.HTTPError(f"BMF respondeu HTTP {resposta.status} para o FRP0.")
+    tipo_conteudo = resposta.headers.get("Content-Type", "")
+    charset = tipo_conteudo.split("charset=")[-1].strip() if "charset=" in tipo_conteudo else "latin-1"
+    _arquivar("bmf_frp0", _data_referencia_frp0(data_desejada), "html", resposta.data, charset)
+    content = resposta.data.decode(charset, errors="replace")
+    return interpretar_html_frp0(content)
+
+
+def extrair_frp0(data_desejada=None):
+    """
+    Extrai o FRP0 pelo caminho HTTP leve e só recorre ao Chromium se a leitura
+    estática falhar ou não encontrar a tabela. A tabela sem negócios (vazia, com
+    as colunas) é a resposta: o navegador leria a mesma página.
+    """
+    try:
+        df_frp = extrair_frp0_http(data_desejada)
+        if not df_frp.empty or list(df_frp.columns) == COLUNAS_FRP:
+            return df_frp
+    except Exception as e:
+        print(f"Leitura HTTP do FRP0 falhou ({e}); usando o navegador.")
+    return extrair_frp0_playwright(data_desejada)
+
+
+def extrair_dif_oper_casada_playwright():
+    """
+    Extrai o indicador 'DIF OPER CASADA - COMPRA' usando Playwright.
+    """
+    def coletar(page):
+        _preparar_pagina(page, "b3_indicadores", 30000)
+        respostas = _capturar_respostas_json(page) if MODO_EXTRACAO == "json" else None
+        
+        # Navegando para B3 Indicadores Financeiros
+        inicio = time.monotonic()
+        with medir("b3_indicadores", "goto"):
+            page.goto(URL_B3_INDICADORES, wait_until="commit")
+
+        def esperar_dom(timeout_ms):
+            return page.wait_for_selector(f"p:has-text('{TEXTO_DIF_OPER}')", timeout=timeout_ms)
+
+        if respostas is None:
+            sinal = _aguardar_sinal("b3_indicadores", "dom", inicio, esperar_dom, 20000)
+        else:
+            # Modo JSON: o indicador vem no payload carregado pela página, em corrida com o DOM
+            corpos = []
+            try:
+                sinal = _aguardar_sinal(
+                    "b3_indicadores", "dom", inicio,
+                    lambda timeout_ms: _aguardar_json_ou_dom(
+                        respostas, interpretar_json_dif_oper, esperar_dom, timeout_ms, "b3_indicadores", corpos,
+                    ),
+                    20000,
+                )
+            finally:
+                _arquivar_payloads("b3_indicadores", date.today(), corpos)
+            if sinal is not None and sinal.sinal == "json":
+                return "json", sinal.valor
+
+        if sinal is None:
+            raise SinalNaoRecebido("b3_indicadores")
+
+        return "html", _conteudo_pagina(page, "b3_indicadores", date.today())
+
+    tipo, conteudo = obter_pool().executar(coletar, prioridade=PRIORIDADE_INDICADORES)
+    if tipo == "json":
+        return conteudo
+    return interpretar_html_dif_oper(conteudo)
+
+
+# --- Leitura com cache e armazém histórico ---
+
+def _ttl_dados_b3(args, valor):
+    """
+    Datas já encerradas com TCAM publicada nunca expiram no cache;
+    consultas sem dados voltam a ser tentadas após TTL_SEM_DADOS.
+    """
+    df_tcam = valor.tcam
+    data_consulta = datetime.strptime(args[0], "%d/%m/%Y").date()
+    if df_tcam is not None and not df_tcam.empty and data_consulta < date.today():
+        return None
+    return TTL_SEM_DADOS
+
+
+def _gravar_no_armazem(conjunto, data_ref, df, capturado_em):
+    """Falhas de gravação não impedem a exibição dos dados recém-extraídos."""
+    try:
+        obter_armazem().gravar(conjunto, data_ref, df, capturado_em)
+    except Exception as e:
+        print(f"Erro ao gravar '{conjunto}' de {data_ref} no armazém histórico: {e}")
+
+
+def _ler_do_armazem(conjunto, data_ref):
+    """Retorna (df, capturado_em) do armazém, ou (None, None) se ausente ou ilegível."""
+    try:
+        return obter_armazem().ler_ultimo(conjunto, data_ref)
+    except Exception as e:
+        print(f"Erro ao ler '{conjunto}' de {data_ref} do armazém histórico: {e}")
+        return None, None
+
+
+def _ler_indicador_recente(conjunto, desde=None):
+    """
+    Snapshot de hoje do indicador, se tiver sido capturado a partir de `desde`
+    (por padrão, há menos de TTL_INDICADORES).
+    """
+    if desde is None:
+        desde = datetime.now() - timedelta(seconds=TTL_INDICADORES)
+    df, capturado_em = _ler_do_armazem(conjunto, date.today())
+    if df is None or capturado_em < desde:
+        return None
+    return df
+
+
+def _levantar_ultimo_valor_conhecido(conjunto, erro, converter):
+    """
+    A extração do indicador falhou: levanta ValorDesatualizado com o último
+    snapshot gravado (convertido por `converter`) ou, sem snapshot, o próprio erro.
+    """
+    try:
+        df, capturado_em = obter_armazem().ler_ultimo_disponivel(conjunto)
+    except Exception as e:
+        print(f"Erro ao ler o último snapshot de '{conjunto}' do armazém histórico: {e}")
+        df = None
+    if df is None:
+        raise erro
+    raise ValorDesatualizado(converter(df), capturado_em, erro) from erro
+
+
+def _montar_df_tcam_armazenado(df_tcam):
+    """Garante os tipos da TCAM lida do armazém (snapshots antigos guardavam a data como date)."""
+    df_tcam = df_tcam.copy()
+    df_tcam["Data"] = converter_data(df_tcam["Data"])
+    return df_tcam
+
+
+def _ler_dados_b3_armazenados(data_ref):
+    """DadosB3 da data a partir do armazém histórico, ou None se a data ainda não foi gravada."""
+    df_tcam, _ = _ler_do_armazem("tcam", data_ref)
+    if df_tcam is None:
+        return None
+    tabelas = {}
+    for conjunto in ("volume", "volume_total", "liquido"):
+        df, _ = _ler_do_armazem(conjunto, data_ref)
+        tabelas[conjunto] = df if df is not None else pd.DataFrame()
+    # Snapshots antigos guardavam o total junto do volume; montar_dados_b3 separa de novo.
+    df_volume = pd.concat([tabelas["volume"], tabelas["volume_total"]], ignore_index=True)
+    return montar_dados_b3(_montar_df_tcam_armazenado(df_tcam), df_volume, tabelas["liquido"])
+
+
+def _gravar_dados_b3(data_ref, dados):
+    """Só datas encerradas são gravadas: seus dados não mudam depois de publicados."""
+    if dados.tcam is not None and data_ref < date.today():
+        capturado_em = datetime.now()
+        _gravar_no_armazem("tcam", data_ref, dados.tcam, capturado_em)
+        _gravar_no_armazem("volume", data_ref, dados.volume, capturado_em)
+        _gravar_no_armazem("volume_total", data_ref, dados.total_volume, capturado_em)
+        _gravar_no_armazem("liquido", data_ref, dados.liquido, capturado_em)
+
+
+@em_cache("b3", _ttl_dados_b3)
+def obter_dados_b3(data_desejada):
+    """
+    Retorna DadosB3 da data, lendo primeiro do armazém histórico e extraindo
+    da B3 apenas quando a data ainda não foi gravada. Fins de semana e feriados
+    levantam SemRegistroB3 sem abrir o navegador.
+    """
+    data_ref = datetime.strptime(data_desejada, "%d/%m/%Y").date()
+    if not eh_dia_util(data_ref):
+        raise SemRegistroB3(data_desejada)
+
+    dados = _ler_dados_b3_armazenados(data_ref)
+    if dados is not None:
+        return dados
+
+    def extrair_e_gravar():
+        dados = executar_com_resiliencia("b3_cambio", extrair_dados_b3_playwright, data_desejada)
+        _gravar_dados_b3(data_ref, dados)
+        return dados
+
+    # Pedidos simultâneos pela mesma data (outras sessões ou processos) compartilham a extração
+    return executar_uma_vez(("b3", data_desejada), extrair_e_gravar, lambda: _ler_dados_b3_armazenados(data_ref))
+
+
+def _resolver_dados_b3_localmente(data_desejada):
+    """
+    ResultadoExtracao da data sem abrir o navegador (dia não útil, cache ou
+    armazém), ou None se a data ainda precisa ser extraída da B3.
+    """
+    data_ref = datetime.strptime(data_desejada, "%d/%m/%Y").date()
+    if not eh_dia_util(data_ref):
+        return ResultadoExtracao(None, SemRegistroB3(data_desejada))
+    encontrado, dados = consultar_cache("b3", data_desejada)
+    if not encontrado:
+        dados = _ler_dados_b3_armazenados(data_ref)
+        if dados is None:
+            return None
+        guardar_em_cache("b3", (data_desejada,), dados, _ttl_dados_b3)
+    return ResultadoExtracao(dados, None)
+
+
+def _extrair_lote_com_resiliencia(datas):
+    """
+    extrair_dados_b3_lote_playwright passando pelo disjuntor da B3: a cada nova
+    tentativa só as datas com falha transitória são consultadas de novo. Com o
+    disjuntor aberto (ou o prazo esgotado), as datas restantes trazem esse erro.
+    """
+    resultados = {}
+    pendentes = list(datas)
+
+    def extrair_pendentes():
+        nonlocal pendentes
+        resultados.update(extrair_dados_b3_lote_playwright(pendentes))
+        pendentes = [data_desejada for data_desejada in pendentes if eh_transitoria(resultados[data_desejada].erro)]
+        if pendentes:
+            raise resultados[pendentes[0]].erro
+
+    try:
+        executar_com_resiliencia("b3_cambio", extrair_pendentes)
+    except Exception as e:
+        for data_desejada in pendentes:
+            resultados.setdefault(data_desejada, ResultadoExtracao(None, e))
+    return {data_desejada: resultados[data_desejada] for data_desejada in datas}
+
+
+def obter_dados_b3_periodo(datas):
+    """
+    Versão em lote de obter_dados_b3 para várias datas (dd/mm/aaaa): usa o mesmo
+    cache e o armazém, e as datas restantes são extraídas juntas, várias por
+    navegação. Retorna {data: ResultadoExtracao} na ordem de `datas`.
+    """
+    resultados = {}
+    pendentes = []
+    for data_desejada in datas:
+        resultado = _resolver_dados_b3_localmente(data_desejada)
+        if resultado is None:
+            pendentes.append(data_desejada)
+        else:
+            resultados[data_desejada] = resultado
+
+    def extrair_e_gravar(datas_lote):
+        extraidos = _extrair_lote_com_resiliencia(datas_lote)
+        for data_desejada, resultado in extraidos.items():
+            if resultado.erro is None:
+                _gravar_dados_b3(datetime.strptime(data_desejada, "%d/%m/%Y").date(), resultado.valor)
+        return extraidos
+
+    def reler(data_desejada):
+        dados = _ler_dados_b3_armazenados(datetime.strptime(data_desejada, "%d/%m/%Y").date())
+        return ResultadoExtracao(dados, None) if dados is not None else None
+
+    # Datas já em extração por outra sessão ou processo são aguardadas em vez de extraídas de novo
+    for data_desejada, resultado in executar_uma_vez_em_lote("b3", pendentes, extrair_e_gravar, reler).items():
+        if resultado.erro is None:
+            guardar_em_cache("b3", (data_desejada,), resultado.valor, _ttl_dados_b3)
+        resultados[data_desejada] = resultado
+    return {data_desejada: resultados[data_desejada] for data_desejada in datas}
+
+
+def combinar_dados_b3(dados_por_data):
+    """
+    Junta os DadosB3 de várias datas ({data: DadosB3}) em um único DadosB3 com
+    todas as datas. Cada tabela ganha a coluna COLUNA_DATA_CONSULTA, que identifica
+    a data consultada (os valores liquidados, por exemplo, têm data de liquidação
+    própria, e a linha de total do volume não tem data).
+    """
+    tabelas = {campo: [] for campo in DadosB3._fields}
+    for data_desejada, dados in dados_por_data.items():
+        data_consulta = pd.Timestamp(datetime.strptime(data_desejada, "%d/%m/%Y"))
+        for campo, df in zip(DadosB3._fields, dados):
+            if df is not None and not df.empty:
+                tabelas[campo].append(df.assign(**{COLUNA_DATA_CONSULTA: data_consulta}))
+    combinados = []
+    for campo in DadosB3._fields:
+        if not tabelas[campo]:
+            combinados.append(pd.DataFrame())
+            continue
+        df = pd.concat(tabelas[campo], ignore_index=True)
+        combinados.append(df[[COLUNA_DATA_CONSULTA] + [c for c in df.columns if c != COLUNA_DATA_CONSULTA]])
+    return DadosB3(*combinados)
+
+
+def _ttl_frp0(args, valor):
+    """FRP0 de uma data encerrada não muda; o do pregão corrente expira em TTL_INDICADORES."""
+    data_desejada = args[0] if args else None
+    if data_desejada and not valor.empty and datetime.strptime(data_desejada, "%d/%m/%Y").date() < date.today():
+        return None
+    return TTL_INDICADORES
+
+
+def atualizar_frp0():
+    """
+    Extrai o FRP0 do último pregão e grava um novo snapshot no armazém. Se outra
+    sessão ou processo gravar um snapshot enquanto este pedido espera, ele é usado.
+    Levanta SemPrecoFRP0 se o boletim vier sem o último preço.
+    """
+    inicio = datetime.now()
+
+    def extrair_e_gravar():
+        df_frp = executar_com_resiliencia("bmf_frp0", extrair_frp0)
+        if df_frp.empty:
+            # Nada é gravado: a página continua com o último preço conhecido
+            raise SemPrecoFRP0()
+        _gravar_no_armazem("frp0", date.today(), df_frp, datetime.now())
+        return df_frp
+
+    def reler():
+        df_frp = _ler_indicador_recente("frp0", desde=inicio)
+        return tipar(df_frp, ESQUEMA_FRP) if df_frp is not None else None
+
+    return executar_uma_vez(("frp0",), extrair_e_gravar, reler)
+
+
+def _atualizar_frp0_ou_ultimo_valor():
+    """atualizar_frp0; se a extração falhar, levanta ValorDesatualizado com o último snapshot."""
+    try:
+        return atualizar_frp0()
+    except Exception as e:
+        _levantar_ultimo_valor_conhecido("frp0", e, lambda df: tipar(df, ESQUEMA_FRP))
+
+
+@em_cache("frp0", _ttl_frp0)
+def obter_frp0(data_desejada=None):
+    """
+    FRP0 do último pregão (sem data) ou de uma data específica (dd/mm/aaaa).
+    Usa o armazém histórico quando possível e grava o que for extraído.
+    """
+    if data_desejada is None:
+        df_frp = _ler_indicador_recente("frp0")
+        if df_frp is not None:
+            return tipar(df_frp, ESQUEMA_FRP)
+        return _atualizar_frp0_ou_ultimo_valor()
+
+    data_ref = datetime.strptime(data_desejada, "%d/%m/%Y").date()
+    if not eh_dia_util(data_ref):
+        return pd.DataFrame()
+
+    def reler():
+        df_frp, _ = _ler_do_armazem("frp0", data_ref)
+        return tipar(df_frp, ESQUEMA_FRP) if df_frp is not None and data_ref < date.today() else None
+
+    df_frp = reler()
+    if df_frp is not None:
+        return df_frp
+
+    def extrair_e_gravar():
+        df_frp = executar_com_resiliencia("bmf_frp0", extrair_frp0, data_desejada)
+        _gravar_no_armazem("frp0", data_ref, df_frp, datetime.now())
+        return df_frp
+
+    return executar_uma_vez(("frp0", data_desejada), extrair_e_gravar, reler)
+
+
+def forcar_frp0():
+    """
+    Controle "atualizar agora": extrai o FRP0 do último pregão sem reaproveitar o
+    snapshot recente do armazém e guarda o resultado no cache de obter_frp0().
+    """
+    df_frp = _atualizar_frp0_ou_ultimo_valor()
+    guardar_em_cache("frp0", (), df_frp, _ttl_frp0)
+    return df_frp
+
+
+def atualizar_dif_oper_casada():
+    """
+    Extrai o DIF OPER CASADA e grava um novo snapshot no armazém (se houver valor).
+    Como no FRP0, um snapshot gravado por outro pedido durante a espera é reaproveitado.
+    """
+    inicio = datetime.now()
+
+    def extrair_e_gravar():
+        valor, data_atualizacao = executar_com_resiliencia("b3_indicadores", extrair_dif_oper_casada_playwright)
+        if valor:
+            df_dif = pd.DataFrame({"Valor": [valor], "Data Atualização": [data_atualizacao]})
+            _gravar_no_armazem("dif_oper", date.today(), df_dif, datetime.now())
+        return valor, data_atualizacao
+
+    def reler():
+        df_dif = _ler_indicador_recente("dif_oper", desde=inicio)
+        return (df_dif["Valor"].iloc[0], df_dif["Data Atualização"].iloc[0]) if df_dif is not None else None
+
+    return executar_uma_vez(("dif_oper",), extrair_e_gravar, reler)
+
+
+def _atualizar_dif_oper_ou_ultimo_valor():
+    """atualizar_dif_oper_casada; se a extração falhar, levanta ValorDesatualizado com o último snapshot."""
+    try:
+        return atualizar_dif_oper_casada()
+    except Exception as e:
+        _levantar_ultimo_valor_conhecido("dif_oper", e, lambda df: (df["Valor"].iloc[0], df["Data Atualização"].iloc[0]))
+
+
+@em_cache("dif_oper", TTL_INDICADORES)
+def obter_dif_oper_casada():
+    """DIF OPER CASADA do dia: usa o snapshot recente do armazém ou extrai e grava um novo."""
+    df_dif = _ler_indicador_recente("dif_oper")
+    if df_dif is not None:
+        return df_dif["Valor"].iloc[0], df_dif["Data Atualização"].iloc[0]
+    return _atualizar_dif_oper_ou_ultimo_valor()
+
+
+def forcar_dif_oper_casada():
+    """Controle "atualizar agora" do DIF OPER CASADA (como forcar_frp0)."""
+    valor = _atualizar_dif_oper_ou_ultimo_valor()
+    guardar_em_cache("dif_oper", (), valor, TTL_INDICADORES)
+    return valor
+
+
+# --- Leitura dos snapshots da coleta em segundo plano ---
+# Com o agendador ligado a página não extrai nada: lê o último snapshot gravado
+# no armazém e exibe a idade dele.
+
+def ler_snapshot_b3(datas):
+    """
+    Tabelas da B3 das datas (dd/mm/aaaa) a partir do cache e do armazém, sem
+    abrir o navegador. Retorna {data: ResultadoExtracao}; datas ainda não
+    coletadas trazem SemSnapshot em `erro`.
+    """
+    resultados = {}
+    for data_desejada in datas:
+        resultado = _resolver_dados_b3_localmente(data_desejada)
+        resultados[data_desejada] = resultado or ResultadoExtracao(None, SemSnapshot(data_desejada))
+    return resultados
+
+
+@em_cache("snapshot", TTL_SNAPSHOT)
+def ler_snapshot_indicador(conjunto):
+    """Retorna (df, capturado_em) do snapshot mais recente do indicador, ou (None, None)."""
+    try:
+        return obter_armazem().ler_ultimo_disponivel(conjunto)
+    except Exception as e:
+        print(f"Erro ao ler o último snapshot de '{conjunto}' do armazém histórico: {e}")
+        return None, None
+
+
+def ler_snapshot_frp0():
+    """FRP0 do último snapshot gravado (DataFrame vazio se ainda não houver)."""
+    df_frp, _ = ler_snapshot_indicador("frp0")
+    return tipar(df_frp, ESQUEMA_FRP) if df_frp is not None else pd.DataFrame()
+
+
+def ler_snapshot_dif_oper_casada():
+    """(valor, data_atualizacao) do último snapshot do DIF OPER CASADA, ou (None, None)."""
+    df_dif, _ = ler_snapshot_indicador("dif_oper")
+    if df_dif is None:
+        return None, None
+    return df_dif["Valor"].iloc[0], df_dif["Data Atualização"].iloc[0]
+
+
+# --- Releitura das capturas do arquivo bruto ---
+
+def reinterpretar_captura(fonte, tipo, conteudo, data_ref):
+    """
+    Lê uma captura do arquivo bruto (HTML ou array de payloads JSON) com os
+    leitores atuais. Retorna {conjunto do armazém: DataFrame}, vazio se a
+    captura não tiver os dados. Levanta SemRegistroB3 como na extração.
+    """
+    if fonte == "b3_cambio":
+        if tipo == "json":
+            dados = interpretar_json_b3(json.loads(conteudo), data_ref.strftime("%d/%m/%Y"))
+        else:
+            dados = interpretar_html_b3(conteudo, data_ref.strftime("%d/%m/%Y"))
+        if dados is None or dados.tcam is None:
+            return {}
+        return {"tcam": dados.tcam, "volume": dados.volume, "volume_total": dados.total_volume, "liquido": dados.liquido}
+
+    if fonte == "bmf_frp0":
+        df_frp = interpretar_html_frp0(conteudo)
+        return {"frp0": df_frp} if not df_frp.empty else {}
+
+    if fonte == "b3_indicadores":
+        lido = interpretar_json_dif_oper(json.loads(conteudo)) if tipo == "json" else interpretar_html_dif_oper(conteudo)
+        if not lido or not lido[0]:
+            return {}
+        valor, data_atualizacao = lido
+        return {"dif_oper": pd.DataFrame({"Valor": [valor], "Data Atualização": [data_atualizacao]})}
+
+    raise ValueError(f"Fonte desconhecida no arquivo bruto: {fonte}")
+
+
+# --- Funções de Conversão ---
+
+def tratar_valor_tcam_original(valor_str):
+    """
+    Trata string de valor TCAM conforme a lógica original do código para conversão.
+    Assume que a última casa é decimal.
+    """
+    valor_limpo = ''.join(filter(str.isdigit, valor_str))
+    if valor_limpo:
+        if len(valor_limpo) >= 2:
+            return float(valor_limpo[:-1] + '.' + valor_limpo[-1])
+        else:
+            return float("0." + valor_limpo) if valor_limpo else 0.0
+    return 0.0
+
+def tratar_valor_frp0_dif_original(valor_str):
+    """
+    Trata strings de valor FRP0 e DIF OPER CASADA.
+    Substitui vírgula por ponto para permitir a conversão para float.
+    """
+    try:
+        return float(valor_str.replace(",", "."))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,92 @@
+"""
+Latências observadas por fonte e timeouts adaptativos.
+
+Cada extrator registra quanto tempo a fonte levou para entregar o dado (da
+navegação ou do envio do formulário até o sinal de dados). As latências são
+guardadas por série, uma por fonte e sinal esperado (ex.: o payload JSON e a
+tabela no DOM da mesma página têm tetos diferentes e não se misturam). O
+timeout das esperas seguintes passa a ser um múltiplo do percentil dessas
+latências, limitado ao teto fixo de cada espera: uma fonte rápida falha rápido
+quando trava, e uma fonte lenta ganha mais tempo até o teto.
+
+Esperas que estouram não são latências (o extrator as conta nas métricas), e a espera
+seguinte da série usa o teto, para que uma fonte que ficou lenta volte a
+entregar amostras (e o timeout se ajuste a ela).
+"""
+import os
+import threading
+from collections import defaultdict, deque
+
+JANELA_LATENCIAS = int(os.environ.get("TCAM_LATENCIA_JANELA", "50"))
+PERCENTIL_TIMEOUT = float(os.environ.get("TCAM_TIMEOUT_PERCENTIL", "95"))
+FATOR_TIMEOUT = float(os.environ.get("TCAM_TIMEOUT_FATOR", "3"))
+TIMEOUT_MINIMO_MS = float(os.environ.get("TCAM_TIMEOUT_MINIMO_MS", "5000"))
+# Abaixo disso o teto fixo continua valendo
+AMOSTRAS_MINIMAS = 5
+
+
+def serie_latencia(fonte, sinal):
+    """Nome da série de latências de um sinal da fonte (ex.: "b3_cambio/json")."""
+    return f"{fonte}/{sinal}"
+
+
+class LatenciasFontes:
+    """Janela deslizante das últimas latências (em segundos) de cada série."""
+
+    def __init__(self, janela=JANELA_LATENCIAS):
+        self._latencias = defaultdict(lambda: deque(maxlen=janela))
+        self._estourou = set()  # séries cuja última espera estourou
+        self._lock = threading.Lock()
+
+    def registrar(self, fonte, segundos):
+        with self._lock:
+            self._latencias[fonte].append(segundos)
+            self._estourou.discard(fonte)
+
+    def registrar_estouro(self, fonte):
+        with self._lock:
+            self._estourou.add(fonte)
+
+    def percentil(self, fonte, percentil):
+        """Percentil (0–100, interpolação linear) das latências da fonte, ou None sem amostras suficientes."""
+        with self._lock:
+            amostras = sorted(self._latencias[fonte])
+        if len(amostras) < AMOSTRAS_MINIMAS:
+            return None
+        posicao = (len(amostras) - 1) * percentil / 100
+        inferior = int(posicao)
+        superior = min(inferior + 1, len(amostras) - 1)
+        return amostras[inferior] + (amostras[superior] - amostras[inferior]) * (posicao - inferior)
+
+    def timeout_ms(self, fonte, teto_ms):
+        """
+        FATOR_TIMEOUT × percentil das latências, entre TIMEOUT_MINIMO_MS e `teto_ms`;
+        o teto, se a última espera da série estourou.
+        """
+        with self._lock:
+            if fonte in self._estourou:
+                return teto_ms
+        latencia = self.percentil(fonte, PERCENTIL_TIMEOUT)
+        if latencia is None:
+            return teto_ms
+        return max(min(TIMEOUT_MINIMO_MS, teto_ms), min(teto_ms, latencia * FATOR_TIMEOUT * 1000))
+
+
+# --- Instância única por processo ---
+
+_latencias = LatenciasFontes()
+
+
+def registrar_latencia(fonte, segundos):
+    """Registra quanto a série (fonte e sinal) levou para entregar o dado."""
+    _latencias.registrar(fonte, segundos)
+
+
+def registrar_estouro(fonte):
+    """Registra uma espera da série que estourou o timeout (não entra nas latências)."""
+    _latencias.registrar_estouro(fonte)
+
+
+def timeout_adaptativo_ms(fonte, teto_ms):
+    """Timeout, em milissegundos, para a próxima espera pela fonte."""
+    return _latencias.timeout_ms(fonte, teto_ms)
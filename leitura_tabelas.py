@@ -0,0 +1,194 @@
+"""
+Leitura direcionada das tabelas das páginas da B3 e da BMF.
+
+Em vez de percorrer a árvore completa montada pelo html.parser, só os elementos
+de interesse são consultados: com lxml (parser em C) quando instalado, ou com o
+html.parser do BeautifulSoup restrito por um SoupStrainer. As células de cada
+tabela saem agrupadas em colunas, prontas para virar DataFrame.
+
+lxml e bs4 só são importados na primeira leitura, para não pesar na subida da
+página quando os dados vêm do cache ou do armazém.
+"""
+from collections import namedtuple
+
+_lxml_html = None  # lxml.html, depois de _lxml(); None se o lxml não estiver instalado
+_lxml_carregado = False
+
+TEXTO_SEM_REGISTRO = "Não há registro"
+# Marca das mensagens de "Não há registro" de uma consulta anterior na mesma página (lotes de datas).
+ATRIBUTO_MENSAGEM_ANTERIOR = "data-tcam-anterior"
+
+# colunas: lista de colunas (cada uma, lista de textos); rodape: textos dos <th> do <tfoot>.
+TabelaLida = namedtuple("TabelaLida", ["colunas", "rodape"])
+
+
+def _em_colunas(textos, quantidade_colunas):
+    """Reagrupa as células, lidas linha a linha, em uma lista por coluna."""
+    return [textos[i::quantidade_colunas] for i in range(quantidade_colunas)]
+
+
+def _lxml():
+    """lxml.html, importado na primeira chamada; None se o lxml não estiver instalado."""
+    global _lxml_html, _lxml_carregado
+    if not _lxml_carregado:
+        try:
+            import lxml.html
+            _lxml_html = lxml.html
+        except ImportError:  # lxml é opcional: sem ele, usa o html.parser com SoupStrainer
+            _lxml_html = None
+        _lxml_carregado = True
+    return _lxml_html
+
+
+# --- Implementação com lxml ---
+
+def _ler_tabelas_lxml(html, especificacoes):
+    documento = _lxml().fromstring(html)
+    tabelas = {}
+    for id_tabela, quantidade_colunas in especificacoes.items():
+        tabela = documento.get_element_by_id(id_tabela, None)
+        if tabela is None or tabela.tag != "table":
+            tabelas[id_tabela] = None
+            continue
+        celulas = tabela.xpath(f".//tr[count(td)={quantidade_colunas}]/td")
+        textos = [celula.text_content().strip() for celula in celulas]
+        rodape = [th.text_content().strip() for th in tabela.xpath(".//tfoot//th")]
+        tabelas[id_tabela] = TabelaLida(_em_colunas(textos, quantidade_colunas), rodape)
+    return tabelas
+
+
+def _ler_linha_lxml(html, id_container, classe_tabela, indice_linha):
+    container = _lxml().fromstring(html).get_element_by_id(id_container, None)
+    if container is None:
+        return None
+    tabelas = container.xpath(
+        f".//table[contains(concat(' ', normalize-space(@class), ' '), ' {classe_tabela} ')]"
+    )
+    if not tabelas:
+        return None
+    linhas = tabelas[0].xpath(".//tr")
+    if len(linhas) <= indice_linha:
+        return []
+    return ["".join(t.strip() for t in td.itertext()) for td in linhas[indice_linha].xpath("./td")]
+
+
+def _ler_indicador_lxml(html, texto):
+    documento = _lxml().fromstring(html)
+    for paragrafo in documento.xpath("//p[contains(text(), $texto)]", texto=texto):
+        divs = paragrafo.xpath("ancestor::div[1]")
+        if not divs:
+            return None, None
+        valores = divs[0].xpath(".//h4")
+        datas = divs[0].xpath(".//small")
+        if valores and datas:
+            return valores[0].text_content().strip(), datas[0].text_content().strip()
+        return None, None
+    return None, None
+
+
+# --- Implementação com BeautifulSoup + SoupStrainer ---
+
+def _ler_tabelas_bs4(html, especificacoes):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("table", id=list(especificacoes)))
+    tabelas = {}
+    for id_tabela, quantidade_colunas in especificacoes.items():
+        tabela = soup.find("table", id=id_tabela)
+        if tabela is None:
+            tabelas[id_tabela] = None
+            continue
+        textos = []
+        for linha in tabela.find_all("tr"):
+            celulas = linha.find_all("td", recursive=False)
+            if len(celulas) == quantidade_colunas:
+                textos.extend(celula.text.strip() for celula in celulas)
+        tfoot = tabela.find("tfoot")
+        rodape = [th.text.strip() for th in tfoot.find_all("th")] if tfoot else []
+        tabelas[id_tabela] = TabelaLida(_em_colunas(textos, quantidade_colunas), rodape)
+    return tabelas
+
+
+def _ler_linha_bs4(html, id_container, classe_tabela, indice_linha):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    container = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer(id=id_container)).find(id=id_container)
+    if container is None:
+        return None
+    tabela = container.find("table", class_=classe_tabela)
+    if tabela is None:
+        return None
+    linhas = tabela.find_all("tr")
+    if len(linhas) <= indice_linha:
+        return []
+    return [td.get_text(strip=True) for td in linhas[indice_linha].find_all("td")]
+
+
+def _ler_indicador_bs4(html, texto):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    bloco = soup.find("p", string=lambda t: t and texto in t)
+    if bloco:
+        div_mae = bloco.find_parent("div")
+        if div_mae:
+            valor_tag = div_mae.find("h4")
+            data_tag = div_mae.find("small")
+            if valor_tag and data_tag:
+                return valor_tag.text.strip(), data_tag.text.strip()
+    return None, None
+
+
+# --- Interface pública ---
+
+def ler_tabelas(html, especificacoes):
+    """
+    Lê as tabelas indicadas por `especificacoes` ({id_da_tabela: quantidade_de_colunas}).
+    Só entram as linhas com exatamente essa quantidade de <td> (cabeçalhos com <th>
+    ficam de fora). Retorna {id_da_tabela: TabelaLida ou None se a tabela não existir}.
+    """
+    if _lxml() is not None:
+        return _ler_tabelas_lxml(html, especificacoes)
+    return _ler_tabelas_bs4(html, especificacoes)
+
+
+def ler_linha_tabela(html, id_container, classe_tabela, indice_linha):
+    """
+    Textos das células <td> da linha `indice_linha` da primeira tabela com a classe
+    `classe_tabela` dentro do elemento `id_container`. Retorna None se o container
+    ou a tabela não existirem e lista vazia se a linha não existir.
+    """
+    if _lxml() is not None:
+        return _ler_linha_lxml(html, id_container, classe_tabela, indice_linha)
+    return _ler_linha_bs4(html, id_container, classe_tabela, indice_linha)
+
+
+def ler_indicador(html, texto):
+    """
+    Localiza o <p> com `texto` e devolve (texto do <h4>, texto do <small>) da <div>
+    que o contém, ou (None, None) se o indicador não estiver na página.
+    """
+    if texto not in html:
+        return None, None
+    if _lxml() is not None:
+        return _ler_indicador_lxml(html, texto)
+    return _ler_indicador_bs4(html, texto)
+
+
+def tem_mensagem_sem_registro(html):
+    """
+    Indica se a página da B3 exibe a mensagem de "Não há registro" em uma <div>.
+    Mensagens marcadas com ATRIBUTO_MENSAGEM_ANTERIOR (de uma consulta anterior) não contam.
+    """
+    if TEXTO_SEM_REGISTRO not in html:
+        return False
+    if _lxml() is not None:
+        return bool(_lxml().fromstring(html).xpath(
+            f"//div[not(@{ATRIBUTO_MENSAGEM_ANTERIOR})][contains(text(), $texto)]", texto=TEXTO_SEM_REGISTRO,
+        ))
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("div"))
+    return soup.find(
+        "div", string=lambda t: t and TEXTO_SEM_REGISTRO in t, attrs={ATRIBUTO_MENSAGEM_ANTERIOR: False},
+    ) is not None
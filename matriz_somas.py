@@ -0,0 +1,63 @@
+"""
+Somas TCAM + indicador para várias datas e vários indicadores de uma vez.
+
+A TCAM tipada (uma linha por data, como a de combinar_dados_b3) vira uma matriz
+datas × estatísticas; os indicadores, uma matriz datas × indicadores. As somas
+saem de uma única operação vetorizada (broadcasting), com forma
+datas × estatísticas × indicadores, e são devolvidas em um DataFrame longo,
+indexado por (Data, Estatística). A formatação no padrão brasileiro fica na
+exibição, por coluna (esquema_tabelas.formatar_br).
+
+Um indicador pode ser um número (o mesmo para todas as datas), uma Series
+indexada por data (um valor por data) ou None (ainda não disponível: as somas
+dele ficam NaN). Assim cabem, por exemplo, todos os vencimentos da curva de FRP.
+"""
+import numpy as np
+import pandas as pd
+
+# Colunas da TCAM somadas aos indicadores e o rótulo de cada uma na exibição.
+ESTATISTICAS_TCAM = {"Fechamento": "Fechamento", "Mínima": "Mínimo", "Média": "Média", "Máxima": "Máximo"}
+COLUNA_TCAM = "TCAM"
+NIVEIS = ("Data", "Estatística")
+
+
+def coluna_soma(nome):
+    """Nome da coluna com a soma TCAM + indicador."""
+    return f"{COLUNA_TCAM} + {nome}"
+
+
+def _valores_por_data(valor, datas):
+    """Vetor do indicador alinhado às datas (float64; NaN onde não houver valor)."""
+    if valor is None:
+        return np.full(len(datas), np.nan)
+    if isinstance(valor, pd.Series):
+        serie = valor.copy()
+        serie.index = pd.to_datetime(serie.index)
+        return serie.reindex(datas).to_numpy(dtype="float64", na_value=np.nan)
+    return np.full(len(datas), float(valor))
+
+
+def calcular_matriz_somas(df_tcam, indicadores, coluna_data="Data"):
+    """
+    Somas de cada estatística da TCAM com cada indicador, para todas as datas.
+
+    `indicadores` é {nome: número | Series por data | None}. Retorna um DataFrame
+    indexado por (Data, Estatística), com a coluna TCAM, uma coluna com o valor
+    de cada indicador e uma coluna "TCAM + nome" por indicador, todas float64.
+    """
+    datas = pd.DatetimeIndex(pd.to_datetime(df_tcam[coluna_data]), name=NIVEIS[0])
+    nomes = list(indicadores)
+    tcam = df_tcam[list(ESTATISTICAS_TCAM)].to_numpy(dtype="float64")  # datas × estatísticas
+    valores = np.empty((len(datas), len(nomes)))  # datas × indicadores
+    for coluna, nome in enumerate(nomes):
+        valores[:, coluna] = _valores_por_data(indicadores[nome], datas)
+
+    somas = tcam[:, :, np.newaxis] + valores[:, np.newaxis, :]  # datas × estatísticas × indicadores
+    linhas = tcam.size
+    dados = np.hstack([
+        tcam.reshape(linhas, 1),
+        np.repeat(valores, len(ESTATISTICAS_TCAM), axis=0),
+        somas.reshape(linhas, len(nomes)),
+    ])
+    indice = pd.MultiIndex.from_product([datas, list(ESTATISTICAS_TCAM.values())], names=NIVEIS)
+    return pd.DataFrame(dados, index=indice, columns=[COLUNA_TCAM, *nomes, *map(coluna_soma, nomes)])
@@ -0,0 +1,156 @@
+"""
+Métricas de tempo por etapa das extrações.
+
+Cada etapa (partida do navegador, goto, espera pelos dados, page.content(),
+leitura do HTML, montagem dos DataFrames, renderização) é medida por fonte e
+guardada em histogramas e em uma janela das amostras recentes, junto com
+contadores de acertos/falhas de cache e bytes recebidos. As métricas podem ser
+emitidas como logs estruturados (uma linha JSON por medição) e exportadas em
+um arquivo de texto no formato do Prometheus (para o textfile collector do
+node_exporter, por exemplo). A aba de diagnóstico da página lê as amostras
+recentes deste processo.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Arquivo no formato de texto do Prometheus; vazio desliga a exportação
+ARQUIVO_METRICAS = os.environ.get("TCAM_METRICAS_ARQUIVO", "")
+INTERVALO_EXPORTACAO = float(os.environ.get("TCAM_METRICAS_INTERVALO", "15"))  # segundos
+# "1" imprime cada medição como uma linha JSON
+LOG_METRICAS = os.environ.get("TCAM_METRICAS_LOG", "0") == "1"
+AMOSTRAS_RECENTES = int(os.environ.get("TCAM_METRICAS_AMOSTRAS", "2000"))
+
+LIMITES_HISTOGRAMA = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # segundos
+
+
+class RegistroMetricas:
+    """Histogramas de duração por (fonte, etapa), contadores e amostras recentes, protegidos por lock."""
+
+    def __init__(self, arquivo=ARQUIVO_METRICAS):
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._baldes = defaultdict(lambda: [0] * (len(LIMITES_HISTOGRAMA) + 1))
+        self._somas = defaultdict(float)
+        self._contadores = defaultdict(float)
+        self._amostras = deque(maxlen=AMOSTRAS_RECENTES)
+        self._exportado_em = 0.0
+
+    def observar(self, fonte, etapa, segundos):
+        """Registra a duração de uma etapa."""
+        chave = (fonte, etapa)
+        with self._lock:
+            baldes = self._baldes[chave]
+            for i, limite in enumerate(LIMITES_HISTOGRAMA):
+                if segundos <= limite:
+                    baldes[i] += 1
+                    break
+            else:
+                baldes[-1] += 1
+            self._somas[chave] += segundos
+            self._amostras.append((datetime.now(), fonte, etapa, segundos))
+        if LOG_METRICAS:
+            print(json.dumps({"metrica": "duracao", "fonte": fonte, "etapa": etapa, "segundos": round(segundos, 4)}))
+        self._exportar_se_preciso()
+
+    def contar(self, nome, fonte, valor=1):
+        """Incrementa um contador (acertos de cache, bytes recebidos...)."""
+        with self._lock:
+            self._contadores[(nome, fonte)] += valor
+        if LOG_METRICAS:
+            print(json.dumps({"metrica": nome, "fonte": fonte, "valor": valor}))
+
+    @contextmanager
+    def medir(self, fonte, etapa):
+        """Mede o bloco como uma etapa da fonte (inclusive quando ele levanta exceção)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(fonte, etapa, time.perf_counter() - inicio)
+
+    def amostras_recentes(self):
+        """Lista de (momento, fonte, etapa, segundos) das medições mais recentes."""
+        with self._lock:
+            return list(self._amostras)
+
+    def contadores(self):
+        """{(nome, fonte): valor} de todos os contadores."""
+        with self._lock:
+            return dict(self._contadores)
+
+    def texto_prometheus(self):
+        """Métricas no formato de texto de exposição do Prometheus."""
+        with self._lock:
+            baldes = {chave: list(valores) for chave, valores in self._baldes.items()}
+            somas = dict(self._somas)
+            contadores = dict(self._contadores)
+
+        linhas = [
+            "# HELP tcam_etapa_segundos Duração de cada etapa das extrações.",
+            "# TYPE tcam_etapa_segundos histogram",
+        ]
+        for (fonte, etapa), valores in sorted(baldes.items()):
+            rotulos = f'fonte="{fonte}",etapa="{etapa}"'
+            acumulado = 0
+            for limite, quantidade in zip(LIMITES_HISTOGRAMA + ("+Inf",), valores):
+                acumulado += quantidade
+                linhas.append(f'tcam_etapa_segundos_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f"tcam_etapa_segundos_sum{{{rotulos}}} {somas[(fonte, etapa)]:.6f}")
+            linhas.append(f"tcam_etapa_segundos_count{{{rotulos}}} {acumulado}")
+        for nome in sorted({nome for nome, _ in contadores}):
+            linhas.append(f"# TYPE tcam_{nome}_total counter")
+            for (nome_contador, fonte), valor in sorted(contadores.items()):
+                if nome_contador == nome:
+                    linhas.append(f'tcam_{nome}_total{{fonte="{fonte}"}} {valor:g}')
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self):
+        """Grava o arquivo do Prometheus de forma atômica (temporário + os.replace)."""
+        if not self.arquivo:
+            return
+        diretorio = os.path.dirname(os.path.abspath(self.arquivo))
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = os.path.join(diretorio, f".tmp-{uuid.uuid4().hex}.prom")
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(self.texto_prometheus())
+        os.replace(temporario, self.arquivo)
+
+    def _exportar_se_preciso(self):
+        if not self.arquivo or time.monotonic() - self._exportado_em < INTERVALO_EXPORTACAO:
+            return
+        self._exportado_em = time.monotonic()
+        try:
+            self.exportar()
+        except OSError as e:
+            print(f"Erro ao exportar métricas para {self.arquivo}: {e}")
+
+
+# --- Instância única por processo ---
+
+_metricas = RegistroMetricas()
+
+
+def obter_metricas():
+    """Retorna o registro de métricas do processo."""
+    return _metricas
+
+
+def medir(fonte, etapa):
+    """Atalho para RegistroMetricas.medir no registro do processo."""
+    return _metricas.medir(fonte, etapa)
+
+
+def observar(fonte, etapa, segundos):
+    """Atalho para RegistroMetricas.observar no registro do processo."""
+    _metricas.observar(fonte, etapa, segundos)
+
+
+def contar(nome, fonte, valor=1):
+    """Atalho para RegistroMetricas.contar no registro do processo."""
+    _metricas.contar(nome, fonte, valor)
@@ -0,0 +1,90 @@
+"""
+Execução concorrente das extrações.
+
+Cada extração roda em uma thread de um pool limitado; o trabalho de navegador é
+repassado ao pool de Chromium (pool_navegador). O chamador pode esperar todas as
+fontes juntas (executar_extracoes) ou receber cada uma assim que termina
+(executar_extracoes_conforme_concluem), para exibir os dados aos poucos.
+
+As tarefas rodam com o contexto de quem as disparou, então um prazo total
+(resiliencia.prazo_total) vale também dentro delas; fontes que não terminam
+dentro do prazo voltam com PrazoEsgotado.
+"""
+import contextvars
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TempoEsgotadoFuturo, as_completed
+
+from metricas import medir
+from resiliencia import PrazoEsgotado, ValorDesatualizado, tempo_restante
+
+TRABALHADORES_EXTRACAO = int(os.environ.get("TCAM_TRABALHADORES_EXTRACAO", "5"))
+
+# valor: retorno da função de extração; erro: exceção levantada (ou None).
+# Com ValorDesatualizado em `erro`, `valor` traz o último valor conhecido.
+ResultadoExtracao = namedtuple("ResultadoExtracao", ["valor", "erro"])
+
+_executor = ThreadPoolExecutor(max_workers=TRABALHADORES_EXTRACAO, thread_name_prefix="extracao")
+
+# Folga sobre o prazo total para a própria tarefa reportar PrazoEsgotado antes do motor
+MARGEM_PRAZO = 2.0  # segundos
+
+
+def _executar_medido(chave, funcao, args):
+    """Executa a tarefa registrando a duração total da fonte nas métricas."""
+    with medir(chave, "total"):
+        return funcao(*args)
+
+
+def _submeter(tarefas):
+    """Submete as tarefas ({chave: (funcao, args)}) ao executor e devolve {futuro: chave}."""
+    return {
+        _executor.submit(contextvars.copy_context().run, _executar_medido, chave, funcao, args): chave
+        for chave, (funcao, args) in tarefas.items()
+    }
+
+
+def _limite_espera():
+    """Até quando (time.monotonic) esperar pelas tarefas: o prazo total mais a folga, ou None."""
+    restante = tempo_restante()
+    return None if restante is None else time.monotonic() + restante + MARGEM_PRAZO
+
+
+def _resultado(futuro, chave, limite=None):
+    timeout = None if limite is None else max(0.0, limite - time.monotonic())
+    try:
+        return ResultadoExtracao(futuro.result(timeout), None)
+    except TempoEsgotadoFuturo:
+        return ResultadoExtracao(None, PrazoEsgotado(chave))
+    except ValorDesatualizado as e:
+        return ResultadoExtracao(e.valor, e)
+    except Exception as e:
+        return ResultadoExtracao(None, e)
+
+
+def executar_extracoes(tarefas):
+    """
+    Dispara todas as tarefas em paralelo e aguarda a conclusão de todas.
+    `tarefas` é um dict {chave: (funcao, args)}.
+    Retorna {chave: ResultadoExtracao}; uma falha em uma fonte não afeta as demais.
+    """
+    futuros = _submeter(tarefas)
+    limite = _limite_espera()
+    return {chave: _resultado(futuro, chave, limite) for futuro, chave in futuros.items()}
+
+
+def executar_extracoes_conforme_concluem(tarefas):
+    """
+    Dispara todas as tarefas em paralelo e gera (chave, ResultadoExtracao) na
+    ordem em que cada uma termina, sem esperar a mais lenta.
+    """
+    futuros = _submeter(tarefas)
+    limite = _limite_espera()
+    pendentes = dict(futuros)
+    try:
+        for futuro in as_completed(futuros, timeout=None if limite is None else max(0.0, limite - time.monotonic())):
+            yield pendentes.pop(futuro), _resultado(futuro, futuros[futuro])
+    except TempoEsgotadoFuturo:
+        for chave in pendentes.values():
+            yield chave, ResultadoExtracao(None, PrazoEsgotado(chave))
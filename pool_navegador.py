@@ -0,0 +1,377 @@
+"""
+Pool de navegadores Chromium compartilhado por todo o processo.
+
+O Playwright síncrono só pode ser usado na thread que o iniciou, então cada
+navegador "quente" vive dentro de uma thread trabalhadora própria. Os extratores
+enviam uma função que recebe uma página nova (em um contexto novo e isolado) e
+recebem o resultado de volta, sem pagar a partida a frio do Chromium a cada uso.
+
+Os navegadores sobem na primeira tarefa de cada trabalhador e são fechados (não
+reciclados) depois de OCIOSIDADE_MAXIMA segundos sem uso ou quando ficam velhos:
+um processo que só lê o armazém (réplicas da página, API) não mantém Chromium aberto. Só os
+TCAM_POOL_AQUECIDOS primeiros trabalhadores sobem o navegador na criação do pool
+e o mantêm aquecido, limitados ao limite global de tarefas, quando houver.
+
+Controle de admissão: a quantidade de tarefas simultâneas é a quantidade de
+navegadores do pool; as demais esperam em uma fila de prioridade (TCAM 01 antes
+das datas anteriores) por no máximo TIMEOUT_FILA segundos. Opcionalmente, um
+limite global de tarefas vale para todos os processos que compartilham o
+diretório de locks.
+
+Dentro de um prazo total (resiliencia.prazo_total), a tarefa roda com o contexto
+de quem a submeteu, a espera na fila não passa do prazo e `result()` levanta
+PrazoEsgotado quando ele acaba.
+"""
+import atexit
+import contextvars
+import functools
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future, TimeoutError as TempoEsgotadoFuturo
+
+from filelock import FileLock, Timeout
+
+from metricas import medir
+from preparar_ambiente import aguardar_navegador
+from resiliencia import EsperaEsgotada, PrazoEsgotado, fim_do_prazo, tempo_restante
+from voo_unico import DIR_LOCKS
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+
+TAMANHO_POOL = int(os.environ.get("TCAM_POOL_NAVEGADORES", "5"))
+IDADE_MAXIMA_NAVEGADOR = float(os.environ.get("TCAM_POOL_IDADE_MAXIMA", "1800"))  # segundos
+MAX_USOS_NAVEGADOR = int(os.environ.get("TCAM_POOL_MAX_USOS", "200"))
+INTERVALO_VERIFICACAO = float(os.environ.get("TCAM_POOL_INTERVALO_VERIFICACAO", "30"))  # segundos
+# Tempo máximo de espera na fila antes de a tarefa ser recusada
+TIMEOUT_FILA = float(os.environ.get("TCAM_POOL_TIMEOUT_FILA", "120"))  # segundos
+# Limite de tarefas de navegador simultâneas somando todos os processos (0 = sem limite global)
+MAX_TAREFAS_GLOBAL = int(os.environ.get("TCAM_POOL_MAX_TAREFAS_GLOBAL", "0"))
+# Navegadores abertos já na criação do pool e mantidos aquecidos (os demais sobem sob demanda)
+NAVEGADORES_AQUECIDOS = int(os.environ.get("TCAM_POOL_AQUECIDOS", "0"))
+# Tempo sem tarefas depois do qual um navegador não aquecido é fechado
+OCIOSIDADE_MAXIMA = float(os.environ.get("TCAM_POOL_OCIOSIDADE_MAXIMA", "300"))  # segundos
+
+# Prioridades da fila (menor valor é atendido primeiro)
+PRIORIDADE_TCAM01 = 0
+PRIORIDADE_INDICADORES = 1
+PRIORIDADE_DATAS_ANTERIORES = 2
+_PRIORIDADE_FIM = 99
+
+_FIM = object()
+
+
+class TempoEsgotadoNaFila(EsperaEsgotada):
+    """A tarefa não conseguiu um navegador dentro do tempo máximo de espera na fila."""
+
+    def __init__(self, espera):
+        super().__init__(f"Nenhum navegador disponível após {espera:.0f} s na fila.")
+        self.espera = espera
+
+
+class _FuturoNavegador(Future):
+    """
+    Future que informa TempoEsgotadoNaFila quando foi cancelado por esperar demais,
+    e PrazoEsgotado quando o prazo total de quem o submeteu acaba antes do resultado.
+    """
+
+    def __init__(self, timeout_fila):
+        super().__init__()
+        self.timeout_fila = timeout_fila
+        self.prazo = time.monotonic() + timeout_fila if timeout_fila else None
+        self.fim_prazo_total = fim_do_prazo()
+
+    def expirar(self):
+        """Cancela a tarefa ainda na fila se o prazo tiver passado. Retorna True se cancelou."""
+        return self.prazo is not None and time.monotonic() >= self.prazo and self.cancel()
+
+    def result(self, timeout=None):
+        pelo_prazo_total = False
+        if self.fim_prazo_total is not None:
+            limite = max(0.0, self.fim_prazo_total - time.monotonic())
+            if timeout is None or timeout > limite:
+                timeout, pelo_prazo_total = limite, True
+        try:
+            return super().result(timeout)
+        except CancelledError:
+            if self.prazo is not None and time.monotonic() >= self.prazo:
+                raise TempoEsgotadoNaFila(self.timeout_fila) from None
+            raise
+        except TempoEsgotadoFuturo:
+            if not pelo_prazo_total:
+                raise
+            self.cancel()
+            raise PrazoEsgotado() from None
+
+
+def _adquirir_vaga_global(futuro):
+    """
+    Ocupa uma das MAX_TAREFAS_GLOBAL vagas (arquivos de lock compartilhados entre
+    processos) até o prazo da tarefa na fila. Retorna o lock, ou None sem limite global.
+    """
+    if MAX_TAREFAS_GLOBAL <= 0:
+        return None
+    os.makedirs(DIR_LOCKS, exist_ok=True)
+    vagas = [FileLock(os.path.join(DIR_LOCKS, f"navegador-vaga-{i}.lock")) for i in range(MAX_TAREFAS_GLOBAL)]
+    while True:
+        for vaga in vagas:
+            try:
+                vaga.acquire(timeout=0)
+                return vaga
+            except Timeout:
+                continue
+        if futuro.prazo is not None and time.monotonic() >= futuro.prazo:
+            raise TempoEsgotadoNaFila(futuro.timeout_fila)
+        time.sleep(0.1)
+
+
+def memoria_navegadores():
+    """
+    Memória residente (bytes) somada de todos os processos descendentes deste
+    processo (Chromium e seus subprocessos), lida do /proc. None fora do Linux.
+    """
+    try:
+        pids = [int(nome) for nome in os.listdir("/proc") if nome.isdigit()]
+    except FileNotFoundError:
+        return None
+    filhos = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as arquivo:
+                # O nome do processo (2º campo) pode ter espaços: o ppid vem depois do último ")"
+                ppid = int(arquivo.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        filhos.setdefault(ppid, []).append(pid)
+
+    total = 0
+    tamanho_pagina = os.sysconf("SC_PAGE_SIZE")
+    pendentes = list(filhos.get(os.getpid(), []))
+    while pendentes:
+        pid = pendentes.pop()
+        pendentes.extend(filhos.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm") as arquivo:
+                total += int(arquivo.read().split()[1]) * tamanho_pagina
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class _TrabalhadorNavegador(threading.Thread):
+    """Thread dona de uma instância do Playwright e de um Chromium aquecido."""
+
+    def __init__(self, fila, indice, aquecer=False):
+        super().__init__(name=f"pool-navegador-{indice}", daemon=True)
+        self.fila = fila
+        self.aquecer = aquecer
+        self.ocupado = False
+        self._playwright = None
+        self._navegador = None
+        self._iniciado_em = 0.0
+        self._usado_em = 0.0
+        self._usos = 0
+
+    def _navegador_saudavel(self):
+        """Verifica conexão, idade máxima e quantidade de usos do navegador atual."""
+        if self._navegador is None or not self._navegador.is_connected():
+            return False
+        if time.monotonic() - self._iniciado_em > IDADE_MAXIMA_NAVEGADOR:
+            return False
+        return self._usos < MAX_USOS_NAVEGADOR
+
+    def _fechar_navegador(self):
+        if self._navegador is not None:
+            try:
+                self._navegador.close()
+            except Exception as e:
+                print(f"[{self.name}] Erro ao fechar navegador: {e}")
+            self._navegador = None
+
+    def _reciclar(self):
+        """Fecha o navegador atual (se houver) e sobe um Chromium novo."""
+        self._fechar_navegador()
+        if self._playwright is None:
+            # Importado aqui: o Playwright só é carregado quando uma extração de fato precisa do navegador
+            from playwright.sync_api import sync_playwright
+
+            aguardar_navegador()
+            self._playwright = sync_playwright().start()
+        with medir("chromium", "inicio_navegador"):
+            self._navegador = self._playwright.chromium.launch(headless=True)
+        self._iniciado_em = self._usado_em = time.monotonic()
+        self._usos = 0
+
+    def _garantir_navegador(self):
+        if not self._navegador_saudavel():
+            self._reciclar()
+
+    def _executar_tarefa(self, funcao, futuro):
+        # Tarefas canceladas (prazo na fila esgotado) são descartadas
+        if not futuro.set_running_or_notify_cancel():
+            return
+        self.ocupado = True
+        vaga = None
+        try:
+            vaga = _adquirir_vaga_global(futuro)
+            self._garantir_navegador()
+            contexto = self._navegador.new_context()
+            try:
+                pagina = contexto.new_page()
+                resultado = funcao(pagina)
+            finally:
+                contexto.close()
+            self._usos += 1
+            self._usado_em = time.monotonic()
+            futuro.set_result(resultado)
+        except Exception as e:
+            # Se o navegador caiu, a verificação de saúde recicla na próxima tarefa.
+            futuro.set_exception(e)
+        finally:
+            if vaga is not None:
+                vaga.release()
+            self.ocupado = False
+
+    def run(self):
+        if self.aquecer:
+            try:
+                self._garantir_navegador()  # Aquece o navegador antes da primeira tarefa
+            except Exception as e:
+                print(f"[{self.name}] Não foi possível iniciar o Chromium: {e}")
+
+        while True:
+            try:
+                _, _, tarefa = self.fila.get(timeout=INTERVALO_VERIFICACAO)
+            except queue.Empty:
+                # Ocioso: recicla navegadores aquecidos velhos ou desconectados; fecha
+                # os demais nesses casos ou quando passam de OCIOSIDADE_MAXIMA sem uso.
+                try:
+                    if self._navegador is not None:
+                        if self.aquecer:
+                            self._garantir_navegador()
+                        elif not self._navegador_saudavel() or time.monotonic() - self._usado_em > OCIOSIDADE_MAXIMA:
+                            self._fechar_navegador()
+                except Exception as e:
+                    print(f"[{self.name}] Falha na verificação de saúde: {e}")
+                    self._navegador = None
+                continue
+
+            if tarefa is _FIM:
+                break
+            self._executar_tarefa(*tarefa)
+
+        self._fechar_navegador()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                print(f"[{self.name}] Erro ao encerrar Playwright: {e}")
+            self._playwright = None
+
+
+class PoolNavegadores:
+    """
+    Conjunto de navegadores Chromium, abertos sob demanda (ou aquecidos desde a criação).
+    Cada tarefa recebe uma página em um contexto novo, que é fechado ao final.
+    As tarefas esperam em uma fila de prioridade, com prazo máximo de espera.
+    """
+
+    def __init__(self, tamanho=TAMANHO_POOL, aquecidos=NAVEGADORES_AQUECIDOS):
+        self._fila = queue.PriorityQueue()
+        self._sequencia = itertools.count()  # desempate: mesma prioridade, ordem de chegada
+        self._encerrado = False
+        if MAX_TAREFAS_GLOBAL > 0:
+            # Mais navegadores aquecidos do que vagas globais seria memória ociosa
+            aquecidos = min(aquecidos, MAX_TAREFAS_GLOBAL)
+        self._trabalhadores = [_TrabalhadorNavegador(self._fila, i, aquecer=i < aquecidos) for i in range(max(1, tamanho))]
+        for trabalhador in self._trabalhadores:
+            trabalhador.start()
+        self._vigia = threading.Thread(target=self._vigiar_fila, name="pool-navegador-vigia", daemon=True)
+        self._vigia.start()
+
+    def _vigiar_fila(self):
+        """Cancela, a cada segundo, as tarefas que passaram do prazo de espera na fila."""
+        while not self._encerrado:
+            with self._fila.mutex:
+                tarefas = [item[2] for item in self._fila.queue if item[2] is not _FIM]
+            for _, futuro in tarefas:
+                futuro.expirar()
+            time.sleep(1.0)
+
+    def submeter(self, funcao, prioridade=PRIORIDADE_INDICADORES, timeout_fila=TIMEOUT_FILA):
+        """
+        Agenda `funcao(pagina)` em um navegador livre e devolve um Future. Tarefas de
+        menor `prioridade` são atendidas primeiro; se nenhuma vaga surgir em
+        `timeout_fila` segundos, o Future termina com TempoEsgotadoNaFila.
+        """
+        if self._encerrado:
+            raise RuntimeError("Pool de navegadores já foi encerrado.")
+        restante = tempo_restante()
+        if restante is not None:
+            timeout_fila = min(timeout_fila, restante) if timeout_fila else restante
+        futuro = _FuturoNavegador(timeout_fila)
+        # A tarefa enxerga o contexto de quem a submeteu (prazo total, por exemplo)
+        funcao_no_contexto = functools.partial(contextvars.copy_context().run, funcao)
+        self._fila.put((prioridade, next(self._sequencia), (funcao_no_contexto, futuro)))
+        return futuro
+
+    def executar(self, funcao, timeout=None, prioridade=PRIORIDADE_INDICADORES):
+        """Executa `funcao(pagina)` em um navegador do pool e aguarda o resultado."""
+        return self.submeter(funcao, prioridade).result(timeout=timeout)
+
+    def estatisticas(self):
+        """Profundidade da fila, tarefas em execução, navegadores abertos e memória dos navegadores."""
+        with self._fila.mutex:
+            na_fila = sum(1 for item in self._fila.queue if item[2] is not _FIM and not item[2][1].done())
+        return {
+            "na_fila": na_fila,
+            "em_execucao": sum(1 for t in self._trabalhadores if t.ocupado),
+            "navegadores": sum(1 for t in self._trabalhadores if t._navegador is not None),
+            "memoria_bytes": memoria_navegadores(),
+        }
+
+    def encerrar(self, timeout=10):
+        """Fecha todos os navegadores e finaliza as threads trabalhadoras."""
+        if self._encerrado:
+            return
+        self._encerrado = True
+        for _ in self._trabalhadores:
+            self._fila.put((_PRIORIDADE_FIM, next(self._sequencia), _FIM))
+        for trabalhador in self._trabalhadores:
+            trabalhador.join(timeout=timeout)
+
+
+# --- Instância única por processo ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    """Retorna o pool do processo, criando-o na primeira chamada."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolNavegadores()
+        return _pool
+
+
+def estatisticas_pool():
+    """Estatísticas do pool do processo, ou None se ele ainda não foi criado."""
+    with _pool_lock:
+        pool = _pool
+    return pool.estatisticas() if pool is not None else None
+
+
+def encerrar_pool():
+    """Encerra o pool do processo (registrado para rodar na saída do interpretador)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.encerrar()
+            _pool = None
+
+
+atexit.register(encerrar_pool)
@@ -0,0 +1,151 @@
+"""
+Preparação do navegador fora do caminho das visitas.
+
+O Chromium do Playwright é instalado e verificado uma única vez, na implantação
+ou na subida da réplica, e o resultado fica em um marcador
+(TCAM_MARCADOR_NAVEGADOR) com a versão do Playwright verificada. A página e o
+pool de navegadores só consultam o marcador; uma atualização do Playwright
+invalida o marcador e a preparação é refeita.
+
+Onde não há etapa de implantação (ex.: Streamlit Community Cloud), a página
+dispara a preparação em segundo plano na primeira execução, sem bloquear a
+visita, e o pool de navegadores aguarda a preparação antes de subir o Chromium.
+
+Uso:
+    python preparar_ambiente.py              instala e verifica o Chromium (código de saída 0 se pronto)
+    python preparar_ambiente.py --verificar  só confere o marcador (verificação de prontidão)
+    python preparar_ambiente.py --refazer    descarta o marcador e prepara de novo
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime
+from importlib import metadata
+
+from filelock import FileLock
+
+MARCADOR_NAVEGADOR = os.environ.get("TCAM_MARCADOR_NAVEGADOR", ".navegador_pronto")
+TIMEOUT_PREPARACAO = float(os.environ.get("TCAM_TIMEOUT_PREPARACAO", "600"))  # segundos
+
+_pronto = False
+_preparacao_lock = threading.Lock()  # mantido durante toda a instalação
+_thread_lock = threading.Lock()  # só protege _thread_preparacao: nunca espera pela instalação
+_thread_preparacao = None
+
+
+def _versao_playwright():
+    try:
+        return metadata.version("playwright")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def navegador_pronto():
+    """Indica se o Chromium já foi instalado e verificado para o Playwright instalado (só lê o marcador)."""
+    global _pronto
+    if _pronto:
+        return True
+    try:
+        with open(MARCADOR_NAVEGADOR, encoding="utf-8") as arquivo:
+            marcador = json.load(arquivo)
+    except (OSError, ValueError):
+        return False
+    _pronto = marcador.get("playwright") == _versao_playwright()
+    return _pronto
+
+
+def _instalar_chromium():
+    resultado = subprocess.run(
+        [sys.executable, "-m", "playwright", "install", "chromium"],
+        capture_output=True,
+        text=True,
+        check=True,
+        encoding="utf-8",
+        timeout=TIMEOUT_PREPARACAO,
+    )
+    print(f"Playwright install stdout: {resultado.stdout}")
+    if resultado.stderr:
+        print(f"Playwright install stderr: {resultado.stderr}")
+
+
+def _verificar_chromium():
+    """Sobe o Chromium, renderiza uma página local e devolve a versão do navegador."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        navegador = playwright.chromium.launch(headless=True)
+        try:
+            page = navegador.new_page()
+            page.set_content("<p id='pronto'>ok</p>")
+            if page.inner_text("#pronto") != "ok":
+                raise RuntimeError("o Chromium subiu, mas não renderizou a página de teste.")
+            return navegador.version
+        finally:
+            navegador.close()
+
+
+def preparar_navegador(refazer=False):
+    """
+    Instala e verifica o Chromium, se ainda não estiver pronto, e grava o
+    marcador. Threads e processos (réplicas no mesmo disco) que chegam durante
+    a preparação esperam por ela. Retorna True se o navegador ficou pronto.
+    """
+    global _pronto
+    with _preparacao_lock, FileLock(f"{MARCADOR_NAVEGADOR}.lock", timeout=TIMEOUT_PREPARACAO):
+        if refazer:
+            _pronto = False
+            if os.path.exists(MARCADOR_NAVEGADOR):
+                os.remove(MARCADOR_NAVEGADOR)
+        elif navegador_pronto():
+            return True
+        try:
+            _instalar_chromium()
+            versao_chromium = _verificar_chromium()
+        except subprocess.CalledProcessError as e:
+            print(f"Erro ao instalar Playwright Chromium via subprocess: {e.stderr}")
+            return False
+        except Exception as e:
+            print(f"Erro ao preparar o Chromium: {e}")
+            return False
+        with open(MARCADOR_NAVEGADOR, "w", encoding="utf-8") as arquivo:
+            json.dump({
+                "playwright": _versao_playwright(),
+                "chromium": versao_chromium,
+                "verificado_em": datetime.now().isoformat(timespec="seconds"),
+            }, arquivo)
+        _pronto = True
+        print(f"Chromium {versao_chromium} instalado e verificado.")
+        return True
+
+
+def preparar_em_segundo_plano():
+    """Dispara preparar_navegador em uma thread (uma vez por processo), sem esperar."""
+    global _thread_preparacao
+    with _thread_lock:
+        if _thread_preparacao is None and not navegador_pronto():
+            _thread_preparacao = threading.Thread(target=preparar_navegador, name="preparar-navegador", daemon=True)
+            _thread_preparacao.start()
+
+
+def aguardar_navegador():
+    """Garante o navegador pronto antes de subir o Chromium (preparando agora, se preciso)."""
+    if not navegador_pronto():
+        preparar_navegador()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Instala e verifica o Chromium usado pelas extrações.")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--verificar", action="store_true", help="Só confere o marcador, sem instalar.")
+    grupo.add_argument("--refazer", action="store_true", help="Descarta o marcador e prepara de novo.")
+    args = parser.parse_args()
+
+    if args.verificar:
+        pronto = navegador_pronto()
+        print("Navegador pronto." if pronto else f"Navegador não preparado (marcador {MARCADOR_NAVEGADOR} ausente ou de outra versão).")
+    else:
+        pronto = preparar_navegador(refazer=args.refazer)
+    sys.exit(0 if pronto else 1)
@@ -0,0 +1,252 @@
+"""
+Resiliência das extrações: prazo total da página, novas tentativas e disjuntor por fonte.
+
+- Prazo total: a página define quanto tempo aceita esperar por todas as fontes
+  (prazo_total). O prazo viaja em uma ContextVar, copiada para as threads do
+  motor de extração e do pool de navegadores, e limita a espera na fila, os
+  timeouts das páginas e as novas tentativas.
+- Novas tentativas (tenacity): falhas transitórias (timeouts, erros de rede,
+  HTTP 5xx, sinal de dados que não chegou) são repetidas com backoff
+  exponencial e jitter, sem passar do prazo.
+- Disjuntor: depois de FALHAS_PARA_ABRIR extrações seguidas com falha
+  transitória, a fonte é dada como fora do ar e as chamadas falham na hora
+  (FonteIndisponivel) durante TEMPO_ABERTO segundos; depois disso uma única
+  chamada de teste decide se o disjuntor fecha ou volta a abrir.
+
+Quem tem um último valor conhecido (FRP0, DIF OPER CASADA) levanta
+ValorDesatualizado com ele, e a página o exibe sinalizado como desatualizado.
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metricas import contar
+
+# --- Configuração (pode ser sobrescrita por variáveis de ambiente) ---
+
+PRAZO_PAGINA = float(os.environ.get("TCAM_PRAZO_PAGINA", "45"))  # segundos
+TENTATIVAS = max(1, int(os.environ.get("TCAM_RETRY_TENTATIVAS", "3")))
+ESPERA_INICIAL = float(os.environ.get("TCAM_RETRY_ESPERA_INICIAL", "0.5"))  # segundos
+ESPERA_MAXIMA = float(os.environ.get("TCAM_RETRY_ESPERA_MAXIMA", "5"))  # segundos
+FALHAS_PARA_ABRIR = max(1, int(os.environ.get("TCAM_DISJUNTOR_FALHAS", "3")))
+TEMPO_ABERTO = float(os.environ.get("TCAM_DISJUNTOR_TEMPO_ABERTO", "60"))  # segundos
+# Sem pelo menos isso de prazo restante, não vale a pena tentar de novo
+PRAZO_MINIMO_TENTATIVA = 1.0  # segundos
+
+
+class FalhaTransitoria(Exception):
+    """Falha que tende a passar sozinha (a fonte não entregou o dado a tempo)."""
+
+
+class EsperaEsgotada(Exception):
+    """Uma espera do próprio processo acabou (prazo da página, fila do pool); não diz nada sobre a fonte."""
+
+
+class PrazoEsgotado(EsperaEsgotada):
+    """O prazo total da página acabou antes de a fonte responder."""
+
+    def __init__(self, fonte=None):
+        super().__init__(f"Prazo total esgotado{f' aguardando {fonte}' if fonte else ''}.")
+        self.fonte = fonte
+
+
+class FonteIndisponivel(Exception):
+    """O disjuntor da fonte está aberto: ela falhou seguidamente e não é consultada por enquanto."""
+
+    def __init__(self, fonte, segundos_restantes):
+        super().__init__(f"{fonte} fora do ar; nova tentativa em {segundos_restantes:.0f} s.")
+        self.fonte = fonte
+        self.segundos_restantes = segundos_restantes
+
+
+class ValorDesatualizado(Exception):
+    """A extração falhou, mas há um último valor conhecido (`valor`, capturado em `capturado_em`)."""
+
+    def __init__(self, valor, capturado_em, causa):
+        super().__init__(f"Exibindo o valor de {capturado_em:%d/%m/%Y %H:%M}: {causa}")
+        self.valor = valor
+        self.capturado_em = capturado_em
+        self.causa = causa
+
+
+def _excecoes_transitorias():
+    """
+    Exceções que merecem nova tentativa. As do urllib3 e do Playwright só entram
+    se o módulo já foi importado: sem ele, nenhum erro desses pode ter ocorrido,
+    e a página não paga a importação só para classificar erros.
+    """
+    excecoes = [FalhaTransitoria, TimeoutError, ConnectionError]
+    if "urllib3" in sys.modules:
+        excecoes.append(sys.modules["urllib3"].exceptions.HTTPError)
+    if "playwright.sync_api" in sys.modules:
+        excecoes.append(sys.modules["playwright.sync_api"].Error)
+    return tuple(excecoes)
+
+
+def eh_transitoria(erro):
+    """Indica se vale tentar de novo depois deste erro."""
+    return isinstance(erro, _excecoes_transitorias()) and not isinstance(erro, EsperaEsgotada)
+
+
+# --- Prazo total ---
+
+_fim_prazo = ContextVar("fim_prazo", default=None)
+
+
+@contextmanager
+def prazo_total(segundos=PRAZO_PAGINA):
+    """Limita a `segundos` tudo o que for extraído dentro do bloco (inclusive em outras threads)."""
+    token = _fim_prazo.set(time.monotonic() + segundos)
+    try:
+        yield
+    finally:
+        _fim_prazo.reset(token)
+
+
+def fim_do_prazo():
+    """Momento (time.monotonic) em que o prazo total acaba, ou None fora de um prazo."""
+    return _fim_prazo.get()
+
+
+def tempo_restante():
+    """Segundos restantes do prazo total (nunca negativo), ou None fora de um prazo."""
+    fim = _fim_prazo.get()
+    return None if fim is None else max(0.0, fim - time.monotonic())
+
+
+def limitar_ao_prazo_ms(timeout_ms, fonte=None):
+    """Reduz um timeout (ms) ao que resta do prazo total; levanta PrazoEsgotado se não resta nada."""
+    restante = tempo_restante()
+    if restante is None:
+        return timeout_ms
+    if restante <= 0:
+        raise PrazoEsgotado(fonte)
+    return min(timeout_ms, restante * 1000)
+
+
+# --- Disjuntor por fonte ---
+
+class Disjuntor:
+    """Disjuntor de uma fonte: fechado, aberto (falha na hora) ou meio-aberto (uma chamada de teste)."""
+
+    def __init__(self, fonte, falhas_para_abrir=FALHAS_PARA_ABRIR, tempo_aberto=TEMPO_ABERTO):
+        self.fonte = fonte
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.estado = "fechado"
+        self.falhas = 0
+        self._reabre_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        """Libera a chamada ou levanta FonteIndisponivel se o disjuntor estiver aberto."""
+        with self._lock:
+            if self.estado == "aberto":
+                restante = self._reabre_em - time.monotonic()
+                if restante > 0:
+                    raise FonteIndisponivel(self.fonte, restante)
+                self.estado = "meio_aberto"
+            if self.estado == "meio_aberto":
+                if self._teste_em_andamento:
+                    raise FonteIndisponivel(self.fonte, 0)
+                self._teste_em_andamento = True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.estado != "fechado":
+                print(f"Disjuntor de {self.fonte}: fonte respondeu, disjuntor fechado.")
+            self.estado = "fechado"
+            self.falhas = 0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.estado == "meio_aberto" or self.falhas >= self.falhas_para_abrir:
+                self.estado = "aberto"
+                self._reabre_em = time.monotonic() + self.tempo_aberto
+                print(f"Disjuntor de {self.fonte}: aberto por {self.tempo_aberto:.0f} s após {self.falhas} falha(s).")
+                contar("disjuntor_aberto", self.fonte)
+
+    def liberar(self):
+        """Encerra a chamada sem conclusão sobre a saúde da fonte (prazo da página ou fila esgotados)."""
+        with self._lock:
+            self._teste_em_andamento = False
+
+
+_disjuntores = {}
+_disjuntores_lock = threading.Lock()
+
+
+def obter_disjuntor(fonte):
+    """Retorna o disjuntor da fonte, criando-o na primeira chamada."""
+    with _disjuntores_lock:
+        if fonte not in _disjuntores:
+            _disjuntores[fonte] = Disjuntor(fonte)
+        return _disjuntores[fonte]
+
+
+def estados_disjuntores():
+    """{fonte: (estado, falhas seguidas)} dos disjuntores deste processo."""
+    with _disjuntores_lock:
+        disjuntores = list(_disjuntores.values())
+    return {disjuntor.fonte: (disjuntor.estado, disjuntor.falhas) for disjuntor in disjuntores}
+
+
+# --- Execução com novas tentativas ---
+
+def _parar_no_prazo(estado_tentativa):
+    restante = tempo_restante()
+    return restante is not None and restante < PRAZO_MINIMO_TENTATIVA
+
+
+def _esperar_com_jitter(estado_tentativa):
+    """Backoff exponencial com jitter, sem passar do prazo total."""
+    from tenacity import wait_random_exponential
+
+    espera = wait_random_exponential(multiplier=ESPERA_INICIAL, max=ESPERA_MAXIMA)(estado_tentativa)
+    restante = tempo_restante()
+    return espera if restante is None else min(espera, max(0.0, restante - PRAZO_MINIMO_TENTATIVA))
+
+
+def executar_com_resiliencia(fonte, funcao, *args):
+    """
+    Executa `funcao(*args)` passando pelo disjuntor da fonte e repetindo as falhas
+    transitórias com backoff e jitter, dentro do prazo total (se houver).
+    Levanta FonteIndisponivel sem chamar `funcao` se o disjuntor estiver aberto.
+    """
+    # Importado aqui: só extrações de verdade precisam do tenacity
+    from tenacity import Retrying, retry_if_exception, stop_after_attempt
+
+    disjuntor = obter_disjuntor(fonte)
+    disjuntor.verificar()
+
+    def antes_de_repetir(estado_tentativa):
+        contar("tentativas_repetidas", fonte)
+        print(f"{fonte}: tentativa {estado_tentativa.attempt_number} falhou ({estado_tentativa.outcome.exception()}); repetindo.")
+
+    tentativas = Retrying(
+        stop=stop_after_attempt(TENTATIVAS) | _parar_no_prazo,
+        wait=_esperar_com_jitter,
+        retry=retry_if_exception(eh_transitoria),
+        before_sleep=antes_de_repetir,
+        reraise=True,
+    )
+    try:
+        resultado = tentativas(funcao, *args)
+    except Exception as e:
+        if eh_transitoria(e):
+            disjuntor.registrar_falha()
+        elif isinstance(e, EsperaEsgotada):
+            disjuntor.liberar()
+        else:
+            # A fonte respondeu (ex.: sem registro para a data)
+            disjuntor.registrar_sucesso()
+        raise
+    disjuntor.registrar_sucesso()
+    return resultado
@@ -1,560 +1,427 @@
 import streamlit as st
-from datetime import datetime, timedelta
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from datetime import datetime
 import pandas as pd
-import re
 import time
-import subprocess
-import sys
 import os
 
-# --- Bloco de Verificação e Instalação do Playwright (NOVO) ---
-# Este bloco tenta garantir que os navegadores Playwright estejam instalados.
-# Ele será executado no início, antes de st.set_page_config.
-# Use um arquivo temporário para marcar se a instalação já foi tentada.
-
-PLAYWRIGHT_INSTALLED_FLAG = ".playwright_installed"
-
-if not os.path.exists(PLAYWRIGHT_INSTALLED_FLAG):
-    try:
-        # Tenta executar o comando de instalação do Playwright
-        # capture_output=True para não imprimir diretamente na saída padrão do Streamlit
-        # text=True para decodificar a saída como texto
-        # check=True para levantar uma exceção em caso de erro
-        result = subprocess.run(
-            [sys.executable, "-m", "playwright", "install", "chromium"],
-            capture_output=True,
-            text=True,
-            check=True,
-            encoding='utf-8' # Adicionado encoding para lidar com caracteres especiais
-        )
-        # Se a instalação for bem-sucedida, cria o arquivo de flag
-        with open(PLAYWRIGHT_INSTALLED_FLAG, "w") as f:
-            f.write("ok")
-        print(f"Playwright install stdout: {result.stdout}") # Print para logs
-        print(f"Playwright install stderr: {result.stderr}") # Print para logs
-        print("Playwright Chromium instalado com sucesso via subprocess.")
-    except subprocess.CalledProcessError as e:
-        print(f"Erro ao instalar Playwright Chromium via subprocess: {e.stderr}")
-        # Considerar st.error aqui pode causar StreamlitAPIException se for antes de set_page_config
-        # Por isso, apenas printamos para os logs.
-    except Exception as e:
-        print(f"Erro inesperado durante a instalação do Playwright: {e}")
-        # A mesma consideração de st.error.
-# --- Fim do Bloco de Verificação e Instalação do Playwright ---
-
+from esquema_tabelas import formatar_br
+from extracao_b3 import (
+    COLUNA_DATA_CONSULTA,
+    SEM_DADOS_B3,
+    SemRegistroB3,
+    SemSnapshot,
+    combinar_dados_b3,
+    forcar_dif_oper_casada,
+    forcar_frp0,
+    ler_snapshot_b3,
+    ler_snapshot_dif_oper_casada,
+    ler_snapshot_frp0,
+    ler_snapshot_indicador,
+    obter_dados_b3_periodo,
+    obter_dif_oper_casada,
+    obter_frp0,
+    tratar_valor_frp0_dif_original,
+)
+from calendario_b3 import dias_uteis_anteriores
+from cache_extracao import TTL_INDICADORES, limpar_cache
+from motor_extracao import ResultadoExtracao, executar_extracoes_conforme_concluem
+from matriz_somas import COLUNA_TCAM, calcular_matriz_somas, coluna_soma
+from agendador import MODO_AGENDADOR, iniciar_agendador, solicitar_coleta
+from pool_navegador import estatisticas_pool
+from preparar_ambiente import navegador_pronto, preparar_em_segundo_plano
+from metricas import ARQUIVO_METRICAS, LIMITES_HISTOGRAMA, obter_metricas, observar
+from resiliencia import FonteIndisponivel, PrazoEsgotado, ValorDesatualizado, estados_disjuntores, prazo_total
+
+# Janela de consulta: quantidade de dias úteis (TCAM 01, 02, ...) exibidos na página
+MAX_DIAS_CONSULTA = 60
+DIAS_CONSULTA_PADRAO = min(max(int(os.environ.get("TCAM_DIAS_CONSULTA", "3")), 1), MAX_DIAS_CONSULTA)
 
 # st.set_page_config deve ser a PRIMEIRA chamada Streamlit no seu script!
 st.set_page_config(layout="wide")
 
-# Resto do seu código permanece o mesmo...
+# O Chromium é preparado na implantação (python preparar_ambiente.py). Sem essa
+# etapa, a preparação roda em segundo plano e não atrasa a exibição dos snapshots.
+# Com o agendador externo, quem extrai (e prepara o navegador) é o outro processo.
+if MODO_AGENDADOR != "externo" and not navegador_pronto():
+    preparar_em_segundo_plano()
 
 # --- Funções para Auxílio ---
 
-def obter_data_util_para_consulta(hoje=None):
-    """
-    Retorna a data útil para consulta, considerando fins de semana e segundas-feiras.
-    """
-    if hoje is None:
-        hoje = datetime.today()
-    dia_semana = hoje.weekday()
-    if dia_semana == 0:  # Segunda-feira
-        data_consulta = hoje - timedelta(days=3)
-    elif dia_semana in [5, 6]:  # Sábado ou Domingo
-        dias_para_voltar = dia_semana - 4
-        data_consulta = hoje - timedelta(days=dias_para_voltar)
-    else:  # Dias de semana normais
-        data_consulta = hoje - timedelta(days=1)
-    return data_consulta.strftime("%d/%m/%Y")
-
-# --- Funções para Extração de Dados (Usando Playwright) ---
-
-def extrair_dados_b3_playwright(data_desejada):
-    """
-    Extrai taxas praticadas, volume contratado e valores liquidados da B3 para uma data específica
-    usando Playwright para lidar com JavaScript.
-    Retorna (df_tcam, df_volume, df_liquido) ou (None, None, None) se não houver dados.
+def desempacotar_resultado_b3(resultado, data_desejada):
     """
-    url_base = "https://sistemaswebb3-clearing.b3.com.br/historicalForeignExchangePage/retroactive"
-    
-    df_tcam = None
-    df_volume = None
-    df_liquido = None
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True) # Executa em modo headless
-            page = browser.new_page()
-            page.set_default_timeout(60000) # Aumenta o timeout para 60 segundos
-            
-            # Navegando para B3 Câmbio Histórico
-            page.goto(url_base, wait_until="domcontentloaded")
-
-            # Preencher o campo de data
-            page.fill('input[name="initialDate"]', data_desejada)
-            
-            # Clicar no botão de busca
-            page.click('button:has-text("Buscar")')
-
-            # Esperar a tabela carregar.
-            try:
-                page.wait_for_selector("table#ratesTable", timeout=30000) # Espera a tabela TCAM aparecer
-            except Exception as e:
-                # Aviso interno (não exibido via st.warning aqui para evitar StreamlitAPIException)
-                browser.close()
-                return None, None, None
-
-            # Obter o HTML da página após o JavaScript ter carregado o conteúdo
-            content = page.content()
-            soup = BeautifulSoup(content, "html.parser")
-            
-            # Verificar a mensagem de "Não há registro"
-            if soup.find("div", string=lambda text: text and "Não há registro" in text):
-                st.warning(f"⚠️ Não há registro de dados da B3 para a data **{data_desejada}**.")
-                browser.close()
-                return None, None, None
-
-            # Extrair Taxas Praticadas (TCAM)
-            tabela_tcam = soup.find("table", {"id": "ratesTable"})
-            if tabela_tcam:
-                linhas_tcam = tabela_tcam.find_all("tr")
-                if linhas_tcam:
-                    dados_tcam_str = []
-                    start_row = 0
-                    if linhas_tcam and linhas_tcam[0].find('th'):
-                        start_row = 1
-                    
-                    for linha in linhas_tcam[start_row:]:
-                        cols = [td.text.strip() for td in linha.find_all("td")]
-                        if cols and len(cols) == 8:
-                            dados_tcam_str.append(cols)
-
-                    if dados_tcam_str:
-                        colunas_tcam = ["Data", "Fechamento", "Min Balcão", "Média Balcão", "Máx Balcão", "Min Pregão", "Média Pregão", "Máx Pregão"]
-                        df_tcam = pd.DataFrame(dados_tcam_str, columns=colunas_tcam)
-                        df_tcam["Data"] = pd.to_datetime(df_tcam["Data"], dayfirst=True).dt.date
-                        
-                        for col in ["Fechamento", "Min Balcão", "Média Balcão", "Máx Balcão"]:
-                            df_tcam[col] = df_tcam[col].apply(tratar_valor_tcam_original)
-                        
-                        df_tcam = df_tcam.drop(columns=["Min Pregão", "Média Pregão", "Máx Pregão"]).rename(columns={
-                            "Min Balcão": "Mínima", "Média Balcão": "Média", "Máx Balcão": "Máxima"
-                        })
-            
-            # Extrair Volume Contratado
-            tabela_volume = soup.find("table", {"id": "contractedVolume"})
-            df_volume = pd.DataFrame() 
-            if tabela_volume:
-                linhas_volume = tabela_volume.find_all("tr")
-                if linhas_volume:
-                    dados_volume = []
-                    start_row = 0
-                    if linhas_volume and linhas_volume[0].find('th'):
-                        start_row = 1
-                    
-                    for linha in linhas_volume[start_row:]:
-                        cols = [td.text.strip() for td in linha.find_all("td")]
-                        if cols:
-                            dados_volume.append(cols)
-
-                    tfoot_volume = tabela_volume.find("tfoot")
-                    if tfoot_volume:
-                        total_row_ths = tfoot_volume.find_all("th")
-                        if total_row_ths:
-                            total_data = [th.text.strip() for th in total_row_ths]
-                            if total_data: 
-                                dados_volume.append(total_data)
-
-                    if dados_volume:
-                        colunas_volume = ["Data", "US$ Balcão", "R$ Balcão", "Negócios Balcão", "US$ Pregão", "R$ Pregão", "Negócios Pregão", "US$ Total", "R$ Total", "Negócios Total"]
-                        if dados_volume and len(dados_volume[0]) == len(colunas_volume):
-                            df_volume = pd.DataFrame(dados_volume, columns=colunas_volume)
-            
-            # Extrair Valores Liquidados
-            tabela_liquido = soup.find("table", {"id": "nettingTable"})
-            df_liquido = pd.DataFrame() 
-            if tabela_liquido:
-                linhas_liquido = tabela_liquido.find_all("tr")
-                if linhas_liquido:
-                    dados_liquido = []
-                    start_row = 0
-                    if linhas_liquido and linhas_liquido[0].find('th'):
-                        start_row = 1
-                    
-                    for linha in linhas_liquido[start_row:]:
-                        cols = [td.text.strip() for td in linha.find_all("td")]
-                        if cols:
-                            dados_liquido.append(cols)
-
-                    if dados_liquido:
-                        df_liquido = pd.DataFrame(dados_liquido, columns=["Data", "US$", "R$"])
-            
-            browser.close()
-            
-            if df_tcam is None or df_tcam.empty:
-                return None, None, None
-
-            return df_tcam, df_volume, df_liquido
-
-    except Exception as e:
-        st.error(f"❌ Erro ao extrair dados da B3 para {data_desejada} com Playwright: {e}")
-        return None, None, None
-
-
-def extrair_frp0_playwright():
-    """Extrai dados do FRP0 (Forward Points) da BMF usando Playwright."""
-    url_frp = (
-        "https://www2.bmf.com.br/pages/portal/bmfbovespa/boletim1/"
-        "SistemaPregao1.asp?pagetype=pop&caminho=Resumo%20Estat%EDstico%20-%20Sistema%20Preg%E3o"
-        "&Data=&Mercadoria=FRP"
-    )
-    df_frp = pd.DataFrame()
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.set_default_timeout(30000)
-            
-            # Navegando para BMF FRP0
-            page.goto(url_frp, wait_until="domcontentloaded")
-            
-            try:
-                page.wait_for_selector("#MercadoFut2", timeout=15000)
-            except Exception as e:
-                browser.close()
-                return pd.DataFrame()
-
-            content = page.content()
-            soup_frp = BeautifulSoup(content, "html.parser")
-            
-            mercado2 = soup_frp.find(id="MercadoFut2")
-            if not mercado2:
-                browser.close()
-                return pd.DataFrame()
-                
-            frp2_tbl = mercado2.find("table", class_="tabConteudo")
-            if not frp2_tbl:
-                browser.close()
-                return pd.DataFrame()
-
-            rows = frp2_tbl.find_all("tr")
-
-            if len(rows) >= 3:
-                frp0_td = rows[2].find_all("td")
-                if frp0_td:
-                    valores = [td.get_text(strip=True) for td in frp0_td]
-                    colunas = [
-                        "Abertura", "Mínimo", "Máximo", "Médio",
-                        "Último Preço", "Últ. Of. Compra", "Últ. Of. Venda"
-                    ]
-                    if len(valores) == len(colunas):
-                        df_frp = pd.DataFrame([valores], columns=colunas)
-            
-            browser.close()
-            return df_frp
-    except Exception as e:
-        st.error(f"❌ Erro ao extrair dados do FRP0 com Playwright: {e}")
-        return pd.DataFrame()
-
-def extrair_dif_oper_casada_playwright():
-    """
-    Extrai o indicador 'DIF OPER CASADA - COMPRA' usando Playwright.
+    Converte o ResultadoExtracao de uma data da B3 em DadosB3 (tcam, volume, liquido, total_volume),
+    exibindo o aviso ou erro correspondente quando a extração não trouxe dados.
     """
-    url = "https://sistemaswebb3-derivativos.b3.com.br/financialIndicatorsPage/?language=pt-br"
-    valor = None
-    data_atualizacao = None
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.set_default_timeout(30000)
-            
-            # Navegando para B3 Indicadores Financeiros
-            page.goto(url, wait_until="domcontentloaded")
-            
-            try:
-                page.wait_for_selector("p:has-text('DIF OPER CASADA - COMPRA')", timeout=20000)
-            except Exception as e:
-                browser.close()
-                return None, None
-
-            content = page.content()
-            soup = BeautifulSoup(content, "html.parser")
-            
-            bloco = soup.find("p", string=lambda text: text and "DIF OPER CASADA - COMPRA" in text)
-
-            if bloco:
-                div_mae = bloco.find_parent("div")
-                if div_mae:
-                    valor_tag = div_mae.find("h4")
-                    data_tag = div_mae.find("small")
-                    if valor_tag and data_tag:
-                        valor = valor_tag.text.strip()
-                        data_atualizacao = data_tag.text.strip()
-            
-            browser.close()
-            return valor, data_atualizacao
-    except Exception as e:
-        st.error(f"❌ Erro ao extrair DIF OPER CASADA com Playwright: {e}")
-        return None, None
+    if isinstance(resultado.erro, SemRegistroB3):
+        st.warning(f"⚠️ Não há registro de dados da B3 para a data **{data_desejada}**.")
+    elif isinstance(resultado.erro, SemSnapshot):
+        st.info(f"⏳ A data **{data_desejada}** ainda não foi coletada em segundo plano.")
+    elif isinstance(resultado.erro, (FonteIndisponivel, PrazoEsgotado)):
+        st.error(f"⏱️ TCAM de {data_desejada} indisponível no momento: {resultado.erro}")
+    elif resultado.erro is not None:
+        st.error(f"❌ Erro ao extrair dados da B3 para {data_desejada} com Playwright: {resultado.erro}")
+    else:
+        return resultado.valor
+    return SEM_DADOS_B3
 
 # --- Funções de Formatação ---
 
-def tratar_valor_tcam_original(valor_str):
+def formatar_indicador_exibicao(valor):
     """
-    Trata string de valor TCAM conforme a lógica original do código para conversão.
-    Assume que a última casa é decimal.
+    Formata um indicador (FRP0) no padrão brasileiro, com até três casas decimais
+    e sem zeros à direita.
     """
-    valor_limpo = ''.join(filter(str.isdigit, valor_str))
-    if valor_limpo:
-        if len(valor_limpo) >= 2:
-            return float(valor_limpo[:-1] + '.' + valor_limpo[-1])
-        else:
-            return float("0." + valor_limpo) if valor_limpo else 0.0
-    return 0.0
+    texto = f"{valor:,.3f}".rstrip("0").rstrip(".")
+    return texto.replace(",", "X").replace(".", ",").replace("X", ".")
+
+def formatar_idade(capturado_em):
+    """Idade de um snapshot em texto curto ("há 3 min")."""
+    if capturado_em is None:
+        return "sem coleta"
+    minutos = (datetime.now() - capturado_em).total_seconds() / 60
+    if minutos < 1:
+        return "há menos de 1 min"
+    if minutos < 120:
+        return f"há {minutos:.0f} min"
+    return f"em {capturado_em:%d/%m/%Y %H:%M}"
 
-def tratar_valor_frp0_dif_original(valor_str):
-    """
-    Trata strings de valor FRP0 e DIF OPER CASADA.
-    Substitui vírgula por ponto para permitir a conversão para float.
-    """
-    try:
-        return float(valor_str.replace(",", "."))
-    except ValueError:
-        return 0.0
+# --- Streamlit App ---
 
-def somar_formatar_original(tcam_val, outro_val):
-    """
-    Soma um valor TCAM (já como float) com outro valor (já como float)
-    e formata o resultado no padrão brasileiro (vírgula como decimal), com uma casa decimal.
-    """
-    resultado = tcam_val + outro_val
-    return f"{resultado:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
+aba = st.tabs(["🏠 PRINCIPAL", "📊 DADOS BRUTOS", "🔗 LINKS", "🩺 DIAGNÓSTICO"])
+
+# Com o agendador em thread, o processo da página também faz a coleta em segundo plano
+if MODO_AGENDADOR == "thread":
+    iniciar_agendador()
+
+# Controle de atualização: descarta o cache e força uma nova extração de todas as fontes
+atualizar_agora = st.sidebar.button("🔄 Atualizar agora")
+if atualizar_agora:
+    limpar_cache()
+    if MODO_AGENDADOR != "desligado":
+        # O pedido chega ao processo dono da coleta, que pode não ser este
+        solicitar_coleta()
+        st.sidebar.info("🔄 Coleta solicitada ao agendador: os dados novos aparecem assim que forem gravados.")
+if MODO_AGENDADOR == "desligado":
+    st.sidebar.caption(f"TCAMs de datas encerradas ficam em cache; FRP0 e DIF OPER CASADA são atualizados a cada {TTL_INDICADORES / 60:g} min.")
+else:
+    st.sidebar.caption("Os dados são coletados em segundo plano; a página exibe o último snapshot gravado.")
+
+quantidade_dias = int(st.sidebar.number_input(
+    "Dias úteis consultados", min_value=1, max_value=MAX_DIAS_CONSULTA, value=DIAS_CONSULTA_PADRAO, step=1
+))
+
+# Obter datas para as consultas: os últimos dias úteis da B3 (sem fins de semana e feriados),
+# do mais recente (TCAM 01) para o mais antigo
+hoje = datetime.today()
+datas_tcam = [data_util.strftime("%d/%m/%Y") for data_util in dias_uteis_anteriores(hoje, quantidade_dias)]
+data_tcam1_str = datas_tcam[0]
 
-def formatar_tcam_original_exibicao(valor):
+# --- Estado exibido enquanto cada fonte ainda não chegou ou falhou ---
+FRP0_CARREGANDO = {"ultimo_preco_str": "⏳", "ultimo_preco_float": None}
+FRP0_INDISPONIVEL = {"ultimo_preco_str": "N/A", "ultimo_preco_float": None}
+DIF_OPER_CARREGANDO = {"valor_str": "⏳", "valor_float": None, "data_atualizacao": "⏳"}
+DIF_OPER_INDISPONIVEL = {"valor_str": "N/A", "valor_float": None, "data_atualizacao": "N/A"}
+
+
+def preparar_frp0(resultado):
     """
-    Formata um valor float TCAM no padrão brasileiro (vírgula como decimal), com uma casa decimal.
-    Isso é para a exibição na tabela, diferente do tratamento para cálculo.
+    (frp0_data, df_frp, aviso ou None) a partir do ResultadoExtracao do FRP0.
+    Com ValorDesatualizado, usa o último valor conhecido e avisa a data dele.
     """
-    return f"{valor:,.1f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-# --- Streamlit App ---
+    aviso = None
+    if isinstance(resultado.erro, ValorDesatualizado):
+        aviso = f"⚠️ FRP0 desatualizado: a extração falhou ({resultado.erro.causa}); exibindo o valor de {resultado.erro.capturado_em:%d/%m/%Y %H:%M}."
+    elif resultado.erro is not None:
+        return FRP0_INDISPONIVEL, pd.DataFrame(), f"❌ Erro ao extrair dados do FRP0 com Playwright: {resultado.erro}"
+    df_frp = resultado.valor
+    if df_frp.empty or pd.isna(df_frp["Último Preço"].iloc[0]):
+        return FRP0_INDISPONIVEL, df_frp, "❌ Não foi possível extrair os dados do FRP0."
+    frp0_data = {
+        "ultimo_preco_str": formatar_indicador_exibicao(df_frp["Último Preço"].iloc[0]),
+        "ultimo_preco_float": float(df_frp["Último Preço"].iloc[0])
+    }
+    if aviso:
+        frp0_data["ultimo_preco_str"] += " ⚠️"
+        frp0_data["desatualizado"] = True
+    return frp0_data, df_frp, aviso
+
+
+def preparar_dif_oper(resultado):
+    """(dif_oper_data, aviso ou None) a partir do ResultadoExtracao do DIF OPER CASADA (como preparar_frp0)."""
+    aviso = None
+    if isinstance(resultado.erro, ValorDesatualizado):
+        aviso = (
+            f"⚠️ DIF OPER CASADA desatualizado: a extração falhou ({resultado.erro.causa}); "
+            f"exibindo o valor de {resultado.erro.capturado_em:%d/%m/%Y %H:%M}."
+        )
+    elif resultado.erro is not None:
+        return DIF_OPER_INDISPONIVEL, f"❌ Erro ao extrair DIF OPER CASADA com Playwright: {resultado.erro}"
+    dif_valor_raw, dif_data = resultado.valor
+    if not dif_valor_raw:
+        return DIF_OPER_INDISPONIVEL, "❌ Indicador 'DIF OPER CASADA - COMPRA' não disponível ou não pôde ser extraído."
+    dif_oper_data = {
+        "valor_str": dif_valor_raw.split()[0],
+        "valor_float": tratar_valor_frp0_dif_original(dif_valor_raw.split()[0]),
+        "data_atualizacao": dif_data
+    }
+    if aviso:
+        dif_oper_data["valor_str"] += " ⚠️"
+        dif_oper_data["desatualizado"] = True
+    return dif_oper_data, aviso
 
-# st.set_page_config deve ser a PRIMEIRA chamada Streamlit no seu script!
-st.set_page_config(layout="wide")
 
-aba = st.tabs(["🏠 PRINCIPAL", "📊 DADOS BRUTOS", "🔗 LINKS"])
+# --- Funções para exibir tabela de TCAM + Indicadores ---
 
-# Obter datas para as consultas
-hoje = datetime.today()
-data_base_obj = datetime.strptime(obter_data_util_para_consulta(hoje), "%d/%m/%Y").date()
-
-data_tcam1_str = data_base_obj.strftime("%d/%m/%Y")
-data_tcam2_str = (data_base_obj - timedelta(days=1)).strftime("%d/%m/%Y")
-data_tcam3_str = (data_base_obj - timedelta(days=2)).strftime("%d/%m/%Y")
-
-
-dados_tcam = {}
-dados_volume = {}
-dados_liquido = {}
-frp0_data = {}
-dif_oper_data = {}
-
-with st.spinner("Carregando dados... Isso pode levar alguns segundos devido à extração web (com Playwright)."):
-    
-    # --- Extração para TCAM 01 (data útil padrão) ---
-    df_tcam1, df_volume1, df_liquido1 = extrair_dados_b3_playwright(data_tcam1_str)
-    if df_tcam1 is not None and not df_tcam1.empty:
-        dados_tcam[data_tcam1_str] = df_tcam1
-        dados_volume[data_tcam1_str] = df_volume1
-        dados_liquido[data_tcam1_str] = df_liquido1
-    else:
-        st.warning(f"Não foi possível obter dados de TCAM para {data_tcam1_str}.")
-    
-    # --- Extração para TCAM 02 (data útil - 1) ---
-    df_tcam2, df_volume2, df_liquido2 = extrair_dados_b3_playwright(data_tcam2_str)
-    if df_tcam2 is not None and not df_tcam2.empty:
-        dados_tcam[data_tcam2_str] = df_tcam2
-        dados_volume[data_tcam2_str] = df_volume2
-        dados_liquido[data_tcam2_str] = df_liquido2
-    else:
-        st.warning(f"Não foi possível obter dados de TCAM para {data_tcam2_str}.")
-
-    # --- Extração para TCAM 03 (data útil - 2) ---
-    df_tcam3, df_volume3, df_liquido3 = extrair_dados_b3_playwright(data_tcam3_str)
-    if df_tcam3 is not None and not df_tcam3.empty:
-        dados_tcam[data_tcam3_str] = df_tcam3
-        dados_volume[data_tcam3_str] = df_volume3
-        dados_liquido[data_tcam3_str] = df_liquido3
-    else:
-        st.warning(f"Não foi possível obter dados de TCAM para {data_tcam3_str}.")
-
-    # --- Extração de FRP0 (apenas para a data TCAM 01) ---
-    df_frp_extracted = extrair_frp0_playwright()
-    if not df_frp_extracted.empty:
-        frp0_data = {
-            "ultimo_preco_str": df_frp_extracted["Último Preço"].iloc[0],
-            "ultimo_preco_float": tratar_valor_frp0_dif_original(df_frp_extracted["Último Preço"].iloc[0])
-        }
-    else:
-        frp0_data = {"ultimo_preco_str": "N/A", "ultimo_preco_float": 0.0}
-        st.error("❌ Não foi possível extrair os dados do FRP0. Verifique as mensagens de erro/aviso acima.")
-
-    # --- Extração de DIF OPER CASADA (apenas para a data TCAM 01) ---
-    dif_valor_raw, dif_data = extrair_dif_oper_casada_playwright()
-    if dif_valor_raw:
-        dif_oper_data = {
-            "valor_str": dif_valor_raw.split()[0],
-            "valor_float": tratar_valor_frp0_dif_original(dif_valor_raw.split()[0]),
-            "data_atualizacao": dif_data
-        }
-    else:
-        dif_oper_data = {"valor_str": "N/A", "valor_float": 0.0, "data_atualizacao": "N/A"}
-        st.error("❌ Indicador 'DIF OPER CASADA - COMPRA' não disponível ou não pôde ser extraído. Veja a mensagem de informação acima.")
+# Indicadores somados à TCAM nos cards: (nome na matriz de somas, coluna do valor, nome curto na soma, casas decimais)
+INDICADORES_CARD = (
+    ("FRP0", "FRP0 (Último Preço)", "FRP0", 3),
+    ("DIF OPER CASADA", "DIF OPER CASADA (Compra)", "DIF", 2),
+)
 
 
-# --- Funções para exibir tabela de TCAM + Indicadores ---
-def exibir_tcam_com_indicadores(label, df_tcam, frp0_data, dif_oper_data):
-    st.subheader(f"📌 {label}")
-    if df_tcam is not None and not df_tcam.empty:
-        if "Fechamento" in df_tcam.columns and "Mínima" in df_tcam.columns and \
-           "Média" in df_tcam.columns and "Máxima" in df_tcam.columns:
-            fechamento_tcam = df_tcam["Fechamento"].iloc[0]
-            minimo_tcam = df_tcam["Mínima"].iloc[0]
-            media_tcam = df_tcam["Média"].iloc[0]
-            maximo_tcam = df_tcam["Máxima"].iloc[0]
-        else:
-            st.error(f"Erro: Colunas esperadas (Fechamento, Mínima, Média, Máxima) não encontradas no DataFrame TCAM para {label}.")
-            st.dataframe(df_tcam)
-            st.markdown("---")
-            return
+def indicadores_atuais():
+    """
+    {nome: (valor numérico ou None, texto exibido, desatualizado)} dos indicadores
+    da data principal; sem valor, o texto é "⏳" (carregando) ou "N/A".
+    """
+    return {
+        "FRP0": (frp0_data["ultimo_preco_float"], frp0_data["ultimo_preco_str"], frp0_data.get("desatualizado", False)),
+        "DIF OPER CASADA": (dif_oper_data["valor_float"], dif_oper_data["valor_str"], dif_oper_data.get("desatualizado", False)),
+    }
 
-        st.markdown(f"**TCAM {label.split(' ')[1]} + FRP0**")
-        df_resultado_frp = pd.DataFrame({
-            "Indicador": ["Fechamento", "Mínimo", "Média", "Máximo"],
-            "TCAM (Balcão)": [
-                formatar_tcam_original_exibicao(fechamento_tcam),
-                formatar_tcam_original_exibicao(minimo_tcam),
-                formatar_tcam_original_exibicao(media_tcam),
-                formatar_tcam_original_exibicao(maximo_tcam)
-            ],
-            "FRP0 (Último Preço)": [frp0_data["ultimo_preco_str"]] * 4,
-            "Soma (TCAM + FRP0)": [
-                somar_formatar_original(fechamento_tcam, frp0_data["ultimo_preco_float"]),
-                somar_formatar_original(minimo_tcam, frp0_data["ultimo_preco_float"]),
-                somar_formatar_original(media_tcam, frp0_data["ultimo_preco_float"]),
-                somar_formatar_original(maximo_tcam, frp0_data["ultimo_preco_float"])
-            ]
-        })
-        st.dataframe(df_resultado_frp, use_container_width=True, hide_index=True)
-        st.markdown("---")
 
-        st.markdown(f"**TCAM {label.split(' ')[1]} + DIF OPER CASADA**")
-        df_resultado_dif = pd.DataFrame({
-            "Indicador": ["Fechamento", "Mínimo", "Média", "Máximo"],
-            "TCAM (Balcão)": [
-                formatar_tcam_original_exibicao(fechamento_tcam),
-                formatar_tcam_original_exibicao(minimo_tcam),
-                formatar_tcam_original_exibicao(media_tcam),
-                formatar_tcam_original_exibicao(maximo_tcam)
-            ],
-            "DIF OPER CASADA (Compra)": [dif_oper_data["valor_str"]] * 4,
-            "Soma (TCAM + DIF)": [
-                somar_formatar_original(fechamento_tcam, dif_oper_data["valor_float"]),
-                somar_formatar_original(minimo_tcam, dif_oper_data["valor_float"]),
-                somar_formatar_original(media_tcam, dif_oper_data["valor_float"]),
-                somar_formatar_original(maximo_tcam, dif_oper_data["valor_float"])
-            ]
-        })
-        st.dataframe(df_resultado_dif, use_container_width=True, hide_index=True)
-        st.markdown("---")
-    else:
-        data_do_label = label.split('(')[1].replace(')', '') 
+def exibir_tcam_com_indicadores(label, somas_data):
+    """
+    Card de uma data: uma tabela por indicador, recortada da matriz de somas
+    (`somas_data`: as linhas da data, indexadas pela estatística).
+    """
+    st.subheader(f"📌 {label}")
+    if somas_data is None:
+        data_do_label = label.split('(')[1].replace(')', '')
         st.warning(f"⚠️ Não há dados de TCAM para a data **{data_do_label}** ou a extração falhou.")
         st.markdown("---")
+        return
+
+    indicadores = indicadores_atuais()
+    for nome, coluna_valor, nome_curto, casas in INDICADORES_CARD:
+        valor, texto, desatualizado = indicadores[nome]
+        if desatualizado:
+            coluna_valor += " ⚠️"
+        coluna_resultado = f"Soma (TCAM + {nome_curto})"
+        tabela = (
+            somas_data[[COLUNA_TCAM, nome, coluna_soma(nome)]]
+            .rename(columns={COLUNA_TCAM: "TCAM (Balcão)", nome: coluna_valor, coluna_soma(nome): coluna_resultado})
+            .rename_axis("Indicador")
+            .reset_index()
+        )
+        # Enquanto o indicador não chega (ou se falhou), valor e soma exibem "⏳" ou "N/A"
+        estado = texto if valor is None else ""
+        st.markdown(f"**TCAM {label.split(' ')[1]} + {nome}**")
+        st.dataframe(
+            formatar_br(tabela, casas=1, casas_por_coluna={coluna_valor: casas}, ausentes={coluna_valor: estado, coluna_resultado: estado}),
+            use_container_width=True, hide_index=True,
+        )
+        st.markdown("---")
 
 
-# --- Aba PRINCIPAL ---
+# --- Aba PRINCIPAL: um espaço reservado por card, preenchido quando a fonte chega ---
 with aba[0]:
     st.title("📈 Painel B3 - TCAMs Calculadas")
     st.success(f"Dados calculados com base na data útil principal: **{data_tcam1_str}**")
     st.markdown(f"Com a data vigente sendo **{data_tcam1_str}**:")
+    avisos_indicadores = {"frp0": st.empty(), "dif_oper": st.empty()}
     st.markdown("---") 
-
-    exibir_tcam_com_indicadores(f"TCAM 01 ({data_tcam1_str})", dados_tcam.get(data_tcam1_str), frp0_data, dif_oper_data)
-    exibir_tcam_com_indicadores(f"TCAM 02 ({data_tcam2_str})", dados_tcam.get(data_tcam2_str), frp0_data, dif_oper_data)
-    exibir_tcam_com_indicadores(f"TCAM 03 ({data_tcam3_str})", dados_tcam.get(data_tcam3_str), frp0_data, dif_oper_data)
+    cards = {data_tcam_str: st.empty() for data_tcam_str in datas_tcam}
 
 # --- Aba DADOS BRUTOS ---
 with aba[1]:
     st.title("📊 Dados Brutos - B3")
-    st.success(f"Dados brutos da B3 para as datas consultadas.")
+    st.success(f"Dados brutos da B3 para as datas consultadas ({datas_tcam[-1]} a {data_tcam1_str}).")
     st.markdown("---")
-
-    # TCAM 01
-    st.subheader(f"Dados Brutos - TCAM 01 ({data_tcam1_str})")
-    if data_tcam1_str in dados_tcam and dados_tcam[data_tcam1_str] is not None:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**Taxas Praticadas (TCAM)**")
-            st.dataframe(dados_tcam[data_tcam1_str], use_container_width=True)
-        with col2:
-            st.markdown("**Valores Liquidados**")
-            st.dataframe(dados_liquido.get(data_tcam1_str, pd.DataFrame()), use_container_width=True)
-        st.markdown("**Volume Contratado**")
-        st.dataframe(dados_volume.get(data_tcam1_str, pd.DataFrame()), use_container_width=True)
-    else:
-        st.info(f"Não há dados brutos para TCAM 01 ({data_tcam1_str}) ou a extração falhou.")
-    st.markdown("---")
-
-    # TCAM 02
-    st.subheader(f"Dados Brutos - TCAM 02 ({data_tcam2_str})")
-    if data_tcam2_str in dados_tcam and dados_tcam[data_tcam2_str] is not None:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**Taxas Praticadas (TCAM)**")
-            st.dataframe(dados_tcam[data_tcam2_str], use_container_width=True)
-        with col2:
-            st.markdown("**Valores Liquidados**")
-            st.dataframe(dados_liquido.get(data_tcam2_str, pd.DataFrame()), use_container_width=True)
-        st.markdown("**Volume Contratado**")
-        st.dataframe(dados_volume.get(data_tcam2_str, pd.DataFrame()), use_container_width=True)
-    else:
-        st.info(f"Não há dados brutos para TCAM 02 ({data_tcam2_str}) ou a extração falhou.")
-    st.markdown("---")
-
-    # TCAM 03
-    st.subheader(f"Dados Brutos - TCAM 03 ({data_tcam3_str})")
-    if data_tcam3_str in dados_tcam and dados_tcam[data_tcam3_str] is not None:
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("**Taxas Praticadas (TCAM)**")
-            st.dataframe(dados_tcam[data_tcam3_str], use_container_width=True)
-        with col2:
-            st.markdown("**Valores Liquidados**")
-            st.dataframe(dados_liquido.get(data_tcam3_str, pd.DataFrame()), use_container_width=True)
-        st.markdown("**Volume Contratado**")
-        st.dataframe(dados_volume.get(data_tcam3_str, pd.DataFrame()), use_container_width=True)
-    else:
-        st.info(f"Não há dados brutos para TCAM 03 ({data_tcam3_str}) ou a extração falhou.")
+    brutos_b3 = st.empty()
     st.markdown("---")
 
     # FRP0 e DIF OPER CASADA (continuam únicos para a data principal)
     st.subheader("📊 FRP0 – Contrato de Forward Points (Data Principal)")
-    if frp0_data["ultimo_preco_str"] != "N/A":
-        st.dataframe(df_frp_extracted, use_container_width=True)
-    else:
-        st.error("❌ Não foi possível extrair os dados do FRP0. Verifique as mensagens de erro/aviso acima.")
-
+    brutos_frp0 = st.empty()
     st.markdown("---")
     st.subheader("📉 DIF OPER CASADA - COMPRA (Data Principal)")
-    if dif_oper_data["valor_str"] != "N/A":
-        st.metric(label="Valor Atual", value=dif_oper_data["valor_str"], delta=None)
-        st.caption(f"Última atualização: {dif_oper_data['data_atualizacao']}")
+    brutos_dif_oper = st.empty()
+
+# Resultados recebidos até agora: {data: ResultadoExtracao} da B3 e os indicadores da data principal
+resultados_b3 = {}
+frp0_data, df_frp_extracted = FRP0_CARREGANDO, pd.DataFrame()
+dif_oper_data = DIF_OPER_CARREGANDO
+# Tabelas combinadas das datas recebidas e as somas com os indicadores, refeitas a cada resultado
+dados_b3 = combinar_dados_b3({})
+matriz_somas = None
+
+
+def renderizar_card(indice, data_tcam_str):
+    """(Re)desenha o card de uma data: carregando, aviso/erro da B3 ou TCAM com os indicadores disponíveis."""
+    label = f"TCAM {indice:02d} ({data_tcam_str})"
+    with cards[data_tcam_str].container():
+        resultado = resultados_b3.get(data_tcam_str)
+        if resultado is None:
+            st.subheader(f"📌 {label}")
+            st.info("⏳ Carregando dados da B3...")
+            st.markdown("---")
+            return
+        dados_data = desempacotar_resultado_b3(resultado, data_tcam_str)
+        somas_data = None
+        if dados_data.tcam is not None and not dados_data.tcam.empty and matriz_somas is not None:
+            somas_data = matriz_somas.xs(pd.Timestamp(datetime.strptime(data_tcam_str, "%d/%m/%Y")), level=0)
+        exibir_tcam_com_indicadores(label, somas_data)
+
+
+def dados_b3_recebidos():
+    """DadosB3 combinados (coluna Data Consulta) das datas que já chegaram com TCAM."""
+    return combinar_dados_b3({
+        data_tcam_str: resultados_b3[data_tcam_str].valor
+        for data_tcam_str in datas_tcam
+        if data_tcam_str in resultados_b3
+        and resultados_b3[data_tcam_str].erro is None
+        and resultados_b3[data_tcam_str].valor.tcam is not None
+        and not resultados_b3[data_tcam_str].valor.tcam.empty
+    })
+
+
+def calcular_somas_recebidas():
+    """Matriz de somas (matriz_somas) das TCAMs recebidas com os indicadores atuais, ou None sem TCAM."""
+    if dados_b3.tcam.empty:
+        return None
+    valores = {nome: valor for nome, (valor, _, _) in indicadores_atuais().items()}
+    # O card de cada data soma a primeira linha da TCAM dela (iloc[0])
+    primeiras_linhas = dados_b3.tcam.drop_duplicates(COLUNA_DATA_CONSULTA, keep="first")
+    return calcular_matriz_somas(primeiras_linhas, valores, coluna_data=COLUNA_DATA_CONSULTA)
+
+
+def renderizar_brutos_b3():
+    """Tabelas combinadas das datas que já chegaram; as demais entram quando chegarem."""
+    pendentes = len(datas_tcam) - len(resultados_b3)
+    with brutos_b3.container():
+        if pendentes:
+            st.info(f"⏳ Carregando {pendentes} data(s) da B3...")
+        if not dados_b3.tcam.empty:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Taxas Praticadas (TCAM)**")
+                st.dataframe(formatar_br(dados_b3.tcam, casas=1), use_container_width=True, hide_index=True)
+            with col2:
+                st.markdown("**Valores Liquidados**")
+                st.dataframe(formatar_br(dados_b3.liquido), use_container_width=True, hide_index=True)
+            st.markdown("**Volume Contratado**")
+            st.dataframe(formatar_br(dados_b3.volume), use_container_width=True, hide_index=True)
+            if not dados_b3.total_volume.empty:
+                st.markdown("**Volume Contratado - Total**")
+                st.dataframe(formatar_br(dados_b3.total_volume.drop(columns=["Data"])), use_container_width=True, hide_index=True)
+        elif not pendentes:
+            st.info("Não há dados brutos da B3 para as datas consultadas ou a extração falhou.")
+
+
+def renderizar_brutos_frp0():
+    with brutos_frp0.container():
+        if frp0_data is FRP0_CARREGANDO:
+            st.info("⏳ Carregando FRP0...")
+        elif frp0_data["ultimo_preco_str"] != "N/A":
+            st.dataframe(formatar_br(df_frp_extracted, casas=3), use_container_width=True)
+        else:
+            st.error("❌ Não foi possível extrair os dados do FRP0. Verifique as mensagens de erro/aviso acima.")
+
+
+def renderizar_brutos_dif_oper():
+    with brutos_dif_oper.container():
+        if dif_oper_data is DIF_OPER_CARREGANDO:
+            st.info("⏳ Carregando DIF OPER CASADA...")
+        elif dif_oper_data["valor_str"] != "N/A":
+            st.metric(label="Valor Atual", value=dif_oper_data["valor_str"], delta=None)
+            st.caption(f"Última atualização: {dif_oper_data['data_atualizacao']}")
+        else:
+            st.error("❌ Indicador 'DIF OPER CASADA - COMPRA' não disponível ou não pôde ser extraído. Veja a mensagem de informação acima.")
+
+
+# Estado inicial: tudo carregando
+for indice, data_tcam_str in enumerate(datas_tcam, start=1):
+    renderizar_card(indice, data_tcam_str)
+renderizar_brutos_b3()
+renderizar_brutos_frp0()
+renderizar_brutos_dif_oper()
+
+# --- Extrações em paralelo (ou leitura dos snapshots), exibidas conforme cada uma termina ---
+# A TCAM 01 tem tarefa própria, para não esperar as datas anteriores nem os indicadores
+grupos_b3 = {"b3_tcam01": datas_tcam[:1]}
+if len(datas_tcam) > 1:
+    grupos_b3["b3_anteriores"] = datas_tcam[1:]
+if MODO_AGENDADOR == "desligado":
+    tarefas = {chave: (obter_dados_b3_periodo, (datas,)) for chave, datas in grupos_b3.items()}
+    if atualizar_agora:
+        # Os indicadores são extraídos de novo, sem reaproveitar o snapshot recente do armazém
+        tarefas.update({"frp0": (forcar_frp0, ()), "dif_oper": (forcar_dif_oper_casada, ())})
     else:
-        st.error("❌ Indicador 'DIF OPER CASADA - COMPRA' não disponível ou não pôde ser extraído. Veja a mensagem de informação acima.")
+        tarefas.update({"frp0": (obter_frp0, ()), "dif_oper": (obter_dif_oper_casada, ())})
+else:
+    # Coleta em segundo plano: a página só lê os snapshots gravados no armazém
+    tarefas = {chave: (ler_snapshot_b3, (datas,)) for chave, datas in grupos_b3.items()}
+    tarefas.update({"frp0": (ler_snapshot_frp0, ()), "dif_oper": (ler_snapshot_dif_oper_casada, ())})
+
+# Tempos da página nas métricas (fonte "pagina"): primeira TCAM exibida e renderização acumulada
+inicio_pagina = time.perf_counter()
+tempo_renderizacao = 0.0
+# Prazo total: fontes lentas não seguram a página além de TCAM_PRAZO_PAGINA segundos
+with prazo_total():
+    for chave, resultado in executar_extracoes_conforme_concluem(tarefas):
+        inicio_renderizacao = time.perf_counter()
+        if chave in grupos_b3:
+            for data_tcam_str in grupos_b3[chave]:
+                resultados_b3[data_tcam_str] = (
+                    resultado.valor[data_tcam_str] if resultado.erro is None else ResultadoExtracao(None, resultado.erro)
+                )
+            datas_atualizadas = grupos_b3[chave]
+            dados_b3 = dados_b3_recebidos()
+            renderizar_brutos_b3()
+        elif chave == "frp0":
+            frp0_data, df_frp_extracted, erro = preparar_frp0(resultado)
+            if isinstance(resultado.erro, ValorDesatualizado):
+                avisos_indicadores["frp0"].warning(erro)
+            elif erro:
+                avisos_indicadores["frp0"].error(erro)
+            datas_atualizadas = datas_tcam
+            renderizar_brutos_frp0()
+        else:
+            dif_oper_data, erro = preparar_dif_oper(resultado)
+            if isinstance(resultado.erro, ValorDesatualizado):
+                avisos_indicadores["dif_oper"].warning(erro)
+            elif erro:
+                avisos_indicadores["dif_oper"].error(erro)
+            datas_atualizadas = datas_tcam
+            renderizar_brutos_dif_oper()
+
+        # Todas as somas de uma vez; só os cards cujas TCAMs já chegaram mudam, os demais continuam carregando
+        matriz_somas = calcular_somas_recebidas()
+        for indice, data_tcam_str in enumerate(datas_tcam, start=1):
+            if data_tcam_str in datas_atualizadas and data_tcam_str in resultados_b3:
+                renderizar_card(indice, data_tcam_str)
+        tempo_renderizacao += time.perf_counter() - inicio_renderizacao
+        if chave == "b3_tcam01":
+            observar("pagina", "primeira_tcam", time.perf_counter() - inicio_pagina)
+
+observar("pagina", "renderizacao", tempo_renderizacao)
+
+# Controle de admissão: ocupação do pool de navegadores deste processo
+estatisticas_navegadores = estatisticas_pool()
+if estatisticas_navegadores is not None:
+    memoria = estatisticas_navegadores["memoria_bytes"]
+    st.sidebar.caption(
+        f"Navegadores: {estatisticas_navegadores['em_execucao']} em uso de {estatisticas_navegadores['navegadores']} abertos, "
+        f"{estatisticas_navegadores['na_fila']} tarefa(s) na fila"
+        + (f", {memoria / 2**20:.0f} MB em memória." if memoria is not None else ".")
+    )
 
+if MODO_AGENDADOR != "desligado":
+    st.sidebar.caption(
+        f"Último snapshot: FRP0 {formatar_idade(ler_snapshot_indicador('frp0')[1])}, "
+        f"DIF OPER CASADA {formatar_idade(ler_snapshot_indicador('dif_oper')[1])}."
+    )
 
 # --- Aba LINKS ---
 with aba[2]:
@@ -563,3 +430,65 @@ with aba[2]:
     st.markdown("- [Página da B3 - Câmbio Histórico](https://sistemaswebb3-clearing.b3.com.br/historicalForeignExchangePage/retroactive?language=pt-br)")
     st.markdown("- [Página BMF - Boletim de Câmbio (FRP0)](https://www2.bmf.com.br/pages/portal/bmfbovespa/boletim1/SistemaPregao1.asp?pagetype=pop&caminho=Resumo%20Estat%EDstico%20-%20Sistema%20Preg%E3o&Data=&Mercadoria=FRP)")
     st.markdown("- [Página da B3 - Indicadores Financeiros (DIF OPER CASADA)](https://sistemaswebb3-derivativos.b3.com.br/financialIndicatorsPage/?language=pt-br)")
+
+
+# --- Aba DIAGNÓSTICO ---
+with aba[3]:
+    st.title("🩺 Diagnóstico")
+    st.markdown("Tempos por etapa das extrações deste processo (amostras recentes), cache e ocupação do pool de navegadores.")
+    st.markdown("---")
+
+    if estatisticas_navegadores is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Navegadores abertos", estatisticas_navegadores["navegadores"])
+        col2.metric("Tarefas em execução", estatisticas_navegadores["em_execucao"])
+        col3.metric("Tarefas na fila", estatisticas_navegadores["na_fila"])
+        memoria = estatisticas_navegadores["memoria_bytes"]
+        col4.metric("Memória dos navegadores", f"{memoria / 2**20:.0f} MB" if memoria is not None else "N/A")
+        st.markdown("---")
+
+    disjuntores = estados_disjuntores()
+    if disjuntores:
+        st.subheader("Disjuntores por fonte")
+        st.dataframe(
+            pd.DataFrame(
+                [(fonte, estado, falhas) for fonte, (estado, falhas) in sorted(disjuntores.items())],
+                columns=["Fonte", "Estado", "Falhas seguidas"],
+            ),
+            use_container_width=True, hide_index=True,
+        )
+        st.markdown("---")
+
+    metricas = obter_metricas()
+    df_amostras = pd.DataFrame(metricas.amostras_recentes(), columns=["Momento", "Fonte", "Etapa", "Segundos"])
+    if df_amostras.empty:
+        st.info("Nenhuma medição registrada ainda neste processo.")
+    else:
+        st.subheader("Resumo por fonte e etapa")
+        resumo = df_amostras.groupby(["Fonte", "Etapa"])["Segundos"].agg(
+            Medições="count",
+            p50=lambda x: x.quantile(0.5),
+            p95=lambda x: x.quantile(0.95),
+            Máximo="max",
+        ).reset_index()
+        st.dataframe(formatar_br(resumo, casas=3), use_container_width=True, hide_index=True)
+
+        st.subheader("Histogramas de latência")
+        rotulos = [f"≤ {limite:g} s" for limite in LIMITES_HISTOGRAMA] + [f"> {LIMITES_HISTOGRAMA[-1]:g} s"]
+        df_amostras["Faixa"] = pd.cut(
+            df_amostras["Segundos"], bins=[0.0, *LIMITES_HISTOGRAMA, float("inf")], labels=rotulos, include_lowest=True
+        )
+        for fonte, df_fonte in df_amostras.groupby("Fonte"):
+            st.markdown(f"**{fonte}**")
+            histograma = df_fonte.pivot_table(index="Faixa", columns="Etapa", values="Segundos", aggfunc="count", observed=False).fillna(0)
+            st.bar_chart(histograma)
+
+    contadores = metricas.contadores()
+    if contadores:
+        st.subheader("Cache e bytes recebidos")
+        df_contadores = pd.Series(contadores).unstack(level=0).fillna(0)
+        df_contadores.index.name = "Fonte"
+        st.dataframe(formatar_br(df_contadores.reset_index(), casas=0), use_container_width=True, hide_index=True)
+
+    if ARQUIVO_METRICAS:
+        st.caption(f"Métricas exportadas no formato do Prometheus em `{ARQUIVO_METRICAS}`.")
@@ -0,0 +1,16 @@
+"""
+Configuração comum dos testes: os módulos ficam na raiz do repositório e leem
+as variáveis TCAM_* na importação, então o ambiente é ajustado antes de tudo.
+"""
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Armazém, locks e arquivo bruto em um diretório temporário; sem coleta em segundo plano.
+os.environ.setdefault("TCAM_DIR_ARMAZEM", tempfile.mkdtemp(prefix="tcam-testes-"))
+os.environ.setdefault("TCAM_ARQUIVO_BRUTO", "0")
+os.environ.setdefault("TCAM_METRICAS_ARQUIVO", "")
+os.environ.setdefault("TCAM_AGENDADOR", "desligado")
@@ -0,0 +1,54 @@
+"""Coleta em segundo plano: ordem da primeira rodada e pedidos de coleta entre processos."""
+import time
+
+import pytest
+
+import agendador
+from agendador import AgendadorColetas
+
+
+@pytest.fixture
+def coletas(tmp_path, monkeypatch):
+    """Agendador dono da coleta, com as coletas trocadas por um registro das chamadas."""
+    monkeypatch.setattr(agendador, "DIR_LOCKS", str(tmp_path))
+    monkeypatch.setattr(agendador, "ARQUIVO_SOLICITACAO", str(tmp_path / "agendador.solicitacao"))
+    monkeypatch.setattr(agendador, "INTERVALO_SOLICITACOES", 0.05)
+    monkeypatch.setattr(agendador, "em_pregao", lambda momento: True)
+    chamadas = []
+    monkeypatch.setattr(AgendadorColetas, "atualizar_b3", lambda self: chamadas.append("b3"))
+    monkeypatch.setattr(AgendadorColetas, "atualizar_indicadores", lambda self, forcar=False: chamadas.append(("indicadores", forcar)))
+    monkeypatch.setattr(AgendadorColetas, "_compactar_apos_pregao", lambda self, agora: None)
+    dono = AgendadorColetas()
+    dono.start()
+    yield chamadas
+    dono.encerrar()
+    dono.join(timeout=5)
+
+
+def _aguardar(condicao, timeout=3.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_primeira_rodada_coleta_os_indicadores_antes_da_b3(coletas):
+    assert _aguardar(lambda: len(coletas) >= 2)
+    assert coletas[:2] == [("indicadores", False), "b3"]
+
+
+def test_pedido_gravado_por_outro_processo_chega_ao_dono(coletas):
+    assert _aguardar(lambda: len(coletas) >= 2)
+
+    agendador.registrar_solicitacao()
+
+    assert _aguardar(lambda: len(coletas) >= 4)
+    assert coletas[2:4] == [("indicadores", True), "b3"]
+
+
+def test_sem_pedido_nao_ha_nova_coleta(coletas):
+    assert _aguardar(lambda: len(coletas) >= 2)
+    time.sleep(0.3)
+    assert len(coletas) == 2
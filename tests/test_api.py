@@ -0,0 +1,66 @@
+"""API: origem das tabelas da B3 conforme a janela do agendador."""
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from calendario_b3 import dias_uteis_anteriores
+from extracao_b3 import ResultadoExtracao, SemSnapshot
+
+
+@pytest.fixture
+def origens(monkeypatch):
+    """Agendador ligado, com snapshots e extração trocados por um registro das datas pedidas."""
+    monkeypatch.setattr(api, "MODO_AGENDADOR", "externo")
+    monkeypatch.setattr(api, "DIAS_AGENDADOR", 5)
+    chamadas = {"snapshot": [], "periodo": []}
+
+    def ler_snapshot_b3(datas):
+        chamadas["snapshot"].extend(datas)
+        return {d: ResultadoExtracao(None, SemSnapshot(d)) for d in datas}
+
+    def obter_dados_b3_periodo(datas):
+        chamadas["periodo"].extend(datas)
+        return {d: ResultadoExtracao(None, SemSnapshot(d)) for d in datas}
+
+    monkeypatch.setattr(api, "ler_snapshot_b3", ler_snapshot_b3)
+    monkeypatch.setattr(api, "obter_dados_b3_periodo", obter_dados_b3_periodo)
+    return chamadas
+
+
+def _dias(quantidade):
+    return [d.strftime("%d/%m/%Y") for d in dias_uteis_anteriores(date.today(), quantidade)]
+
+
+def test_datas_da_janela_vem_dos_snapshots_e_as_anteriores_do_periodo(origens):
+    dias = _dias(7)
+    pedidas = [dias[6], dias[0], dias[5], dias[1]]
+    resultados = api._dados_b3(pedidas)
+    assert list(resultados) == pedidas
+    assert origens["snapshot"] == [dias[0], dias[1]]
+    assert origens["periodo"] == [dias[6], dias[5]]
+
+
+def test_data_so_fora_da_janela_nao_le_snapshots(origens):
+    antiga = _dias(10)[-1]
+    api._dados_b3([antiga])
+    assert origens["snapshot"] == []
+    assert origens["periodo"] == [antiga]
+
+
+def test_modo_desligado_extrai_todas_as_datas(origens, monkeypatch):
+    monkeypatch.setattr(api, "MODO_AGENDADOR", "desligado")
+    dias = _dias(7)
+    api._dados_b3([dias[0], dias[6]])
+    assert origens["snapshot"] == []
+    assert origens["periodo"] == [dias[0], dias[6]]
+
+
+def test_rota_de_data_antiga_nao_depende_do_agendador(origens, monkeypatch):
+    monkeypatch.setattr(api, "consultar_cache", lambda *args: (False, None))
+    antiga = dias_uteis_anteriores(date.today(), 10)[-1]
+    resposta = TestClient(api.app).get(f"/tcam/{antiga.isoformat()}")
+    assert origens["snapshot"] == []
+    assert origens["periodo"] == [antiga.strftime("%d/%m/%Y")]
+    assert resposta.status_code == 503
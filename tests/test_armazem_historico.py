@@ -0,0 +1,75 @@
+"""Snapshots Parquet do armazém histórico."""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from armazem_historico import COLUNA_CAPTURA, ArmazemHistorico
+
+DATA = date(2024, 6, 14)
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    return ArmazemHistorico(str(tmp_path))
+
+
+def _df(valor):
+    return pd.DataFrame({"Valor": [valor]})
+
+
+def test_le_o_ultimo_snapshot(armazem):
+    armazem.gravar("frp0", DATA, _df(1.0), capturado_em=datetime(2024, 6, 14, 10))
+    armazem.gravar("frp0", DATA, _df(2.0), capturado_em=datetime(2024, 6, 14, 11))
+
+    df, capturado_em = armazem.ler_ultimo("frp0", DATA)
+
+    assert df["Valor"].tolist() == [2.0]
+    assert COLUNA_CAPTURA not in df.columns
+    assert capturado_em == datetime(2024, 6, 14, 11)
+
+
+def test_data_sem_dados(armazem):
+    assert armazem.ler_ultimo("frp0", DATA) == (None, None)
+    assert armazem.ler_ultimo_disponivel("frp0") == (None, None)
+    assert armazem.gravar("frp0", DATA, pd.DataFrame()) is None
+
+
+def test_ultimo_disponivel_usa_a_particao_mais_recente(armazem):
+    armazem.gravar("tcam", date(2024, 6, 13), _df(1.0))
+    armazem.gravar("tcam", DATA, _df(2.0))
+
+    df, _ = armazem.ler_ultimo_disponivel("tcam")
+
+    assert df["Valor"].tolist() == [2.0]
+
+
+def test_compactar_mantem_so_o_ultimo_snapshot_da_b3(armazem):
+    for hora in (10, 11):
+        armazem.gravar("tcam", DATA, _df(float(hora)), capturado_em=datetime(2024, 6, 14, hora))
+
+    assert armazem.compactar(["tcam"]) == 1
+
+    snapshots = armazem.ler_snapshots("tcam", DATA)
+    assert snapshots["Valor"].tolist() == [11.0]
+    assert armazem.compactar(["tcam"]) == 0
+
+
+def test_compactar_mantem_o_historico_dos_indicadores(armazem):
+    for hora in (10, 11):
+        armazem.gravar("frp0", DATA, _df(float(hora)), capturado_em=datetime(2024, 6, 14, hora))
+
+    armazem.compactar(["frp0"])
+
+    assert armazem.ler_snapshots("frp0", DATA)["Valor"].tolist() == [10.0, 11.0]
+
+
+def test_substituir_reescreve_a_particao(armazem):
+    armazem.gravar("tcam", DATA, _df(1.0))
+    novo = _df(5.0).assign(**{COLUNA_CAPTURA: pd.Timestamp(2024, 6, 14, 12)})
+
+    armazem.substituir("tcam", DATA, novo)
+
+    df, capturado_em = armazem.ler_ultimo("tcam", DATA)
+    assert df["Valor"].tolist() == [5.0]
+    assert capturado_em == datetime(2024, 6, 14, 12)
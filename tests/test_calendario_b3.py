@@ -0,0 +1,54 @@
+"""Calendário de dias úteis do câmbio na B3."""
+from datetime import date, datetime
+
+import pytest
+
+from calendario_b3 import (
+    calcular_pascoa,
+    dia_util_anterior,
+    dias_uteis_anteriores,
+    eh_dia_util,
+    feriados_do_ano,
+    obter_data_util_para_consulta,
+)
+
+
+@pytest.mark.parametrize("ano, pascoa", [(2023, date(2023, 4, 9)), (2024, date(2024, 3, 31)), (2025, date(2025, 4, 20))])
+def test_pascoa(ano, pascoa):
+    assert calcular_pascoa(ano) == pascoa
+
+
+def test_feriados_moveis_de_2024():
+    feriados = feriados_do_ano(2024)
+
+    assert {date(2024, 2, 12), date(2024, 2, 13)} <= feriados  # Carnaval
+    assert date(2024, 3, 29) in feriados  # Sexta-feira Santa
+    assert date(2024, 5, 30) in feriados  # Corpus Christi
+
+
+def test_dias_sem_pregao_de_fim_de_ano():
+    assert {date(2024, 12, 24), date(2024, 12, 31)} <= feriados_do_ano(2024)
+
+
+def test_consciencia_negra_so_a_partir_de_2024():
+    assert date(2023, 11, 20) not in feriados_do_ano(2023)
+    assert date(2024, 11, 20) in feriados_do_ano(2024)
+
+
+def test_eh_dia_util():
+    assert eh_dia_util(date(2024, 6, 14))  # sexta-feira
+    assert not eh_dia_util(date(2024, 6, 15))  # sábado
+    assert not eh_dia_util(date(2024, 3, 29))  # Sexta-feira Santa
+    assert eh_dia_util(datetime(2024, 6, 14, 18, 30))
+
+
+def test_dias_uteis_anteriores_sao_estritamente_anteriores_do_mais_recente():
+    assert dias_uteis_anteriores(date(2024, 4, 2), 3) == [date(2024, 4, 1), date(2024, 3, 28), date(2024, 3, 27)]
+
+
+def test_dia_util_anterior_pula_fim_de_semana_e_feriado():
+    assert dia_util_anterior(date(2024, 2, 14)) == date(2024, 2, 9)  # depois do Carnaval
+
+
+def test_data_para_consulta():
+    assert obter_data_util_para_consulta(datetime(2024, 6, 17, 9, 0)) == "14/06/2024"
@@ -0,0 +1,63 @@
+"""Conversão das colunas em texto (padrão brasileiro) para tipos do pandas."""
+import pandas as pd
+import pytest
+
+from esquema_tabelas import (
+    ESQUEMA_LIQUIDO,
+    converter_data,
+    converter_inteiro_br,
+    converter_numero_br,
+    converter_tcam,
+    separar_total,
+    tipar,
+)
+from extracao_b3 import tratar_valor_tcam_original
+
+
+def test_numero_br():
+    serie = converter_numero_br(pd.Series(["1.234.567,89", " 12,5 ", "-0,01", "abc", ""]))
+
+    assert serie.dtype == "float64"
+    assert serie.iloc[:3].tolist() == [1234567.89, 12.5, -0.01]
+    assert serie.iloc[3:].isna().all()
+
+
+def test_numero_ja_numerico_so_muda_o_tipo():
+    assert converter_numero_br(pd.Series([1, 2])).tolist() == [1.0, 2.0]
+
+
+def test_inteiro_br_aceita_ausentes():
+    serie = converter_inteiro_br(pd.Series(["1.234", "", "7"]))
+
+    assert str(serie.dtype) == "Int64"
+    assert serie.iloc[0] == 1234
+    assert serie.iloc[1] is pd.NA
+    assert serie.iloc[2] == 7
+
+
+@pytest.mark.parametrize("texto", ["5,4321", "5.432,1", "1", "", "R$ 5,37"])
+def test_tcam_igual_ao_tratamento_original(texto):
+    assert converter_tcam(pd.Series([texto])).iloc[0] == pytest.approx(tratar_valor_tcam_original(texto))
+
+
+def test_data_dd_mm_aaaa():
+    serie = converter_data(pd.Series(["14/06/2024", " 01/02/2023 ", "Total"]))
+
+    assert serie.iloc[0] == pd.Timestamp(2024, 6, 14)
+    assert serie.iloc[1] == pd.Timestamp(2023, 2, 1)
+    assert pd.isna(serie.iloc[2])
+
+
+def test_data_nao_inverte_dia_e_mes():
+    assert converter_data(pd.Series(["02/03/2024"])).iloc[0] == pd.Timestamp(2024, 3, 2)
+
+
+def test_tipar_e_separar_total():
+    df = pd.DataFrame({"Data": ["14/06/2024", "Total"], "US$": ["1.000,50", "1.000,50"], "R$": ["5.374,20", "5.374,20"]})
+
+    linhas, total = separar_total(tipar(df, ESQUEMA_LIQUIDO))
+
+    assert df["US$"].tolist() == ["1.000,50", "1.000,50"]  # tipar não altera o original
+    assert len(linhas) == 1 and len(total) == 1
+    assert linhas["US$"].iloc[0] == 1000.5
+    assert total["R$"].iloc[0] == 5374.2
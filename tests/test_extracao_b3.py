@@ -0,0 +1,318 @@
+"""Extração da B3: leitura dos payloads JSON (XHR) e do HTML, esperas pela página e indicadores no armazém."""
+import json
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import armazem_historico
+import extracao_b3
+import leitura_tabelas
+from armazem_historico import ArmazemHistorico, obter_armazem
+from cache_extracao import limpar_cache
+from extracao_b3 import (
+    _JS_MARCAR_SEM_REGISTRO,
+    _JS_SINAL_B3,
+    ATRIBUTO_MENSAGEM_ANTERIOR,
+    TEXTO_SEM_REGISTRO,
+    SemPrecoFRP0,
+    SemRegistroB3,
+    SinalRecebido,
+    _aguardar_json_ou_dom,
+    forcar_frp0,
+    interpretar_html_b3,
+    interpretar_html_frp0,
+    interpretar_json_b3,
+    interpretar_json_dif_oper,
+    obter_frp0,
+)
+from resiliencia import ValorDesatualizado
+
+DATA = "14/06/2024"
+DATA_ANTERIOR = "13/06/2024"
+
+
+def _payload_b3(data, total=True):
+    """Payload no formato da consulta da B3: TCAM (8 colunas), volume (10) e valores liquidados (3)."""
+    iso = "-".join(reversed(data.split("/")))
+    payload = {
+        "rates": [{
+            "date": iso, "closing": 5.3742, "minOtc": 5.3501, "avgOtc": 5.3688, "maxOtc": 5.3899,
+            "minFloor": 5.3510, "avgFloor": 5.3690, "maxFloor": 5.3880,
+        }],
+        "contractedVolume": [{
+            "date": iso, "usdOtc": 1500.5, "brlOtc": 8063.2, "tradesOtc": 120,
+            "usdFloor": 300.25, "brlFloor": 1612.9, "tradesFloor": 15,
+            "usdTotal": 1800.75, "brlTotal": 9676.1, "tradesTotal": 135,
+        }],
+        "netting": [{"date": "2024-06-18", "usd": 250.0, "brl": 1343.55}],
+    }
+    if total:
+        payload["totalVolume"] = {
+            "usdOtc": 1500.5, "brlOtc": 8063.2, "tradesOtc": 120,
+            "usdFloor": 300.25, "brlFloor": 1612.9, "tradesFloor": 15,
+            "usdTotal": 1800.75, "brlTotal": 9676.1, "tradesTotal": 135,
+        }
+    return payload
+
+
+def test_payload_de_outra_data_nao_e_aceito():
+    assert interpretar_json_b3([_payload_b3(DATA_ANTERIOR)], DATA) is None
+
+
+def test_resposta_atrasada_da_consulta_anterior_e_descartada():
+    dados = interpretar_json_b3([_payload_b3(DATA_ANTERIOR), _payload_b3(DATA)], DATA)
+
+    assert dados is not None
+    assert dados.tcam["Data"].dt.strftime("%d/%m/%Y").tolist() == [DATA]
+    assert dados.volume["Data"].dt.strftime("%d/%m/%Y").tolist() == [DATA]
+
+
+def test_data_da_consulta_e_normalizada():
+    assert interpretar_json_b3([_payload_b3(DATA)], "14/6/2024") is not None
+
+
+def test_total_do_volume_vira_total_volume():
+    dados = interpretar_json_b3([_payload_b3(DATA)], DATA)
+
+    assert len(dados.volume) == 1
+    assert len(dados.total_volume) == 1
+    assert dados.total_volume["US$ Total"].iloc[0] == pytest.approx(1800.75)
+    assert dados.total_volume["Negócios Total"].iloc[0] == 135
+
+
+def test_sem_objeto_de_total_o_volume_fica_sem_total():
+    dados = interpretar_json_b3([_payload_b3(DATA, total=False)], DATA)
+
+    assert len(dados.volume) == 1
+    assert dados.total_volume.empty
+
+
+def test_resposta_com_tabelas_vazias_levanta_sem_registro():
+    with pytest.raises(SemRegistroB3):
+        interpretar_json_b3([{"rates": [], "contractedVolume": [], "netting": []}], DATA)
+
+
+def test_resposta_com_mensagem_de_sem_registro_levanta_sem_registro():
+    with pytest.raises(SemRegistroB3):
+        interpretar_json_b3([{"message": f"{TEXTO_SEM_REGISTRO} para a data informada"}], DATA)
+
+
+def test_payload_sem_tabelas_reconhecidas_retorna_none():
+    assert interpretar_json_b3([{"status": "ok"}], DATA) is None
+
+
+def test_listas_vazias_de_outro_xhr_nao_sao_sem_registro():
+    assert interpretar_json_b3([{"avisos": [], "menus": [], "links": []}], DATA) is None
+
+
+# --- Corrida entre o payload JSON e o DOM ---
+
+class RespostaFalsa:
+    def __init__(self, payload):
+        self._corpo = json.dumps(payload).encode()
+
+    def body(self):
+        return self._corpo
+
+
+def _esperar_dom(chega_em):
+    """Espera pelo DOM que só devolve o sinal a partir do instante `chega_em`."""
+    from playwright.sync_api import TimeoutError as TempoEsgotadoPlaywright
+
+    def esperar(timeout_ms):
+        espera = min(timeout_ms / 1000, max(0.0, chega_em - time.monotonic()))
+        time.sleep(espera)
+        if time.monotonic() < chega_em:
+            raise TempoEsgotadoPlaywright("timeout")
+        return True
+
+    return esperar
+
+
+def _corrida(respostas, esperar_dom, timeout_ms=5000):
+    return _aguardar_json_ou_dom(
+        respostas, lambda payloads: interpretar_json_b3(payloads, DATA), esperar_dom, timeout_ms, "b3_cambio", [],
+    )
+
+
+def test_payload_reconhecido_vence_o_dom():
+    sinal = _corrida([RespostaFalsa(_payload_b3(DATA))], _esperar_dom(time.monotonic() + 60))
+
+    assert sinal.sinal == "json"
+    assert sinal.valor.tcam["Data"].dt.strftime("%d/%m/%Y").tolist() == [DATA]
+
+
+def test_payload_com_formato_inesperado_segue_pelo_dom_sem_esperar_o_timeout():
+    payload = _payload_b3(DATA)
+    payload["rates"][0]["extra"] = None
+    inicio = time.monotonic()
+
+    sinal = _corrida([RespostaFalsa(payload)], _esperar_dom(inicio + 0.3))
+
+    assert sinal == SinalRecebido("dom", None)
+    assert time.monotonic() - inicio < 2
+
+
+def test_payload_que_chega_durante_a_espera_pelo_dom_e_lido():
+    respostas = []
+    chega_em = time.monotonic() + 0.3
+    esperar_dom = _esperar_dom(time.monotonic() + 60)
+
+    def esperar(timeout_ms):
+        if time.monotonic() >= chega_em and not respostas:
+            respostas.append(RespostaFalsa(_payload_b3(DATA)))
+        return esperar_dom(timeout_ms)
+
+    assert _corrida(respostas, esperar).sinal == "json"
+
+
+def test_sem_payload_nem_dom_retorna_none_no_timeout():
+    assert _corrida([], _esperar_dom(time.monotonic() + 60), timeout_ms=300) is None
+
+
+
+def test_dif_oper_le_valor_e_data_pelo_nome_do_campo():
+    payload = {"indicators": [
+        {"id": 7, "descricao": "DOLAR COMERCIAL", "valor": 5.41, "dataAtualizacao": "2024-06-14"},
+        {"id": 12, "descricao": "DIF OPER CASADA - COMPRA", "valor": 0.35, "dataAtualizacao": "2024-06-14"},
+    ]}
+
+    assert interpretar_json_dif_oper([payload]) == ("0,35", "14/06/2024")
+
+
+def test_dif_oper_ausente_retorna_none():
+    assert interpretar_json_dif_oper([{"indicators": [{"descricao": "OUTRO", "valor": 1.0}]}]) is None
+
+
+
+# --- HTML da página ---
+
+def _html_b3(mensagem):
+    """Página com a mensagem `mensagem` (uma <div> inteira) e a tabela TCAM da data."""
+    celulas = "".join(f"<td>{valor}</td>" for valor in [DATA, "5,3742", "5,3501", "5,3688", "5,3899", "5,3510", "5,3690", "5,3880"])
+    return f"<html><body>{mensagem}<table id='ratesTable'><tbody><tr>{celulas}</tr></tbody></table></body></html>"
+
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def leitor_html(request, monkeypatch):
+    """Roda o teste com o lxml e com o html.parser (sem lxml instalado)."""
+    if request.param == "html.parser":
+        monkeypatch.setattr(leitura_tabelas, "_lxml", lambda: None)
+    return request.param
+
+
+def test_mensagem_marcada_da_consulta_anterior_nao_esconde_a_tabela(leitor_html):
+    html = _html_b3(f"<div {ATRIBUTO_MENSAGEM_ANTERIOR}=''>{TEXTO_SEM_REGISTRO}</div>")
+
+    dados = interpretar_html_b3(html, DATA)
+
+    assert dados.tcam["Data"].dt.strftime("%d/%m/%Y").tolist() == [DATA]
+
+
+def test_mensagem_nova_levanta_sem_registro(leitor_html):
+    with pytest.raises(SemRegistroB3):
+        interpretar_html_b3(f"<html><body><div>{TEXTO_SEM_REGISTRO}</div></body></html>", DATA)
+
+
+
+# --- Sinal de espera no DOM ---
+
+@pytest.fixture(scope="module")
+def pagina():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as p:
+        try:
+            navegador = p.chromium.launch()
+        except Exception as e:
+            pytest.skip(f"Chromium indisponível: {e}")
+        yield navegador.new_page()
+        navegador.close()
+
+
+def _sinal(pagina, data):
+    return pagina.evaluate(_JS_SINAL_B3, [data, TEXTO_SEM_REGISTRO])
+
+
+def test_mensagem_da_data_anterior_nao_encerra_a_espera(pagina):
+    pagina.set_content(f"<div id='resultado'><div>{TEXTO_SEM_REGISTRO}</div></div>")
+    pagina.evaluate(_JS_MARCAR_SEM_REGISTRO, TEXTO_SEM_REGISTRO)
+
+    assert _sinal(pagina, DATA) is False
+
+    pagina.evaluate(f"""() => document.querySelector("#resultado").innerHTML =
+        "<table id='ratesTable'><tr><td>{DATA}</td></tr></table>" """)
+    assert _sinal(pagina, DATA) is True
+
+
+def test_mensagem_nova_encerra_a_espera(pagina):
+    pagina.set_content(f"<table id='ratesTable'><tr><td>{DATA_ANTERIOR}</td></tr></table>")
+    pagina.evaluate(_JS_MARCAR_SEM_REGISTRO, TEXTO_SEM_REGISTRO)
+
+    assert _sinal(pagina, DATA) is False
+
+    pagina.evaluate(f"""() => document.body.innerHTML = "<div>{TEXTO_SEM_REGISTRO}</div>" """)
+    assert _sinal(pagina, DATA) is True
+
+
+# --- Indicadores com o armazém histórico ---
+
+def _boletim_frp0(celulas):
+    linha = "".join(f"<td>{celula}</td>" for celula in celulas)
+    return (
+        "<html><body><div id='MercadoFut2'><table class='tabConteudo'>"
+        "<tr><td colspan='7'>FRP0</td></tr><tr><td>Abertura</td></tr>"
+        f"<tr>{linha}</tr></table></div></body></html>"
+    )
+
+
+def test_frp0_com_negocios():
+    df_frp = interpretar_html_frp0(_boletim_frp0(["1,5", "1,0", "2,0", "1,5", "1,75", "1,7", "1,8"]))
+
+    assert df_frp["Último Preço"].tolist() == [1.75]
+
+
+@pytest.mark.parametrize("sem_preco", ["-", ""])
+def test_frp0_sem_negocios_vem_vazio(sem_preco):
+    df_frp = interpretar_html_frp0(_boletim_frp0([sem_preco] * 7))
+
+    assert df_frp.empty
+
+
+@pytest.fixture
+def frp0_no_armazem(tmp_path, monkeypatch):
+    """Snapshot recente do FRP0 em um armazém novo e uma extração que devolve o que estiver em `extraidos`."""
+    monkeypatch.setattr(armazem_historico, "_armazem", ArmazemHistorico(str(tmp_path)))
+    extraidos = [pd.DataFrame({"Último Preço": [2.5]})]
+
+    def extrair_frp0(data_desejada=None):
+        return extraidos.pop(0)
+
+    monkeypatch.setattr(extracao_b3, "extrair_frp0", extrair_frp0)
+    limpar_cache()
+    obter_armazem().gravar("frp0", date.today(), pd.DataFrame({"Último Preço": [1.5]}))
+    yield extraidos
+    limpar_cache()
+
+
+def test_atualizar_agora_nao_reaproveita_o_snapshot_recente(frp0_no_armazem):
+    assert obter_frp0()["Último Preço"].iloc[0] == 1.5
+    assert len(frp0_no_armazem) == 1
+
+    assert forcar_frp0()["Último Preço"].iloc[0] == 2.5
+    assert frp0_no_armazem == []
+    # As próximas execuções da página leem o valor novo do cache
+    assert obter_frp0()["Último Preço"].iloc[0] == 2.5
+
+
+def test_frp0_sem_negocios_nao_e_gravado_e_mantem_o_ultimo_preco(frp0_no_armazem):
+    frp0_no_armazem[:] = [pd.DataFrame(columns=["Último Preço"])]
+
+    with pytest.raises(ValorDesatualizado) as erro:
+        forcar_frp0()
+
+    assert erro.value.valor["Último Preço"].iloc[0] == 1.5
+    assert isinstance(erro.value.causa, SemPrecoFRP0)
+    df_frp, _ = obter_armazem().ler_ultimo("frp0", date.today())
+    assert df_frp["Último Preço"].tolist() == [1.5]
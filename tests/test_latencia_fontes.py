@@ -0,0 +1,41 @@
+"""Timeouts adaptativos por série de latência (fonte e sinal)."""
+from latencia_fontes import AMOSTRAS_MINIMAS, FATOR_TIMEOUT, TIMEOUT_MINIMO_MS, LatenciasFontes, serie_latencia
+
+TETO_MS = 600000
+JSON = serie_latencia("b3_cambio", "json")
+DOM = serie_latencia("b3_cambio", "dom")
+
+
+def _com_amostras(segundos, serie=JSON):
+    latencias = LatenciasFontes()
+    for _ in range(AMOSTRAS_MINIMAS):
+        latencias.registrar(serie, segundos)
+    return latencias
+
+
+def test_sem_amostras_suficientes_usa_o_teto():
+    latencias = LatenciasFontes()
+    latencias.registrar(JSON, 1.0)
+
+    assert latencias.timeout_ms(JSON, TETO_MS) == TETO_MS
+
+
+def test_timeout_segue_as_latencias_com_piso():
+    assert _com_amostras(5.0).timeout_ms(JSON, TETO_MS) == 5.0 * FATOR_TIMEOUT * 1000
+    assert _com_amostras(0.1).timeout_ms(JSON, TETO_MS) == TIMEOUT_MINIMO_MS
+
+
+def test_series_da_mesma_fonte_sao_independentes():
+    latencias = _com_amostras(5.0, serie=DOM)
+
+    assert latencias.timeout_ms(JSON, TETO_MS) == TETO_MS
+
+
+def test_estouro_volta_ao_teto_ate_a_proxima_latencia():
+    latencias = _com_amostras(5.0)
+
+    latencias.registrar_estouro(JSON)
+    assert latencias.timeout_ms(JSON, TETO_MS) == TETO_MS
+
+    latencias.registrar(JSON, 5.0)
+    assert latencias.timeout_ms(JSON, TETO_MS) == 5.0 * FATOR_TIMEOUT * 1000
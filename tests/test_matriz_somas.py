@@ -0,0 +1,47 @@
+"""Somas TCAM + indicadores para várias datas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from matriz_somas import COLUNA_TCAM, ESTATISTICAS_TCAM, calcular_matriz_somas, coluna_soma
+
+
+@pytest.fixture
+def df_tcam():
+    return pd.DataFrame({
+        "Data": pd.to_datetime(["2024-06-13", "2024-06-14"]),
+        "Fechamento": [5.0, 6.0], "Mínima": [4.0, 5.0], "Média": [4.5, 5.5], "Máxima": [5.5, 6.5],
+    })
+
+
+def test_forma_e_colunas(df_tcam):
+    somas = calcular_matriz_somas(df_tcam, {"FRP0": 1.0, "DIF OPER CASADA": 0.5})
+
+    assert somas.index.names == ["Data", "Estatística"]
+    assert len(somas) == 2 * len(ESTATISTICAS_TCAM)
+    assert list(somas.columns) == [COLUNA_TCAM, "FRP0", "DIF OPER CASADA", "TCAM + FRP0", "TCAM + DIF OPER CASADA"]
+    assert (somas.dtypes == "float64").all()
+
+
+def test_numero_soma_em_todas_as_datas(df_tcam):
+    somas = calcular_matriz_somas(df_tcam, {"FRP0": 1.0})
+
+    assert somas.loc[(pd.Timestamp("2024-06-13"), "Fechamento"), coluna_soma("FRP0")] == 6.0
+    assert somas.loc[(pd.Timestamp("2024-06-14"), "Máximo"), coluna_soma("FRP0")] == 7.5
+    assert somas.loc[(pd.Timestamp("2024-06-14"), "Mínimo"), COLUNA_TCAM] == 5.0
+
+
+def test_series_e_alinhada_pela_data(df_tcam):
+    frp = pd.Series([0.1], index=[pd.Timestamp("2024-06-14")])
+
+    somas = calcular_matriz_somas(df_tcam, {"FRP0": frp})
+
+    assert somas.loc[(pd.Timestamp("2024-06-14"), "Média"), coluna_soma("FRP0")] == pytest.approx(5.6)
+    assert np.isnan(somas.loc[(pd.Timestamp("2024-06-13"), "Média"), coluna_soma("FRP0")])
+
+
+def test_indicador_indisponivel_fica_nan(df_tcam):
+    somas = calcular_matriz_somas(df_tcam, {"FRP0": 1.0, "DIF OPER CASADA": None})
+
+    assert somas[coluna_soma("DIF OPER CASADA")].isna().all()
+    assert somas[coluna_soma("FRP0")].notna().all()
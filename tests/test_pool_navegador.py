@@ -0,0 +1,213 @@
+"""Pool de navegadores: reaproveitamento, reciclagem, ociosidade, fila e encerramento, com um Chromium falso."""
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import pool_navegador
+from pool_navegador import PRIORIDADE_DATAS_ANTERIORES, PRIORIDADE_TCAM01, PoolNavegadores, TempoEsgotadoNaFila
+
+
+class ContextoFalso:
+    def __init__(self):
+        self.fechado = False
+
+    def new_page(self):
+        return object()
+
+    def close(self):
+        self.fechado = True
+
+
+class NavegadorFalso:
+    def __init__(self):
+        self.conectado = True
+        self.fechado = False
+        self.contextos = []
+
+    def is_connected(self):
+        return self.conectado and not self.fechado
+
+    def new_context(self):
+        self.contextos.append(ContextoFalso())
+        return self.contextos[-1]
+
+    def close(self):
+        self.fechado = True
+
+
+class PlaywrightFalso:
+    def __init__(self):
+        self.navegadores = []
+        self.parado = False
+        self.chromium = types.SimpleNamespace(launch=self._lancar)
+
+    def _lancar(self, headless=True):
+        self.navegadores.append(NavegadorFalso())
+        return self.navegadores[-1]
+
+    def stop(self):
+        self.parado = True
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    """Substitui o Playwright pelo falso e deixa as verificações de ociosidade rápidas."""
+    falsos = []
+
+    def sync_playwright():
+        falsos.append(PlaywrightFalso())
+        return types.SimpleNamespace(start=lambda: falsos[-1])
+
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", types.SimpleNamespace(sync_playwright=sync_playwright))
+    monkeypatch.setattr(pool_navegador, "aguardar_navegador", lambda: None)
+    monkeypatch.setattr(pool_navegador, "INTERVALO_VERIFICACAO", 0.05)
+    return falsos
+
+
+@pytest.fixture
+def criar_pool(playwright):
+    pools = []
+
+    def criar(tamanho=1, aquecidos=0):
+        pools.append(PoolNavegadores(tamanho, aquecidos))
+        return pools[-1]
+
+    yield criar
+    for pool in pools:
+        pool.encerrar()
+
+
+def _navegadores(playwright):
+    return [navegador for falso in playwright for navegador in falso.navegadores]
+
+
+def _aguardar(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_navegador_sobe_so_na_primeira_tarefa_e_e_reaproveitado(criar_pool, playwright):
+    pool = criar_pool()
+    time.sleep(0.1)
+    assert _navegadores(playwright) == []
+
+    assert pool.executar(lambda pagina: "a") == "a"
+    assert pool.executar(lambda pagina: "b") == "b"
+
+    navegadores = _navegadores(playwright)
+    assert len(navegadores) == 1
+    assert all(contexto.fechado for contexto in navegadores[0].contextos)
+
+
+def test_recicla_depois_do_maximo_de_usos(criar_pool, playwright, monkeypatch):
+    monkeypatch.setattr(pool_navegador, "MAX_USOS_NAVEGADOR", 2)
+    pool = criar_pool()
+
+    for _ in range(3):
+        pool.executar(lambda pagina: None)
+
+    primeiro, segundo = _navegadores(playwright)
+    assert primeiro.fechado and not segundo.fechado
+
+
+def test_recicla_navegador_velho(criar_pool, playwright, monkeypatch):
+    monkeypatch.setattr(pool_navegador, "IDADE_MAXIMA_NAVEGADOR", 0.0)
+    pool = criar_pool()
+
+    pool.executar(lambda pagina: None)
+    pool.executar(lambda pagina: None)
+
+    assert len(_navegadores(playwright)) == 2
+    assert _navegadores(playwright)[0].fechado
+
+
+def test_substitui_navegador_desconectado(criar_pool, playwright):
+    pool = criar_pool()
+    pool.executar(lambda pagina: None)
+    _navegadores(playwright)[0].conectado = False
+
+    pool.executar(lambda pagina: None)
+
+    assert len(_navegadores(playwright)) == 2
+
+
+def test_fecha_navegador_ocioso(criar_pool, playwright, monkeypatch):
+    monkeypatch.setattr(pool_navegador, "OCIOSIDADE_MAXIMA", 0.1)
+    pool = criar_pool()
+    pool.executar(lambda pagina: None)
+
+    assert _aguardar(lambda: _navegadores(playwright)[0].fechado)
+    assert pool.estatisticas()["navegadores"] == 0
+
+    pool.executar(lambda pagina: None)
+    assert len(_navegadores(playwright)) == 2
+
+
+def test_navegador_aquecido_sobe_na_criacao_e_nao_fecha_ocioso(criar_pool, playwright, monkeypatch):
+    monkeypatch.setattr(pool_navegador, "OCIOSIDADE_MAXIMA", 0.05)
+    pool = criar_pool(tamanho=2, aquecidos=1)
+
+    assert _aguardar(lambda: len(_navegadores(playwright)) == 1)
+    time.sleep(0.3)
+    assert not _navegadores(playwright)[0].fechado
+    assert pool.estatisticas()["navegadores"] == 1
+
+
+def test_erro_da_tarefa_chega_ao_chamador_e_o_contexto_e_fechado(criar_pool, playwright):
+    pool = criar_pool()
+
+    def falhar(pagina):
+        raise ValueError("falhou")
+
+    with pytest.raises(ValueError):
+        pool.executar(falhar)
+    assert pool.executar(lambda pagina: "ok") == "ok"
+    assert all(contexto.fechado for contexto in _navegadores(playwright)[0].contextos)
+
+
+def test_fila_atende_primeiro_a_menor_prioridade(criar_pool):
+    pool = criar_pool()
+    liberar = threading.Event()
+    ordem = []
+    ocupando = pool.submeter(lambda pagina: liberar.wait(5))
+    assert _aguardar(lambda: pool.estatisticas()["em_execucao"] == 1)
+
+    anterior = pool.submeter(lambda pagina: ordem.append("anterior"), prioridade=PRIORIDADE_DATAS_ANTERIORES)
+    tcam01 = pool.submeter(lambda pagina: ordem.append("tcam01"), prioridade=PRIORIDADE_TCAM01)
+    liberar.set()
+    for futuro in (ocupando, anterior, tcam01):
+        futuro.result(timeout=2)
+
+    assert ordem == ["tcam01", "anterior"]
+
+
+def test_tarefa_que_espera_demais_na_fila_e_recusada(criar_pool):
+    pool = criar_pool()
+    liberar = threading.Event()
+    pool.submeter(lambda pagina: liberar.wait(5))
+
+    futuro = pool.submeter(lambda pagina: None, timeout_fila=0.2)
+    try:
+        with pytest.raises(TempoEsgotadoNaFila):
+            futuro.result(timeout=3)
+    finally:
+        liberar.set()
+
+
+def test_encerrar_fecha_navegadores_e_recusa_novas_tarefas(criar_pool, playwright):
+    pool = criar_pool(tamanho=2)
+    pool.executar(lambda pagina: None)
+
+    pool.encerrar()
+
+    assert all(navegador.fechado for navegador in _navegadores(playwright))
+    assert all(falso.parado for falso in playwright)
+    with pytest.raises(RuntimeError):
+        pool.submeter(lambda pagina: None)
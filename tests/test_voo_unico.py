@@ -0,0 +1,92 @@
+"""Extração única por chave, dentro do processo e entre processos."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from voo_unico import VooUnico
+
+
+@pytest.fixture
+def voo(tmp_path):
+    return VooUnico(str(tmp_path / "locks"), timeout=10)
+
+
+def test_pedidos_simultaneos_extraem_uma_vez(voo):
+    chamadas = []
+    liberar = threading.Event()
+
+    def extrair():
+        chamadas.append(1)
+        liberar.wait(5)
+        return "valor"
+
+    with ThreadPoolExecutor(4) as executor:
+        futuros = [executor.submit(voo.executar, ("b3", "14/06/2024"), extrair) for _ in range(4)]
+        time.sleep(0.2)
+        liberar.set()
+        resultados = [futuro.result() for futuro in futuros]
+
+    assert resultados == ["valor"] * 4
+    assert len(chamadas) == 1
+
+
+def test_valor_relido_dispensa_a_extracao(voo):
+    def extrair():
+        raise AssertionError("não deveria extrair")
+
+    assert voo.executar(("b3", "14/06/2024"), extrair, reler=lambda: "gravado") == "gravado"
+
+
+def test_erro_chega_a_todos_e_libera_a_chave(voo):
+    liberar = threading.Event()
+
+    def falhar():
+        liberar.wait(5)
+        raise RuntimeError("falhou")
+
+    with ThreadPoolExecutor(2) as executor:
+        futuros = [executor.submit(voo.executar, ("b3", "x"), falhar) for _ in range(2)]
+        time.sleep(0.2)
+        liberar.set()
+        for futuro in futuros:
+            with pytest.raises(RuntimeError):
+                futuro.result()
+
+    assert voo.executar(("b3", "x"), lambda: "ok") == "ok"
+
+
+def test_lote_extrai_so_o_que_falta(voo):
+    gravados = {"13/06/2024": "a"}
+    pedidos = []
+
+    def extrair_lote(itens):
+        pedidos.append(list(itens))
+        return {item: item.upper() for item in itens}
+
+    resultado = voo.executar_lote("b3", ["13/06/2024", "14/06/2024"], extrair_lote, gravados.get)
+
+    assert resultado == {"13/06/2024": "a", "14/06/2024": "14/06/2024"}
+    assert pedidos == [["14/06/2024"]]
+
+
+def test_lote_espera_item_em_andamento_em_outra_thread(voo):
+    liberar = threading.Event()
+    pedidos = []
+
+    def extrair_lote(itens):
+        pedidos.append(sorted(itens))
+        liberar.wait(5)
+        return {item: f"v{item}" for item in itens}
+
+    with ThreadPoolExecutor(2) as executor:
+        primeiro = executor.submit(voo.executar_lote, "b3", ["1", "2"], extrair_lote, lambda item: None)
+        time.sleep(0.2)
+        segundo = executor.submit(voo.executar_lote, "b3", ["2", "3"], extrair_lote, lambda item: None)
+        time.sleep(0.2)
+        liberar.set()
+
+        assert primeiro.result() == {"1": "v1", "2": "v2"}
+        assert segundo.result() == {"2": "v2", "3": "v3"}
+    assert sorted(pedidos) == [["1", "2"], ["3"]]
@@ -0,0 +1,156 @@
+"""
+Deduplicação de extrações concorrentes ("voo único").
+
+Pedidos simultâneos pela mesma chave (fonte, data) compartilham uma única
+extração em andamento:
+
+* no mesmo processo, o primeiro pedido executa a extração e os demais esperam
+  e recebem o mesmo resultado (ou a mesma exceção);
+* entre processos (réplicas da página, agendador), a extração de cada chave é
+  protegida por um FileLock. Quem esperou pelo lock relê primeiro o armazém
+  histórico, onde o outro processo gravou o resultado, e só extrai se o dado
+  ainda não estiver lá.
+
+Assim a carga na B3/BMF e a memória dos navegadores não crescem com a
+quantidade de usuários abrindo a página ao mesmo tempo.
+"""
+import os
+import re
+import threading
+from concurrent.futures import Future
+
+from filelock import FileLock, Timeout
+
+from armazem_historico import DIR_ARMAZEM
+
+DIR_LOCKS = os.environ.get("TCAM_DIR_LOCKS", os.path.join(DIR_ARMAZEM, ".locks"))
+TIMEOUT_VOO_UNICO = float(os.environ.get("TCAM_TIMEOUT_VOO_UNICO", "300"))  # segundos
+
+
+class VooUnico:
+    """Coordena as extrações em andamento por chave, dentro do processo e entre processos."""
+
+    def __init__(self, dir_locks=DIR_LOCKS, timeout=TIMEOUT_VOO_UNICO):
+        self.dir_locks = dir_locks
+        self.timeout = timeout
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def _lock_arquivo(self, chave):
+        os.makedirs(self.dir_locks, exist_ok=True)
+        nome = re.sub(r"[^\w.-]", "_", "-".join(str(parte) for parte in chave))
+        return FileLock(os.path.join(self.dir_locks, f"{nome}.lock"), timeout=self.timeout)
+
+    def _reservar(self, chaves):
+        """Separa as chaves que este pedido vai liderar (com Future novo) das que já estão em andamento."""
+        minhas, alheias = {}, {}
+        with self._lock:
+            for chave in chaves:
+                if chave in self._em_andamento:
+                    alheias[chave] = self._em_andamento[chave]
+                else:
+                    minhas[chave] = self._em_andamento[chave] = Future()
+        return minhas, alheias
+
+    def _liberar(self, chaves):
+        with self._lock:
+            for chave in chaves:
+                self._em_andamento.pop(chave, None)
+
+    def executar(self, chave, funcao, reler=None):
+        """
+        Executa `funcao()` uma única vez para a chave. `reler()` é chamado depois de
+        obter o lock entre processos e, se devolver algo diferente de None, esse
+        valor é usado no lugar de uma nova extração.
+        """
+        minhas, alheias = self._reservar([chave])
+        if chave in alheias:
+            return alheias[chave].result(timeout=self.timeout)
+
+        futuro = minhas[chave]
+        try:
+            with self._lock_arquivo(chave):
+                valor = reler() if reler is not None else None
+                if valor is None:
+                    valor = funcao()
+            futuro.set_result(valor)
+            return valor
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            self._liberar([chave])
+
+    def executar_lote(self, fonte, itens, funcao_lote, reler):
+        """
+        Versão em lote: `funcao_lote(itens)` extrai vários itens de uma vez e
+        devolve {item: valor}; `reler(item)` devolve o valor já gravado ou None.
+        Itens em andamento em outra thread são aguardados; os que estão com o
+        lock de outro processo são relidos depois que ele termina.
+        Retorna {item: valor}.
+        """
+        minhas, alheias = self._reservar([(fonte, item) for item in itens])
+        resultados = {}
+        try:
+            # Itens livres: trava agora; itens com o lock de outro processo ficam para depois
+            travados, de_outro_processo = [], []
+            for (_, item) in minhas:
+                lock = self._lock_arquivo((fonte, item))
+                try:
+                    lock.acquire(timeout=0)
+                    travados.append((item, lock))
+                except Timeout:
+                    de_outro_processo.append((item, lock))
+
+            try:
+                resultados.update(self._reler_ou_extrair([item for item, _ in travados], funcao_lote, reler))
+            finally:
+                for _, lock in travados:
+                    lock.release()
+
+            for item, lock in de_outro_processo:
+                with lock:
+                    resultados.update(self._reler_ou_extrair([item], funcao_lote, reler))
+
+            for (_, item), futuro in minhas.items():
+                futuro.set_result(resultados[item])
+        except BaseException as e:
+            for futuro in minhas.values():
+                if not futuro.done():
+                    futuro.set_exception(e)
+            raise
+        finally:
+            self._liberar(minhas)
+
+        for (_, item), futuro in alheias.items():
+            resultados[item] = futuro.result(timeout=self.timeout)
+        return {item: resultados[item] for item in itens}
+
+    @staticmethod
+    def _reler_ou_extrair(itens, funcao_lote, reler):
+        resultados = {}
+        faltantes = []
+        for item in itens:
+            valor = reler(item)
+            if valor is None:
+                faltantes.append(item)
+            else:
+                resultados[item] = valor
+        if faltantes:
+            resultados.update(funcao_lote(faltantes))
+        return resultados
+
+
+# --- Instância única por processo ---
+
+_voo_unico = VooUnico()
+
+
+def executar_uma_vez(chave, funcao, reler=None):
+    """Atalho para VooUnico.executar na instância do processo."""
+    return _voo_unico.executar(chave, funcao, reler)
+
+
+def executar_uma_vez_em_lote(fonte, itens, funcao_lote, reler):
+    """Atalho para VooUnico.executar_lote na instância do processo."""
+    return _voo_unico.executar_lote(fonte, itens, funcao_lote, reler)